@@ -78,22 +78,45 @@
 ##Foreign Key (SiteID) References Sites (SiteID)
 
 
-import pandas as pd
 import sqlite3
 from sqlite3 import Error
+from tree_config import load_paths
+from tree_keymaps import get_key_map
+from tree_pool import close_pools
+from tree_sitefacts import refresh_site_facts
+from tree_spatial import refresh_site_locations
+from tree_summaries import refresh_summaries
+from tree_validate import load_validated_inventory
 
-df = pd.read_csv(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced_notclean.csv")
-# Dropping rows with any empty cells
-df_cleaned = df.dropna()
+## RUN_STEPS = True rebuilds the database with the step functions below from a cleaned
+##CSV. Otherwise the raw file is validated and loaded in one pass, and the rows that
+##were dropped are kept in the Rejects table with the reason.
+RUN_STEPS = False
 
-# Resaving for db creation 
-df_cleaned.to_csv('Tree_Inventory_reduced.csv', index=False)
+if __name__ == "__main__":
+    # pandas is only needed for the cleaning and the table printouts below, so importing
+    # the step functions stays cheap
+    import pandas as pd
+
+    PATHS = load_paths() # input and output paths, see tree_config
+
+if __name__ == "__main__" and RUN_STEPS:
+    df = pd.read_csv(PATHS["raw_inventory"])
+    # Dropping rows with any empty cells
+    df_cleaned = df.dropna()
+
+    # Resaving for db creation 
+    df_cleaned.to_csv(PATHS["inventory"], index=False)
+
+if __name__ == "__main__" and not RUN_STEPS:
+    load_validated_inventory(PATHS["raw_inventory"], PATHS["database"], report=True)
 
 
 # I will use the following helper functions provided by Professor Narayanan in EAS503 SQL tutorials:
 def create_connection(db_file, delete_db=False):
     import os
     if delete_db and os.path.exists(db_file):
+        close_pools(db_file) # get_key_map's pooled readers would hold the old file open
         os.remove(db_file)
 
     conn = None
@@ -128,7 +151,7 @@ def create_table(conn, create_table_sql, drop_table_name=None):
 ## Step 1: Create CouncilDistricts Table.
 
 def step1_create_councildistricts_table(datafile, database):
-    districts = []
+    districts = {} # dict keeps first-seen order with constant-time membership checks
     with open(datafile) as file:
         header = None
         for line in file:
@@ -142,7 +165,7 @@ def step1_create_councildistricts_table(datafile, database):
             district = (data[21].strip(), )
 
             if district not in districts:
-                districts.append(district)
+                districts[district] = None
 
     districts = sorted(districts, key = lambda ele: ele[0])
 
@@ -167,34 +190,25 @@ def step1_create_councildistricts_table(datafile, database):
     conn.close()
         
 # Checking for correct Step 1 output
-step1_create_councildistricts_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from Districts", conn)
-print(df)
-conn.close()
+if __name__ == "__main__" and RUN_STEPS:
+    step1_create_councildistricts_table(PATHS["inventory"], PATHS["database"])
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from Districts", conn)
+    print(df)
+    conn.close()
 
 
 
 # Step 2: Create dictionary of CouncilDistrict IDs
 
 def step2_create_district_to_districtid_dict(database):
-    conn = create_connection(database)
-    sql_statement = "select * from Districts"
-    df = pd.read_sql_query(sql_statement, conn)
-
-    district_to_districtid = {}
-
-    # Iterate through our df to store region:regionID mappings
-    for rowid, value in df.iterrows():
-        districtid, district = value
-        district_to_districtid[district] = districtid
-    conn.close()
-    
-    return district_to_districtid
+    # Fetched with one cursor pass and cached until the database changes (see tree_keymaps)
+    return get_key_map(database, "Districts")
 
 # Checking for correct step 2 output
-district_to_districtid = step2_create_district_to_districtid_dict(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-print(district_to_districtid)
+if __name__ == "__main__":
+    district_to_districtid = step2_create_district_to_districtid_dict(PATHS["database"])
+    print(district_to_districtid)
 
 
 
@@ -202,7 +216,7 @@ print(district_to_districtid)
 
 def step3_create_addresses_table(datafile, database):
     district_to_districtid = step2_create_district_to_districtid_dict(database)
-    addresses = []
+    addresses = {}
     
     with open(datafile) as file:
         header = None
@@ -218,7 +232,7 @@ def step3_create_addresses_table(datafile, database):
             address = (data[17], data[18], district_to_districtid[data[21]])
 
             if address not in addresses:
-                addresses.append(address)
+                addresses[address] = None
 
     addresses = sorted(addresses, key = lambda ele:'{} {} {}'.format(ele[2], ele[1], ele[0])) # sorts by district, streetname and then number
 
@@ -247,36 +261,25 @@ def step3_create_addresses_table(datafile, database):
     conn.close()
 
 # Checking for correct Step 3 output
-step3_create_addresses_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from Addresses", conn)
-print(df)
-conn.close()
+if __name__ == "__main__" and RUN_STEPS:
+    step3_create_addresses_table(PATHS["inventory"], PATHS["database"])
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from Addresses", conn)
+    print(df)
+    conn.close()
 
 
 
 # Step 4: Address to AddressID dict
 
 def step4_create_address_to_addressid_dict(database):
-    conn = create_connection(database)
-    sql_statement = "select * from Addresses"
-    df = pd.read_sql_query(sql_statement, conn)
-
-    address_to_addressid = {}
-
-    # Iterate through our df to store region:regionID mappings
-    for rowid, value in df.iterrows():
-        value = value.tolist()
-        addressid = value[0]
-        address = (*value[1:4],)
-        address_to_addressid[address] = addressid
-    conn.close()
-    
-    return address_to_addressid
+    # Keys are (BuildingNo, Street, DistrictID) tuples
+    return get_key_map(database, "Addresses")
 
 # Checking for correct step 4 output
-address_to_addressid = step4_create_address_to_addressid_dict(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-print(address_to_addressid)
+if __name__ == "__main__":
+    address_to_addressid = step4_create_address_to_addressid_dict(PATHS["database"])
+    print(address_to_addressid)
 
 
 # Step 5: Create Sites table (references locationid, addressid)
@@ -285,7 +288,7 @@ def step5_create_sites_table(datafile, database):
     address_to_addressid = step4_create_address_to_addressid_dict(database)
     district_to_districtid = step2_create_district_to_districtid_dict(database)
 
-    sites = []
+    sites = {}
     
     with open(datafile) as file:
         header = None
@@ -309,7 +312,7 @@ def step5_create_sites_table(datafile, database):
             site = (data[25], data[20], status, lat, long, addressid)
 
             if site not in sites:
-                sites.append(site)
+                sites[site] = None
 
     sites = sorted(sites, key = lambda ele:ele[0]) # sorts by site id (which is preassigned in raw data)
 
@@ -340,12 +343,13 @@ def step5_create_sites_table(datafile, database):
     conn.close()
 
 # Checking for correct Step 5 output
-step5_create_sites_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
+if __name__ == "__main__" and RUN_STEPS:
+    step5_create_sites_table(PATHS["inventory"], PATHS["database"])
 
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from Sites", conn)
-print(df)
-conn.close()
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from Sites", conn)
+    print(df)
+    conn.close()
 
 ##### Now that Sites, Locations, Addresses, and Council Districts have been broken down into more usable tables, it's time to separate the
 ####remaining data by topic/area of relevance. Namely SiteSpecies (type of tree at each individual site, Species (table of species and names),
@@ -357,7 +361,7 @@ conn.close()
 #Step 6: Create Species table
 
 def step6_create_species_table(datafile, database):
-    all_species = []
+    all_species = {}
     
     with open(datafile) as file:
         header = None
@@ -377,7 +381,7 @@ def step6_create_species_table(datafile, database):
                 species = ("None", "None")
 
             if species not in all_species:
-                all_species.append(species)
+                all_species[species] = None
 
     all_species = sorted(all_species, key = lambda ele:ele[0])
 
@@ -404,42 +408,32 @@ def step6_create_species_table(datafile, database):
     conn.close()
 
 # Checking for correct Step 8 output
-step6_create_species_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
+if __name__ == "__main__" and RUN_STEPS:
+    step6_create_species_table(PATHS["inventory"], PATHS["database"])
 
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from Species", conn)
-print(df)
-conn.close()
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from Species", conn)
+    print(df)
+    conn.close()
 
 
 
 # Step 7: Create Species to speciesID dict (relies only on botanical name key)
 
 def step7_create_species_to_speciesid_dict(database):
-    conn = create_connection(database)
-    sql_statement = "select * from Species"
-    df = pd.read_sql_query(sql_statement, conn)
-
-    species_to_speciesid = {}
-
-    for rowid, value in df.iterrows():
-        speciesid = value[0]
-        species = value[1]
-        species_to_speciesid[species] = speciesid
-    conn.close()
-    
-    return species_to_speciesid
+    return get_key_map(database, "Species")
 
 # Checking for correct step 7 output
-species_to_speciesid = step7_create_species_to_speciesid_dict(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-print(species_to_speciesid)
+if __name__ == "__main__":
+    species_to_speciesid = step7_create_species_to_speciesid_dict(PATHS["database"])
+    print(species_to_speciesid)
 
 
 
 # Step 8: Create SiteSpecies table (references SpeciesID)
 def step8_create_sitespecies_table(datafile, database):
-    species_to_speciesid = step7_create_species_to_speciesid_dict(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-    sitespecies = []
+    species_to_speciesid = step7_create_species_to_speciesid_dict(database)
+    sitespecies = {}
     
     with open(datafile) as file:
         header = None
@@ -465,7 +459,7 @@ def step8_create_sitespecies_table(datafile, database):
                 
 
             if entry not in sitespecies:
-                sitespecies.append(entry)
+                sitespecies[entry] = None
             
     sitespecies = sorted(sitespecies, key = lambda ele: float(ele[0]))
 
@@ -493,12 +487,13 @@ def step8_create_sitespecies_table(datafile, database):
     conn.close()
     
 ## Checking for correct Step 8 output
-step8_create_sitespecies_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
+if __name__ == "__main__" and RUN_STEPS:
+    step8_create_sitespecies_table(PATHS["inventory"], PATHS["database"])
 
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from SiteSpecies", conn)
-print(df)
-conn.close()
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from SiteSpecies", conn)
+    print(df)
+    conn.close()
 
 # No dictionary is needed for the previous table. Now, it's time to make tables with each tree site's features:
 
@@ -507,7 +502,7 @@ conn.close()
 # Step 9: Create Measurements table (references site id)
 
 def step9_create_measurements_table(datafile, database):
-    measurements = []
+    measurements = {}
     
     with open(datafile) as file:
         header = None
@@ -528,7 +523,7 @@ def step9_create_measurements_table(datafile, database):
             measurement = (siteid, dbh, lsa)
             
             if measurement not in measurements:
-                measurements.append(measurement)
+                measurements[measurement] = None
             
     measurements = sorted(measurements, key = lambda ele: float(ele[0]))
 
@@ -556,18 +551,19 @@ def step9_create_measurements_table(datafile, database):
     conn.close()
 
 #Checking output of Step 9
-step9_create_measurements_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
+if __name__ == "__main__" and RUN_STEPS:
+    step9_create_measurements_table(PATHS["inventory"], PATHS["database"])
 
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from Measurements", conn)
-print(df)
-conn.close()
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from Measurements", conn)
+    print(df)
+    conn.close()
 
 
 # Step 10: Create EnvironmentalBenefits table
 
 def step10_create_environmentalbenefits_table(datafile, database):
-    env_benefits = []
+    env_benefits = {}
     
     with open(datafile) as file:
         header = None
@@ -592,7 +588,7 @@ def step10_create_environmentalbenefits_table(datafile, database):
             benefit = (siteid, pollutants, co2avoid, co2seq, stormwater, kwh, therms)
             
             if benefit not in env_benefits:
-                env_benefits.append(benefit)
+                env_benefits[benefit] = None
             
     env_benefits = sorted(env_benefits, key = lambda ele: float(ele[0]))
 
@@ -624,17 +620,18 @@ def step10_create_environmentalbenefits_table(datafile, database):
     conn.close()
 
 #Checking output of Step 10
-step10_create_environmentalbenefits_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
+if __name__ == "__main__" and RUN_STEPS:
+    step10_create_environmentalbenefits_table(PATHS["inventory"], PATHS["database"])
 
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from EnvironmentalBenefits", conn)
-print(df)
-conn.close()
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from EnvironmentalBenefits", conn)
+    print(df)
+    conn.close()
 
 # Step 11: Create EconomicBenefits table
 
 def step11_create_economicbenefits_table(datafile, database):
-    econ_benefits = []
+    econ_benefits = {}
     
     with open(datafile) as file:
         header = None
@@ -659,7 +656,7 @@ def step11_create_economicbenefits_table(datafile, database):
             benefit = (siteid, co2_savings,energy_savings, stormwater_savings, aq_savings, prop, total)
             
             if benefit not in econ_benefits:
-                econ_benefits.append(benefit)
+                econ_benefits[benefit] = None
             
     econ_benefits = sorted(econ_benefits, key = lambda ele:float(ele[0]))
 
@@ -691,11 +688,23 @@ def step11_create_economicbenefits_table(datafile, database):
     conn.close()
 
 #Checking output of Step 11
-step11_create_economicbenefits_table(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\Tree_Inventory_reduced.csv", r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
+if __name__ == "__main__" and RUN_STEPS:
+    step11_create_economicbenefits_table(PATHS["inventory"], PATHS["database"])
 
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-df = pd.read_sql_query("select * from EconomicBenefits", conn)
-print(df)
-conn.close()
+    conn = sqlite3.connect(PATHS["database"])
+    df = pd.read_sql_query("select * from EconomicBenefits", conn)
+    print(df)
+    conn.close()
 
 # This completes the normalization portion of the project!
+
+
+# Materializing the district and species rollups, the pre-joined SiteFacts table and the
+# spatial index the analysis scripts read (see tree_summaries, tree_sitefacts and tree_spatial)
+if __name__ == "__main__":
+    conn = create_connection(PATHS["database"])
+    with conn:
+        refresh_summaries(conn)
+        refresh_site_facts(conn)
+        refresh_site_locations(conn)
+    conn.close()
@@ -1,236 +1,130 @@
-import pandas as pd
-import sqlite3
+from tree_queries import (benefit_averages, total_yearly_benefits, vacant_site_count,
+                          active_sites_by_district, top_species, top_pollutant_sites, close_connections,
+                          configure_result_cache)
+from tree_config import load_paths
 
 
-def create_connection(db_file, delete_db=False):
-    import os
-    if delete_db and os.path.exists(db_file):
-        os.remove(db_file)
+def run_sql_queries(database=None):
+    database = database or load_paths()["database"] # see tree_config for setting the path
+    import pandas as pd
+    pd.set_option("display.max_columns", None)
 
-    conn = None
+    # Reusing results from earlier runs while the database is unchanged (needs pyarrow, see tree_cache)
     try:
-        conn = sqlite3.connect(db_file)
-        conn.execute("PRAGMA foreign_keys = ON")
-    except Error as e:
-        print(e)
+        configure_result_cache(cache_dir=load_paths()["query_cache"])
+    except ImportError:
+        pass
 
-    return conn
+    ## Query 1: Average Environmental Benefits 
+    ##To begin gathering metrics for the report, I want to return the average values of all inhabited tree sites
+    ##for environmental impact, meaning CO2Avoided, CO2Sequestered, Pollutants absorbed, kWh saved, and therms saved.
+    ##To do so, I"ll have to reference the EnvironmentalBenefits table joined with Sites where there are trees.
+    ##The SQL for every query now lives in tree_queries as parameterized functions sharing a connection pool:
 
-database =r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db"
-pd.set_option("display.max_columns", None)
-
-## Query 1: Average Environmental Benefits 
-##To begin gathering metrics for the report, I want to return the average values of all inhabited tree sites
-##for environmental impact, meaning CO2Avoided, CO2Sequestered, Pollutants absorbed, kWh saved, and therms saved.
-##To do so, I"ll have to reference the EnvironmentalBenefits table joined with Sites where there are trees:
-
-
-sql_query1 ="""Select AVG(CO2Avoided), AVG(CO2Sequestered), AVG(PollutantsSaved),
-            AVG(StormwaterGallonsSaved), AVG(KilowattHoursSaved), AVG(ThermsSaved)
-            From EnvironmentalBenefits
-            Join Sites
-            on Sites.SiteID = EnvironmentalBenefits.SiteID
-            Where SiteStatus == "Inhabited"
-            """
-
-conn = create_connection(database)
-
-with conn:
-    query1_df = pd.read_sql_query(sql_query1, conn)
+    query1_df = pd.DataFrame([benefit_averages(database, status="Inhabited")])
     print(query1_df)
-    
 
-# Query 2: Total Yearly Benefits 
-##Next, I want to find the net economic benefit of all the city"s tree sites. To do so, I"ll have to find the sum
-##of TotalYearlyBenefits in the EconomicBenefits table:
 
-sql_query2 =    """Select SUM(TotalYearlyBenefits)
-                From EconomicBenefits
-                """
+    # Query 2: Total Yearly Benefits 
+    ##Next, I want to find the net economic benefit of all the city"s tree sites. To do so, I"ll have to find the sum
+    ##of TotalYearlyBenefits in the EconomicBenefits table:
 
-with conn:
-    query2_df = pd.read_sql_query(sql_query2, conn)
+    query2_df = pd.DataFrame({"SUM(TotalYearlyBenefits)": [total_yearly_benefits(database)]})
     print(query2_df)
 
 
-# Query 3: Number of Vacant Sites
-## Next, I want to find the total number of vacant sites in the inventory. I"ll do so by referencing the Sites table and
-## counting the number of entries *not* "Inhabited":
-
-sql_query3 ="""Select COUNT(*)
-            From Sites
-            Where SiteStatus Not Like "Inhabited"
-            """
+    # Query 3: Number of Vacant Sites
+    ## Next, I want to find the total number of vacant sites in the inventory. I"ll do so by referencing the Sites table and
+    ## counting the number of entries *not* "Inhabited":
 
-with conn:
-    query3_df = pd.read_sql_query(sql_query3, conn)
+    query3_df = pd.DataFrame({"COUNT(*)": [vacant_site_count(database)]})
     print(query3_df)
 
-# Query 4: Tree vacancies and districts
-## Next, I want to find the number of trees out of my sample of 10,000 that are in the Ellicott District compared
-##to the proportion residing in the wealthier Delaware district.
-
-sql_query4a ="""Select COUNT(*)
-            From Sites
-            Join Addresses
-            on Sites.AddressID = Addresses.AddressID
-            Join Districts
-            on Districts.DistrictID = Addresses.DistrictID
-            Where (SiteStatus = "Inhabited") and (District = "Ellicott")
-            """
-
-with conn:
-    query4a_df = pd.read_sql_query(sql_query4a, conn)
-    print(query4a_df)
-
-sql_query4b ="""Select COUNT(*)
-            From Sites
-            Join Addresses
-            on Sites.AddressID = Addresses.AddressID
-            Join Districts
-            on Districts.DistrictID = Addresses.DistrictID
-            Where (SiteStatus = "Inhabited") and (District = "Delaware")
-            """
-
-with conn:
-    query4a_df = pd.read_sql_query(sql_query4a, conn)
-    query4b_df = pd.read_sql_query(sql_query4b, conn)
-    print(query4a_df, query4b_df)
-
-# Query 5: Most common tree species in Buffalo
-##Next, I"d like to determine which species is most common in the city:
-
-sql_query5 ="""Select BotanicalName, CommonName, Count(SiteSpecies.SiteID)
-            From Species
-            Join SiteSpecies
-            on Species.SpeciesID = SiteSpecies.SpeciesID
-            Join Sites
-            on Sites.SiteID = SiteSpecies.SiteID
-            Where (SiteStatus = "Inhabited")
-            GROUP BY Species.SpeciesID
-            ORDER BY Count(SiteSpecies.SiteID) DESC
-            """
-
-with conn:
-    query5_df = pd.read_sql_query(sql_query5, conn)
-    print(query5_df)
-
-# Query 6: Tree species with highest ability to absorb pollution based on the inventory subset
-## This query revealed the majority of the top 5 most effective air purifying trees were Elm.
-
-sql_query6 ="""Select CommonName, PollutantsSaved
-            From EnvironmentalBenefits
-            Join SiteSpecies
-            on SiteSpecies.SiteID = EnvironmentalBenefits.SiteID
-            Join Species
-            on SiteSpecies.SpeciesID = Species.SpeciesID
-            ORDER BY PollutantsSaved DESC
-            """
-
-with conn:
-    query6_df = pd.read_sql_query(sql_query6, conn)
-    print(query6_df)
+    # Query 4: Tree vacancies and districts
+    ## Next, I want to find the number of trees out of my sample of 10,000 that are in the Ellicott District compared
+    ##to the proportion residing in the wealthier Delaware district. Both districts come back from one grouped query:
 
-conn.close()
+    query4_counts = active_sites_by_district(database, ["Ellicott", "Delaware"])
+    query4_df = pd.DataFrame(list(query4_counts.items()), columns=["District", "ActiveSites"])
+    print(query4_df)
 
+    # Query 5: Most common tree species in Buffalo
+    ##Next, I"d like to determine which species is most common in the city:
 
-# Using pandas to corroborate results
-
-# Step 1: Get all tables from normalized database
-
-conn = create_connection(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
-with conn: 
-    # get Addresses
-    addresses = pd.read_sql_query("select * from Addresses", conn)
-    print(addresses)
-
-    # get Districts
-    districts = pd.read_sql_query("select * from Districts", conn)
-    print(districts)
-    
-    # get EconomicBenefits
-    economic_benefits = pd.read_sql_query("select * from EconomicBenefits", conn)
-    print(economic_benefits)
-    
-    # get EnvironmentalBenefits
-    environmental_benefits = pd.read_sql_query("select * from EnvironmentalBenefits", conn)
-    print(environmental_benefits)
-    
-    # get Measurements
-    measurements = pd.read_sql_query("select * from Measurements", conn)
-    print(measurements)
-
-    # get SiteSpecies
-    site_species = pd.read_sql_query("select * from SiteSpecies", conn)
-    print(site_species)
-
-    # get Sites
-    sites = pd.read_sql_query("select * from Sites", conn)
-    print(sites)
-
-    # get Species
-    species = pd.read_sql_query("select * from Species", conn)
-    print(species)
+    query5_df = pd.DataFrame(top_species(database, status="Inhabited"), columns=["BotanicalName", "CommonName", "SiteCount"])
+    print(query5_df)
 
-conn.close()
+    # Query 6: Tree species with highest ability to absorb pollution based on the inventory subset
+    ## This query revealed the majority of the top 5 most effective air purifying trees were Elm.
 
-# Query 1 Pandas implementation: getting average environmental impact at active sites 
-query1_join = pd.merge(
-    sites[sites["SiteStatus"] == "Inhabited"],  
-    environmental_benefits,
-    on="SiteID",
-    how="inner"
-)
+    query6_df = pd.DataFrame(top_pollutant_sites(database), columns=["CommonName", "PollutantsSaved"])
+    print(query6_df)
 
-avg_environmental_benefits = query1_join[[
-    "CO2Avoided", 
-    "CO2Sequestered", 
-    "PollutantsSaved",
-    "StormwaterGallonsSaved", 
-    "KilowattHoursSaved", 
-    "ThermsSaved"
-]].mean()
+    close_connections()
 
-print(avg_environmental_benefits)
 
+# Using pandas to corroborate results
 
-# Query 2 Pandas implementation: getting total yearly economic benefits across db
-total_yearly_benefits = economic_benefits[["TotalYearlyBenefits"]].sum()
-print(total_yearly_benefits)
+def run_pandas_queries(database=None):
+    from tree_loader import TableLoader # pandas, only needed here
+    from tree_db import require_tables
 
+    # Step 1: Get the pre-joined SiteFacts table (one row per site with its district, species and benefits,
+    # see tree_sitefacts), only the columns the queries below use (see tree_loader)
 
-# Query 3 Pandas implementation: getting number of vacant sites
-number_of_vacant_sites = len(sites[sites.iloc[:,2] != "Inhabited"])
-print(number_of_vacant_sites)
+    with TableLoader(database or load_paths()["database"]) as tables:
+        require_tables(tables.connect(), ["SiteFacts"]) # built at load time, see tree_etl
+        site_facts = tables.load("SiteFacts", ["SiteID", "SiteStatus", "District", "SpeciesID", "BotanicalName", "CommonName",
+                                               "CO2Avoided", "CO2Sequestered", "PollutantsSaved", "StormwaterGallonsSaved",
+                                               "KilowattHoursSaved", "ThermsSaved", "TotalYearlyBenefits"])
 
+    active_sites = site_facts[site_facts["SiteStatus"] == "Inhabited"]
 
-# Query 4 Pandas implementation: getting number of active sites in Ellicott dist. and Delaware dist.
-query4a_join = sites[sites["SiteStatus"] == "Inhabited"].merge(addresses,on="AddressID", how="inner").merge(districts[districts["District"]=="Ellicott"], on="DistrictID",how="inner")
-print(len(query4a_join))
+    # Query 1 Pandas implementation: getting average environmental impact at active sites 
+    avg_environmental_benefits = active_sites[[
+        "CO2Avoided", 
+        "CO2Sequestered", 
+        "PollutantsSaved",
+        "StormwaterGallonsSaved", 
+        "KilowattHoursSaved", 
+        "ThermsSaved"
+    ]].mean()
 
-query4b_join = sites[sites["SiteStatus"] == "Inhabited"].merge(addresses,on="AddressID", how="inner").merge(districts[districts["District"]=="Delaware"], on="DistrictID",how="inner")
-print(len(query4b_join))
+    print(avg_environmental_benefits)
 
 
-# Query 5 Pandas implementation: getting most common tree species
+    # Query 2 Pandas implementation: getting total yearly economic benefits across db
+    total_yearly_benefits = site_facts[["TotalYearlyBenefits"]].sum()
+    print(total_yearly_benefits)
 
-query5_join = species.merge(site_species, on="SpeciesID", how="inner").merge(sites[sites["SiteStatus"] == "Inhabited"], on="SiteID",how="inner")
 
-query5_reorder= query5_join.groupby(["SpeciesID", "BotanicalName", "CommonName"]).size().reset_index(name="SiteCount").sort_values(by="SiteCount", ascending=False)[["BotanicalName", "CommonName", "SiteCount"]]
+    # Query 3 Pandas implementation: getting number of vacant sites
+    number_of_vacant_sites = len(site_facts[site_facts["SiteStatus"] != "Inhabited"])
+    print(number_of_vacant_sites)
 
-print(query5_reorder)
 
+    # Query 4 Pandas implementation: getting number of active sites in Ellicott dist. and Delaware dist.
+    query4a_join = active_sites[active_sites["District"] == "Ellicott"]
+    print(len(query4a_join))
 
-# Query 6 Pandas implementation: getting most pollution-reducing tree types
+    query4b_join = active_sites[active_sites["District"] == "Delaware"]
+    print(len(query4b_join))
 
-query6_join = environmental_benefits.merge(site_species,on="SiteID",how="inner").merge(species,on="SpeciesID",how="inner").sort_values(by="PollutantsSaved", ascending = False)[["CommonName","PollutantsSaved"]]
 
-print(query6_join)
+    # Query 5 Pandas implementation: getting most common tree species
 
+    query5_reorder= active_sites.groupby(["SpeciesID", "BotanicalName", "CommonName"], observed=True).size().reset_index(name="SiteCount").sort_values(by="SiteCount", ascending=False)[["BotanicalName", "CommonName", "SiteCount"]]
 
+    print(query5_reorder)
 
 
+    # Query 6 Pandas implementation: getting most pollution-reducing tree types
 
+    query6_join = site_facts.sort_values(by="PollutantsSaved", ascending = False)[["CommonName","PollutantsSaved"]]
 
+    print(query6_join)
 
 
+if __name__ == "__main__":
+    run_sql_queries()
+    run_pandas_queries()
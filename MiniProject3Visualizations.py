@@ -1,14 +1,3 @@
-import pandas as pd
-import sqlite3
-import seaborn as sns
-import matplotlib.pyplot as plt
-import geopandas as gpd
-from geopandas import GeoDataFrame
-import geodatasets
-import contextily as ctx
-import plotly.express as px
-
-
 """This script contains the code for Project 3 visualizations, using Project 2's
 normalized database to communicate for a public audience. My normalization project
 focused on a dataset about trees/tree sites across Buffalo, their characteristics,
@@ -20,160 +9,250 @@ to create visuals for a public-facing story about the benefits of a citywide ref
 initiative, specifically focused on neighborhoods with little greenery and high risk for health
 issues in the face of pollution due to hazardous infrastructure like the Humboldt Parkway."""
 
+## The plotting stack (pandas, matplotlib, seaborn) is imported inside the functions that
+##use it, so importing this module (e.g. for one chart from tree_cli) costs nothing until
+##a chart is drawn.
+
+from tree_config import load_paths
+
+BENEFIT_COLUMNS = ["CO2Avoided", "CO2Sequestered", "PollutantsSaved", "StormwaterGallonsSaved", "KilowattHoursSaved", "ThermsSaved"]
+
+DISTRICT_ORDER = ['Ellicott', 'Delaware', "Masten", "Niagara","North", "South","University","Lovejoy","Fillmore"]
+
+
+def load_frames(database=None):
+    from tree_columnar import open_tables
+    from tree_db import open_readonly, require_tables
+
+    # SiteFacts and DistrictSummary are built at load time (see tree_etl); charts only read
+    paths = load_paths() # see tree_config for setting the paths
+    database = database or paths["database"]
+    conn = open_readonly(database)
+    try:
+        require_tables(conn, ["SiteFacts", "DistrictSummary"])
+    finally:
+        conn.close()
+
+    # Loading the tables from normalized database, only the columns the plots below use (see tree_loader)
+    # Reads the memory-mapped columnar export instead when it is up to date (see tree_columnar)
+    with open_tables(database, paths["columnar"]) as tables:
+        # one pre-joined row per site with its district, species and benefits (see tree_sitefacts)
+        site_facts = tables.load("SiteFacts", ["SiteID", "SiteStatus", "District", "SpeciesID", "BotanicalName", "CommonName",
+                                               "CO2Avoided", "CO2Sequestered", "PollutantsSaved", "StormwaterGallonsSaved",
+                                               "KilowattHoursSaved", "ThermsSaved", "TotalYearlyBenefits"])
+
+        # the per-district rollup materialized at load time (see tree_summaries)
+        district_summary = tables.load("DistrictSummary", ["District", "ActiveSites", "VacantSites"])
+    return site_facts, district_summary
+
+
+# Recreating certain query-based data frames for plots, one function per query
+# (query1_join is the inhabited sites, shared by queries 1, 4 and 5)
+
+def pandas_query1(site_facts, query1_join):
+    # Query 1 Pandas implementation: getting average environmental impact at active sites 
+    return query1_join[BENEFIT_COLUMNS].mean()
+
+
+def pandas_query2(site_facts, query1_join):
+    # Query 2 Pandas implementation: getting total yearly economic benefits across db
+    return site_facts[["TotalYearlyBenefits"]].sum()
+
+
+def pandas_query3(site_facts, query1_join):
+    # Query 3 Pandas implementation: getting number of vacant sites
+    return len(site_facts[site_facts["SiteStatus"] != "Inhabited"])
+
+
+def pandas_query4(site_facts, query1_join):
+    # Query 4 Pandas implementation: getting number of active sites in Ellicott dist. and Delaware dist.
+    query4a = query1_join[query1_join["District"] == "Ellicott"]
+    query4b = query1_join[query1_join["District"] == "Delaware"]
+    return query4a, query4b
+
+
+def pandas_query5(site_facts, query1_join):
+    # Query 5 Pandas implementation: getting most common tree species
+    return query1_join.groupby(["SpeciesID", "BotanicalName", "CommonName"], observed=True).size().reset_index(name="SiteCount").sort_values(by="SiteCount", ascending=False)[["BotanicalName", "CommonName", "SiteCount"]]
+
+
+def pandas_query6(site_facts, query1_join):
+    # Query 6 Pandas implementation: getting most pollution-reducing tree types
+    return site_facts.sort_values(by="PollutantsSaved", ascending = False)[["CommonName","PollutantsSaved"]]
+
+
+PANDAS_QUERIES = {
+    "query1": pandas_query1,
+    "query2": pandas_query2,
+    "query3": pandas_query3,
+    "query4": pandas_query4,
+    "query5": pandas_query5,
+    "query6": pandas_query6,
+}
+
+
+def inhabited_sites(site_facts):
+    return site_facts[site_facts["SiteStatus"] == "Inhabited"]
+
+
+def pandas_queries(site_facts):
+    query1_join = inhabited_sites(site_facts)
+    query4a, query4b = pandas_query4(site_facts, query1_join)
+    return {"query1_join": query1_join, "avg_environmental_benefits": pandas_query1(site_facts, query1_join),
+            "total_yearly_benefits": pandas_query2(site_facts, query1_join),
+            "number_of_vacant_sites": pandas_query3(site_facts, query1_join),
+            "query4a": query4a, "query4b": query4b, "query5_reorder": pandas_query5(site_facts, query1_join),
+            "query6_join": pandas_query6(site_facts, query1_join)}
+
 
-# Loading tables from normalized database 
-conn = sqlite3.connect(r"C:\Users\hb102\Documents\Python\EAS 503 Mini Project 2-3\BuffaloTrees.db")
+# The data behind each chart, separate from the drawing so it can be checked (and
+# benchmarked) without the plotting stack
 
-with conn: 
-    # get Addresses
-    addresses = pd.read_sql_query("select * from Addresses", conn)
-    print(addresses)
+def districts_data(site_facts, district_summary, queries):
+    import pandas as pd
 
-    # get Districts
-    districts = pd.read_sql_query("select * from Districts", conn)
-    print(districts)
-    
-    # get EconomicBenefits
-    economic_benefits = pd.read_sql_query("select * from EconomicBenefits", conn)
-    print(economic_benefits)
-    
-    # get EnvironmentalBenefits
-    environmental_benefits = pd.read_sql_query("select * from EnvironmentalBenefits", conn)
-    print(environmental_benefits)
-    
-    # get Measurements
-    measurements = pd.read_sql_query("select * from Measurements", conn)
-    print(measurements)
+    # Query 4 plots:
+    # Active sites by district, one lookup per district in DistrictSummary
+    active_sites = dict(zip(district_summary["District"], district_summary["ActiveSites"]))
 
-    # get SiteSpecies
-    site_species = pd.read_sql_query("select * from SiteSpecies", conn)
-    print(site_species)
+    return pd.DataFrame({'District': DISTRICT_ORDER,'Active Sites': [active_sites.get(district, 0) for district in DISTRICT_ORDER]})
 
-    # get Sites
-    sites = pd.read_sql_query("select * from Sites", conn)
-    print(sites)
 
-    # get Species
-    species = pd.read_sql_query("select * from Species", conn)
-    print(species)
+def species_data(site_facts, district_summary, queries):
+    # Query 5 plot: Most common tree species 
+    query5_reorder = queries["query5_reorder"]
+    return query5_reorder[query5_reorder["CommonName"] != 'None'].head(15).astype({"CommonName": str})
 
-conn.close()
-
-# Recreating certain query-based data frames for plots
-# Query 1 Pandas implementation: getting average environmental impact at active sites 
-query1_join = pd.merge(sites[sites["SiteStatus"] == "Inhabited"],environmental_benefits, on="SiteID",how="inner")
-
-avg_environmental_benefits = query1_join[["CO2Avoided", "CO2Sequestered", "PollutantsSaved","StormwaterGallonsSaved", "KilowattHoursSaved", "ThermsSaved"]].mean()
-
-
-
-# Query 2 Pandas implementation: getting total yearly economic benefits across db
-total_yearly_benefits = economic_benefits[["TotalYearlyBenefits"]].sum()
-
-# Query 3 Pandas implementation: getting number of vacant sites
-number_of_vacant_sites = len(sites[sites.iloc[:,2] != "Inhabited"])
 
+def pollution_data(site_facts, district_summary, queries):
+    # Query 6 plot: Top pollution-fighting tree species  
+    return queries["query6_join"].head(15).astype({"CommonName": str})
 
-# Query 4 Pandas implementation: getting number of active sites in Ellicott dist. and Delaware dist.
-query4_df = sites[sites["SiteStatus"] == "Inhabited"].merge(addresses,on="AddressID", how="inner").merge(districts, on="DistrictID",how="inner")
-query4a = query4_df[query4_df["District"] == "Ellicott"]
-query4b = query4_df[query4_df["District"] == "Delaware"]
 
-# Query 5 Pandas implementation: getting most common tree species
-query5_join = species.merge(site_species, on="SpeciesID", how="inner").merge(sites[sites["SiteStatus"] == "Inhabited"], on="SiteID",how="inner")
+def correlation_data(site_facts, district_summary, queries):
+    # Combined environmental benefits visualization
+    return queries["query1_join"][BENEFIT_COLUMNS].corr()
 
-query5_reorder= query5_join.groupby(["SpeciesID", "BotanicalName", "CommonName"]).size().reset_index(name="SiteCount").sort_values(by="SiteCount", ascending=False)[["BotanicalName", "CommonName", "SiteCount"]]
 
+def economic_data(site_facts, district_summary, queries):
+    # Economic benefits distribution
+    merged_econ = site_facts[site_facts["SiteStatus"]!= "Vacant"]
+    return merged_econ['TotalYearlyBenefits']
 
-# Query 6 Pandas implementation: getting most pollution-reducing tree types
-query6_join = environmental_benefits.merge(site_species,on="SiteID",how="inner").merge(species,on="SpeciesID",how="inner").sort_values(by="PollutantsSaved", ascending = False)[["CommonName","PollutantsSaved"]]
 
+CHART_DATA = {
+    "districts": districts_data,
+    "species": species_data,
+    "pollution": pollution_data,
+    "correlation": correlation_data,
+    "economic": economic_data,
+}
 
-# Setting seaborn style conventions
-sns.set_style("whitegrid")
 
+def plot_districts(site_facts, district_summary, queries):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-# Query 4 plots:
-# Active sites by district 
-ellicott_count = len(query4a)
-delaware_count = len(query4b)
-masten_count = len(query4_df[query4_df["District"] == "Masten"])
-niagara_count = len(query4_df[query4_df["District"] == "Niagara"])
-north_count = len(query4_df[query4_df["District"] == "North"])
-south_count = len(query4_df[query4_df["District"] == "South"])
-university_count = len(query4_df[query4_df["District"] == "University"])
-lovejoy_count = len(query4_df[query4_df["District"] == "Lovejoy"])
-fillmore_count = len(query4_df[query4_df["District"] == "Fillmore"])
+    query4_out = districts_data(site_facts, district_summary, queries)
 
-query4_out = pd.DataFrame({'District': ['Ellicott', 'Delaware', "Masten", "Niagara","North", "South","University","Lovejoy","Fillmore"],'Active Sites': [ellicott_count, delaware_count, masten_count, niagara_count, north_count, south_count, university_count, lovejoy_count, fillmore_count]})
+    # District comparison pie chart
+    plt.figure(figsize=(8, 8))
 
-# District comparison pie chart
-plt.figure(figsize=(8, 8))
+    plt.pie(
+        query4_out['Active Sites'], 
+        labels=None,
+        explode = [0, 0.1, 0, 0, 0, 0, 0, 0, 0],
+        autopct=None,
+        startangle=90,
+        pctdistance=0.85,
+        shadow=True,
+        colors=sns.cubehelix_palette(start=2, rot=0, dark=0, light=.95, reverse=True),
+        textprops={'fontsize': 12, 'wrap': False},  
+        wedgeprops={'edgecolor': 'w', 'linewidth': 1},
+        labeldistance = 1
+    )
+    plt.legend(query4_out['District'], loc='upper right')
+    plt.title('Living Tree Sites Distribution by District in Sample of 10,000', fontsize=14, pad=20)
+    plt.tight_layout(pad=3)
+    plt.show()
 
-plt.pie(
-    query4_out['Active Sites'], 
-    labels=None,
-    explode = [0, 0.1, 0, 0, 0, 0, 0, 0, 0],
-    autopct=None,
-    startangle=90,
-    pctdistance=0.85,
-    shadow=True,
-    colors=sns.cubehelix_palette(start=2, rot=0, dark=0, light=.95, reverse=True),
-    textprops={'fontsize': 12, 'wrap': False},  
-    wedgeprops={'edgecolor': 'w', 'linewidth': 1},
-    labeldistance = 1
-)
-plt.legend(query4_out['District'], loc='upper right')
-plt.title('Living Tree Sites Distribution by District in Sample of 10,000', fontsize=14, pad=20)
-plt.tight_layout(pad=3)
-plt.show()
 
+def plot_species(site_facts, district_summary, queries):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-# Query 5 plot: Most common tree species 
-query5_top = query5_reorder[query5_reorder["CommonName"] != 'None'].head(15)
+    query5_top = species_data(site_facts, district_summary, queries)
 
-plt.figure(figsize=(12, 8))
-sns.barplot(data=query5_top, x='SiteCount', y='CommonName', palette=sns.light_palette("seagreen"))
-plt.title('Most Common Buffalo Tree Species')
-plt.xlabel('Number of Sites in 10,000')
-plt.ylabel('Tree Species')
-plt.tight_layout()
-plt.show()
+    plt.figure(figsize=(12, 8))
+    sns.barplot(data=query5_top, x='SiteCount', y='CommonName', palette=sns.light_palette("seagreen"))
+    plt.title('Most Common Buffalo Tree Species')
+    plt.xlabel('Number of Sites in 10,000')
+    plt.ylabel('Tree Species')
+    plt.tight_layout()
+    plt.show()
 
 
-# Query 6 plot: Top pollution-fighting tree species  
-query6_top = query6_join.head(15)
+def plot_pollution(site_facts, district_summary, queries):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-plt.figure(figsize=(12, 8))
-sns.barplot(data=query6_top, x='PollutantsSaved', y='CommonName', palette=sns.light_palette("seagreen"))
-plt.title('Pollution-Mitigating Tree Species')
-plt.xlabel('Pollutants absorbed (lbs/year)')
-plt.ylabel('Tree Species')
-plt.tight_layout()
-plt.show()
+    query6_top = pollution_data(site_facts, district_summary, queries)
 
-# Combined environmental benefits visualization
-plt.figure(figsize=(14, 8))
-sns.heatmap(query1_join[["CO2Avoided", "CO2Sequestered", "PollutantsSaved", "StormwaterGallonsSaved", "KilowattHoursSaved", "ThermsSaved"]].corr(),annot=True, cmap= sns.light_palette("seagreen", as_cmap=True), center=0)
-plt.title('Environmental Benefits Correlation Matrix')
-plt.tick_params(axis='x', labelrotation=35)
-plt.tight_layout(pad=3)
-plt.show()
+    plt.figure(figsize=(12, 8))
+    sns.barplot(data=query6_top, x='PollutantsSaved', y='CommonName', palette=sns.light_palette("seagreen"))
+    plt.title('Pollution-Mitigating Tree Species')
+    plt.xlabel('Pollutants absorbed (lbs/year)')
+    plt.ylabel('Tree Species')
+    plt.tight_layout()
+    plt.show()
 
-# Economic benefits distribution
-plt.figure(figsize=(12, 6))
-merged_econ = economic_benefits.merge(sites[sites["SiteStatus"]!= "Vacant"], on="SiteID",how="inner")
-sns.histplot(merged_econ['TotalYearlyBenefits'], bins=30, kde=True, color = "darkgreen")
-plt.title('Distribution of Total Yearly Economic Benefit per Inhabited Tree Site')
-plt.xlabel('Dollar Value')
-plt.ylabel('Count')
-plt.tight_layout()
-plt.show()
 
+def plot_correlation(site_facts, district_summary, queries):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
+    plt.figure(figsize=(14, 8))
+    sns.heatmap(correlation_data(site_facts, district_summary, queries),annot=True, cmap= sns.light_palette("seagreen", as_cmap=True), center=0)
+    plt.title('Environmental Benefits Correlation Matrix')
+    plt.tick_params(axis='x', labelrotation=35)
+    plt.tight_layout(pad=3)
+    plt.show()
 
 
+def plot_economic(site_facts, district_summary, queries):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
+    plt.figure(figsize=(12, 6))
+    sns.histplot(economic_data(site_facts, district_summary, queries), bins=30, kde=True, color = "darkgreen")
+    plt.title('Distribution of Total Yearly Economic Benefit per Inhabited Tree Site')
+    plt.xlabel('Dollar Value')
+    plt.ylabel('Count')
+    plt.tight_layout()
+    plt.show()
 
 
+CHARTS = {
+    "districts": plot_districts,
+    "species": plot_species,
+    "pollution": plot_pollution,
+    "correlation": plot_correlation,
+    "economic": plot_economic,
+}
+
+
+def show_charts(charts=None, database=None):
+    # Draws the named CHARTS (all of them by default), in order
+    import seaborn as sns
+
+    site_facts, district_summary = load_frames(database)
+    queries = pandas_queries(site_facts)
 
+    # Setting seaborn style conventions
+    sns.set_style("whitegrid")
+    for name in charts or CHARTS:
+        CHARTS[name](site_facts, district_summary, queries)
+
+
+if __name__ == "__main__":
+    show_charts()
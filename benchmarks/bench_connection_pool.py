@@ -0,0 +1,87 @@
+"""Benchmark: a connection per query vs. the shared read-only pool, from many threads.
+
+Run from the repository root:
+    python -m benchmarks.bench_connection_pool --rows 100000 --threads 1 4 8 --queries 20000
+
+A synthetic database is loaded once; then every thread count runs the same mix of
+point and small-box lookups (uncached) split across a thread pool, once opening
+and closing a connection per query and once through tree_pool, and prints the
+queries/sec of each. Results are checked against a single-threaded run."""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tree_etl import load_inventory
+from tree_pool import close_pools
+from tree_queries import run_query
+from tree_spatial import BBOX_SQL
+from benchmarks.synthetic import DISTRICTS, write_inventory
+
+
+def query_mix(n, n_sites):
+    # n (sql, params) pairs cycling through the lookups a dashboard makes per request
+    mix = []
+    for i in range(n):
+        siteid = i * 7919 % n_sites + 1
+        kind = i % 4
+        if kind == 0:
+            mix.append(("SELECT * FROM SiteFacts WHERE SiteID = ?", (siteid, )))
+        elif kind == 1:
+            mix.append(("SELECT * FROM DistrictSummary WHERE District = ?", (DISTRICTS[i % len(DISTRICTS)], )))
+        elif kind == 2:
+            lat, lon = 42.83 + (i % 100) * 0.0013, -78.90 + (i % 97) * 0.0011
+            mix.append((BBOX_SQL, {"min_lat": lat, "max_lat": lat + 0.001, "min_lon": lon, "max_lon": lon + 0.001,
+                                   "status": None}))
+        else:
+            mix.append(("SELECT SiteStatus, AddressID FROM Sites WHERE SiteID = ?", (siteid, )))
+    return mix
+
+
+def connect_per_query(database, sql, params):
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def pooled(database, sql, params):
+    return run_query(database, sql, params, cached=False)
+
+
+def run(func, database, queries, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda query: func(database, *query), queries))
+        return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "BuffaloTrees.db")
+        load_inventory(write_inventory(os.path.join(tmp, "inventory.csv"), args.rows), database)
+        queries = query_mix(args.queries, args.rows)
+        expected = [connect_per_query(database, *query) for query in queries]
+
+        print(f"{args.rows} rows, {args.queries} queries, {os.cpu_count()} cores (queries/s)")
+        print(f"{'threads':>8} {'connect':>10} {'pool':>10} {'speedup':>8}  identical")
+        for threads in args.threads:
+            connect_time, connect_results = run(connect_per_query, database, queries, threads)
+            pool_time, pool_results = run(pooled, database, queries, threads)
+            print(f"{threads:>8} {args.queries / connect_time:>10.0f} {args.queries / pool_time:>10.0f} "
+                  f"{connect_time / pool_time:>7.1f}x  {connect_results == expected and pool_results == expected}")
+        close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: the tree_csv parser backends on a large synthetic inventory.
+
+Run from the repository root:
+    python -m benchmarks.bench_csv_parsers --rows 1000000 --parsers csv pyarrow split
+
+For every backend the inventory is parsed row by row (read_rows) and in blocks
+(read_blocks), then parsed and fed to the single-pass loader's sinks (the SQLite
+write is left out, it is the same for all of them). Rows/sec of each are printed and
+the tables built are checked against the csv backend's."""
+
+import argparse
+import os
+import tempfile
+import time
+
+from tree_csv import PARSERS, read_blocks, read_rows
+from tree_etl import create_sinks, create_keys, feed_row, build_tables
+from benchmarks.synthetic import write_inventory
+
+
+def parse_rows(datafile, parser):
+    return sum(1 for _ in read_rows(datafile, parser))
+
+
+def parse_blocks(datafile, parser):
+    return sum(len(rows) for rows in read_blocks(datafile, parser))
+
+
+def parse_and_feed(datafile, parser):
+    sinks, keys = create_sinks(), create_keys()
+    for data in read_rows(datafile, parser):
+        feed_row(sinks, keys, data)
+    return build_tables(sinks, keys)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--parsers", nargs="+", default=PARSERS, choices=PARSERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datafile = write_inventory(os.path.join(tmp, "inventory.csv"), args.rows)
+        expected = parse_and_feed(datafile, "csv")
+        print(f"{args.rows} rows, {os.path.getsize(datafile) / 1e6:.0f} MB (rows/s)")
+        print(f"{'parser':>8} {'rows':>10} {'blocks':>10} {'rows + feed':>12}  identical")
+
+        for name in args.parsers:
+            rows_time, _ = timed(parse_rows, datafile, name)
+            blocks_time, _ = timed(parse_blocks, datafile, name)
+            feed_time, tables = timed(parse_and_feed, datafile, name)
+            print(f"{name:>8} {args.rows / rows_time:>10.0f} {args.rows / blocks_time:>10.0f} "
+                  f"{args.rows / feed_time:>12.0f}  {tables == expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark: sequential vs. process-pool parsing of a large synthetic inventory.
+
+Run from the repository root:
+    python -m benchmarks.bench_parallel_ingest --rows 2000000 --workers 1 2 4 8
+
+Only parsing and merging are timed (the SQLite write is the same single-threaded
+step for both). The merged tables are checked against the sequential parse."""
+
+import argparse
+import os
+import tempfile
+import time
+
+from tree_etl import read_inventory, create_sinks, create_keys, feed_row, build_tables
+from tree_parallel import parse_parallel
+from benchmarks.synthetic import write_inventory
+
+
+def parse_sequential(datafile):
+    sinks, keys = create_sinks(), create_keys()
+    for data in read_inventory(datafile):
+        feed_row(sinks, keys, data)
+    return sinks, keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datafile = write_inventory(os.path.join(tmp, "inventory.csv"), args.rows)
+
+        start = time.perf_counter()
+        expected = build_tables(*parse_sequential(datafile))
+        sequential_time = time.perf_counter() - start
+        print(f"{args.rows} rows, {os.cpu_count()} cores")
+        print(f"{'workers':>8} {'parse (s)':>10} {'speedup':>8}  identical")
+        print(f"{'seq':>8} {sequential_time:>10.3f} {1.0:>7.1f}x  -")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            tables = build_tables(*parse_parallel(datafile, workers))
+            parallel_time = time.perf_counter() - start
+            print(f"{workers:>8} {parallel_time:>10.3f} {sequential_time / parallel_time:>7.1f}x  {tables == expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark: process start-up time of the modules and the tree_cli commands.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --rows 5000 --repeat 5
+
+Every case runs in a fresh interpreter (best of --repeat wall times): importing
+each module on its own, tree_cli.py --help, and the tree_cli queries and nearest
+commands against a synthetic database. The modules that still load pandas or
+NumPy when imported are marked, so a heavy import that creeps back into a light
+module shows up here."""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from tree_etl import load_inventory
+from benchmarks.synthetic import write_inventory
+
+
+MODULES = ["tree_csv", "tree_db", "tree_pool", "tree_cache", "tree_queries", "tree_spatial", "tree_etl",
+           "tree_validate", "tree_refresh", "tree_streaming", "tree_parallel", "tree_service", "tree_cli",
+           "MiniProject2Normalization_HalleBryant", "MiniProject2Queries", "MiniProject3Visualizations",
+           "tree_loader", "tree_priority"]
+
+
+def best_time(command, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def loads_heavy(module):
+    # True if importing module loads pandas or NumPy
+    code = f"import sys, {module}; print(any(name in sys.modules for name in ('pandas', 'numpy')))"
+    return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.strip() == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "BuffaloTrees.db")
+        load_inventory(write_inventory(os.path.join(tmp, "inventory.csv"), args.rows), database)
+
+        baseline = best_time([sys.executable, "-c", "pass"], args.repeat)
+        print(f"interpreter start-up {baseline * 1000:.0f} ms (included below)")
+        print(f"{'import':<40} {'ms':>6}  pandas/NumPy")
+        for module in MODULES:
+            elapsed = best_time([sys.executable, "-c", f"import {module}"], args.repeat)
+            print(f"{module:<40} {elapsed * 1000:>6.0f}  {'yes' if loads_heavy(module) else ''}")
+
+        print(f"{'command':<40} {'ms':>6}")
+        commands = {"tree_cli.py --help": ["--help"],
+                    "tree_cli.py queries": ["queries", database],
+                    "tree_cli.py nearest": ["nearest", database, "42.90", "-78.85", "-k", "5"]}
+        for name, command in commands.items():
+            elapsed = best_time([sys.executable, "tree_cli.py", *command], args.repeat)
+            print(f"{name:<40} {elapsed * 1000:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
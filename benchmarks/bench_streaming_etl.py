@@ -0,0 +1,84 @@
+"""Benchmark: step1-step11 normalization vs. the single-pass loader in tree_etl.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming_etl --sizes 1000 2000 4000 8000
+
+For every size a synthetic inventory is generated, the database is built once with
+the step functions and once with tree_etl.load_inventory, the timings are printed
+and the two databases are compared table by table. Both sides build only the eight
+normalized tables; the indexes, summary tables, SiteFacts and SiteLocations that
+load_inventory adds by default (tree_etl.build_derived_tables) are timed on their
+own, in the "derived" column."""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import MiniProject2Normalization_HalleBryant as steps
+from tree_db import TABLE_ORDER
+from tree_db import create_connection
+from tree_etl import load_inventory, build_derived_tables
+from tree_options import LOAD_MODES, DEFAULT_LOAD_MODE
+from benchmarks.synthetic import write_inventory
+
+
+def run_steps(datafile, database):
+    steps.step1_create_councildistricts_table(datafile, database)
+    steps.step3_create_addresses_table(datafile, database)
+    steps.step5_create_sites_table(datafile, database)
+    steps.step6_create_species_table(datafile, database)
+    steps.step8_create_sitespecies_table(datafile, database)
+    steps.step9_create_measurements_table(datafile, database)
+    steps.step10_create_environmentalbenefits_table(datafile, database)
+    steps.step11_create_economicbenefits_table(datafile, database)
+
+
+def dump_tables(database):
+    conn = sqlite3.connect(database)
+    tables = {table: conn.execute(f"SELECT * FROM [{table}] ORDER BY rowid").fetchall() for table in TABLE_ORDER}
+    conn.close()
+    return tables
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def build_derived(database):
+    conn = create_connection(database)
+    build_derived_tables(conn)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4000, 8000])
+    parser.add_argument("--load-mode", default=DEFAULT_LOAD_MODE, choices=list(LOAD_MODES))
+    parser.add_argument("--skip-steps", action="store_true", help="only time the single-pass loader")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'steps (s)':>12} {'single pass (s)':>16} {'speedup':>8} {'derived (s)':>12}  identical")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.sizes:
+            datafile = write_inventory(os.path.join(tmp, f"inventory_{n_rows}.csv"), n_rows)
+            steps_db = os.path.join(tmp, f"steps_{n_rows}.db")
+            single_db = os.path.join(tmp, f"single_{n_rows}.db")
+
+            single_time = timed(load_inventory, datafile, single_db, 50000, args.load_mode, build_derived=False)
+            derived_time = timed(build_derived, single_db)
+            if args.skip_steps:
+                print(f"{n_rows:>10} {'-':>12} {single_time:>16.3f} {'-':>8} {derived_time:>12.3f}  -")
+                continue
+
+            steps_time = timed(run_steps, datafile, steps_db)
+            identical = dump_tables(steps_db) == dump_tables(single_db)
+            print(f"{n_rows:>10} {steps_time:>12.3f} {single_time:>16.3f} {steps_time / single_time:>7.1f}x "
+                  f"{derived_time:>12.3f}  {identical}")
+
+
+if __name__ == "__main__":
+    main()
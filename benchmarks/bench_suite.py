@@ -0,0 +1,240 @@
+"""Benchmark suite: every normalization step, query and chart on synthetic inventories.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite --sizes 10k 133k
+    python -m benchmarks.bench_suite --sizes 10k 133k --output results.json
+
+For every size (10k, 133k, 1M, 10M or a plain number of rows) a raw inventory with
+missing cells is generated (benchmarks.synthetic) in a temporary directory and timed:
+    normalize/clean          tree_validate.clean_inventory, the dropna step
+    normalize/step1-step11   the step functions of MiniProject2Normalization_HalleBryant
+                             on the cleaned CSV (sizes up to --max-step-rows only)
+    normalize/single_pass    tree_etl.load_inventory
+    pipeline/<stage>         tree_pipeline on a new database (the first table stage
+                             includes the parse), then pipeline/rerun with nothing stale
+    sql/query1-query6        the tree_queries functions, result cache emptied first
+    pandas/load_frames       MiniProject3Visualizations.load_frames
+    pandas/query1-query6     MiniProject3Visualizations.PANDAS_QUERIES
+    charts/<chart>           MiniProject3Visualizations.CHART_DATA (no drawing)
+Builds run once (so they are noisier), queries and chart data are the best of
+--repeat runs. The results (seconds per timing per size, with the machine and
+commit) are written as JSON to --output and/or --save-baseline. They are compared
+against --baseline (benchmarks/baseline.json by default): a timing that is more than
+--threshold slower than the baseline and at least --min-delta seconds slower is
+flagged as a regression, and the exit status is 1 if there are any. Baselines only
+compare on the same machine, so none is committed; when the baseline file does not
+exist yet, the first run saves its results there (and says so) instead. Whatever
+the loaders and the pipeline print while they are timed is discarded, so stdout
+holds only the results.
+
+The loaders keep every table in memory until it is written, so 10M rows needs
+tens of GB of RAM and about 10 GB of disk in --work-dir."""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import MiniProject2Normalization_HalleBryant as steps
+import MiniProject3Visualizations as charts
+import tree_queries
+from tree_etl import load_inventory
+from tree_pipeline import run_pipeline
+from tree_pool import close_pools
+from tree_validate import clean_inventory
+from benchmarks.synthetic import PROFILES, write_inventory
+
+
+SIZES = {"10k": 10000, "133k": 133000, "1M": 1000000, "10M": 10000000}
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+## (name, function, takes the datafile) in the order the script runs them
+STEPS = [
+    ("step1", steps.step1_create_councildistricts_table, True),
+    ("step2", steps.step2_create_district_to_districtid_dict, False),
+    ("step3", steps.step3_create_addresses_table, True),
+    ("step4", steps.step4_create_address_to_addressid_dict, False),
+    ("step5", steps.step5_create_sites_table, True),
+    ("step6", steps.step6_create_species_table, True),
+    ("step7", steps.step7_create_species_to_speciesid_dict, False),
+    ("step8", steps.step8_create_sitespecies_table, True),
+    ("step9", steps.step9_create_measurements_table, True),
+    ("step10", steps.step10_create_environmentalbenefits_table, True),
+    ("step11", steps.step11_create_economicbenefits_table, True),
+]
+
+SQL_QUERIES = {
+    "query1": lambda database: tree_queries.benefit_averages(database),
+    "query2": lambda database: tree_queries.total_yearly_benefits(database),
+    "query3": lambda database: tree_queries.vacant_site_count(database),
+    "query4": lambda database: tree_queries.active_sites_by_district(database, ["Ellicott", "Delaware"]),
+    "query5": lambda database: tree_queries.top_species(database),
+    "query6": lambda database: tree_queries.top_pollutant_sites(database),
+}
+
+
+def parse_size(text):
+    if text in SIZES:
+        return SIZES[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size must be one of {', '.join(SIZES)} or a number of rows") from None
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def best_of(repeat, func, *args, before=None):
+    # Fastest of repeat calls; before() runs untimed ahead of each one
+    best = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        seconds, result = timed(func, *args)
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def run_size(n_rows, work_dir, repeat, max_step_rows, profile, seed):
+    # {timing name: seconds} of one inventory size
+    results = {}
+    paths = {name: os.path.join(work_dir, name) for name in
+             ["raw_inventory.csv", "inventory.csv", "rejects.csv", "steps.db", "single.db", "pipeline.db"]}
+
+    results["setup/generate"], _ = timed(write_inventory, paths["raw_inventory.csv"], n_rows, seed, profile, 0.02)
+    results["normalize/clean"], _ = timed(clean_inventory, paths["raw_inventory.csv"], paths["inventory.csv"],
+                                          paths["rejects.csv"])
+
+    if n_rows <= max_step_rows:
+        for name, step, takes_datafile in STEPS:
+            args = (paths["inventory.csv"], paths["steps.db"]) if takes_datafile else (paths["steps.db"], )
+            results["normalize/" + name], _ = timed(step, *args)
+    results["normalize/single_pass"], _ = timed(load_inventory, paths["inventory.csv"], paths["single.db"])
+
+    pipeline_paths = {"data_dir": work_dir, "raw_inventory": paths["raw_inventory.csv"],
+                      "inventory": paths["inventory.csv"], "rejects": paths["rejects.csv"],
+                      "database": paths["pipeline.db"]}
+    for stage, ran, seconds in run_pipeline(pipeline_paths):
+        results["pipeline/" + stage] = seconds
+    results["pipeline/rerun"], _ = timed(run_pipeline, pipeline_paths)
+
+    database = paths["pipeline.db"]
+    for name, query in SQL_QUERIES.items():
+        results["sql/" + name], _ = best_of(repeat, query, database, before=tree_queries.configure_result_cache)
+
+    results["pandas/load_frames"], (site_facts, district_summary) = best_of(repeat, charts.load_frames, database)
+    query1_join = charts.inhabited_sites(site_facts)
+    for name, query in charts.PANDAS_QUERIES.items():
+        results["pandas/" + name], _ = best_of(repeat, query, site_facts, query1_join)
+
+    queries = charts.pandas_queries(site_facts)
+    for name, prepare in charts.CHART_DATA.items():
+        results["charts/" + name], _ = best_of(repeat, prepare, site_facts, district_summary, queries)
+
+    close_pools()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_delta):
+    # [(size, name, baseline seconds, seconds)] of the timings that regressed
+    regressions = []
+    for size, timings in results.items():
+        for name, seconds in timings.items():
+            if name.startswith("setup/"): # the generator, not the code under test
+                continue
+            before = baseline.get(size, {}).get(name)
+            if before is not None and seconds > before * (1 + threshold) and seconds - before >= min_delta:
+                regressions.append((size, name, before, seconds))
+    return regressions
+
+
+def print_results(results, baseline):
+    for size, timings in results.items():
+        print(f"{int(size):,} rows")
+        for name, seconds in timings.items():
+            before = baseline.get(size, {}).get(name)
+            change = f"{(seconds / before - 1) * 100:>+8.1f}%" if before else ""
+            print(f"    {name:<26} {seconds:>10.4f}s {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[10000, 133000],
+                        help=f"{', '.join(SIZES)} or numbers of rows (default: 10k 133k)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-step-rows", type=int, default=1000000, help="largest size the step functions run on")
+    parser.add_argument("--profile", default="citywide", choices=PROFILES)
+    parser.add_argument("--seed", type=int, default=503)
+    parser.add_argument("--work-dir", help="where the inventories and databases are written (default: temp)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="JSON results to compare against, created by the first run (default: %(default)s)")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown flagged as a regression (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="ignore slowdowns below this many seconds")
+    args = parser.parse_args()
+
+    baseline, first_run = {}, not os.path.exists(args.baseline)
+    if first_run:
+        args.save_baseline = args.save_baseline or args.baseline # these results become the baseline
+    else:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    for n_rows in args.sizes:
+        with tempfile.TemporaryDirectory(dir=args.work_dir) as work_dir, open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull): # the loaders' and the pipeline's reports
+                results[str(n_rows)] = run_size(n_rows, work_dir, args.repeat, args.max_step_rows, args.profile,
+                                                args.seed)
+
+    report = {
+        "meta": {"created": datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "repeat": args.repeat, "profile": args.profile, "seed": args.seed},
+        "results": results,
+    }
+    print_results(results, baseline)
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    if not first_run:
+        report["baseline"] = args.baseline
+        report["regressions"] = [{"rows": int(size), "name": name, "baseline": before, "seconds": seconds}
+                                 for size, name, before, seconds in regressions]
+        for size, name, before, seconds in regressions:
+            print(f"REGRESSION {int(size):,} rows {name}: {before:.4f}s -> {seconds:.4f}s "
+                  f"({(seconds / before - 1) * 100:+.0f}%)")
+        if not regressions:
+            print(f"no regressions against {args.baseline} (threshold {args.threshold:.0%})")
+
+    for path in [args.output, args.save_baseline]:
+        if path:
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2)
+    if first_run:
+        print(f"no baseline at {args.baseline} yet: saved these results as the baseline in {args.save_baseline}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
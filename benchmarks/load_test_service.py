@@ -0,0 +1,127 @@
+"""Load test for tree_service: many concurrent keep-alive clients against the HTTP API.
+
+Run from the repository root, against a running service:
+    python -m benchmarks.load_test_service --port 8503 --clients 50 --requests 20000
+
+or let it load a synthetic database and start the service itself:
+    python -m benchmarks.load_test_service --rows 100000 --clients 50 --requests 20000
+
+Every client keeps one connection open and sends requests from a mix of the
+endpoints (repeated report queries plus spatial lookups around random points) as
+fast as the answers come back. Requests/sec, latency percentiles, status codes and
+the service's own coalescing and cache counters are printed."""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from tree_etl import load_inventory
+from benchmarks.synthetic import DISTRICTS, write_inventory
+
+
+def request_mix(rng):
+    # A GET target from the dashboard-like mix
+    kind = rng.random()
+    if kind < 0.5:
+        return rng.choice(["/benefit-averages", "/total-benefits", "/vacancy", "/district-sites",
+                           "/top-species?n=10", f"/district-sites?district={rng.choice(DISTRICTS)}",
+                           f"/benefit-averages?district={rng.choice(DISTRICTS)}"])
+    lat, lon = round(rng.uniform(42.83, 42.96), 3), round(rng.uniform(-78.90, -78.79), 3)
+    if kind < 0.8:
+        return f"/sites/nearest?lat={lat}&lon={lon}&k=5"
+    return f"/sites/within?lat={lat}&lon={lon}&radius_m=100"
+
+
+async def fetch(reader, writer, host, target):
+    # (status, body) of one keep-alive GET
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, n_requests, seed, latencies, statuses):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            status, _ = await fetch(reader, writer, host, request_mix(rng))
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, clients, requests):
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, requests // clients + (i < requests % clients), i, latencies, statuses)
+                           for i in range(clients)])
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, body = await fetch(reader, writer, host, "/stats")
+    writer.close()
+    return elapsed, sorted(latencies), statuses, json.loads(body)
+
+
+def start_service(database, port, workers):
+    process = subprocess.Popen([sys.executable, "tree_service.py", database, "--port", str(port),
+                                "--workers", str(workers)], stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline() # "Serving ... on http://host:port" once it listens
+    if not line:
+        raise RuntimeError("tree_service did not start")
+    return process, int(line.rsplit(":", 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8503)
+    parser.add_argument("--rows", type=int, help="start a service on a synthetic database of this many rows")
+    parser.add_argument("--workers", type=int, default=4, help="service threads when --rows starts it")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        port = args.port
+        if args.rows:
+            database = os.path.join(tmp, "BuffaloTrees.db")
+            load_inventory(write_inventory(os.path.join(tmp, "inventory.csv"), args.rows), database)
+            process, port = start_service(database, 0, args.workers)
+        try:
+            elapsed, latencies, statuses, stats = asyncio.run(load_test(args.host, port, args.clients, args.requests))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.2f} s: {len(latencies) / elapsed:.0f} req/s")
+    print(f"latency ms  p50 {percentile(50):.1f}  p95 {percentile(95):.1f}  p99 {percentile(99):.1f}  "
+          f"max {latencies[-1] * 1000:.1f}")
+    print(f"status codes {statuses}")
+    print(f"service {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Synthetic Buffalo-style tree inventories for the benchmarks.
+
+Writes an inventory CSV with the same 28 columns (and column positions) as
+Tree_Inventory_reduced.csv, so the step functions and the loaders can run on any
+number of rows without the real OpenData export.
+
+The distributions are taken from the 10,000-site sample in BuffaloTreesNormalizedDB.db:
+    - each district's bounding box, and the vacancy rate of Delaware, University and
+      Ellicott (the other six districts have fewer than 30 sample sites each and get
+      the overall rate, 37.5%);
+    - the 45 most common species with their relative frequencies and mean DBH (the
+      rest of the sample is spread over a tail of rarer species), plus stumps and
+      unsuitable sites, which count as inhabited but have no species;
+    - DBH drawn from a gamma distribution around the species mean, and every benefit
+      proportional to DBH (per-inch rates fitted on the sample), with the total
+      yearly benefit the sum of the five dollar benefits;
+    - about 1.35 sites per address and 93% of sites numbered 1 at their address.
+profile="citywide" (the default) spreads the sites evenly over the nine council
+districts; profile="sample" reproduces the sample's mix, which is 64% Delaware and
+30% University because the sample is the first 10,000 rows of the export.
+
+write_inventory(..., missing_rate=0.02) leaves a cell empty in about 2% of the rows
+and writes an unparseable DBH in a few more, as a raw export for tree_validate and
+the pipeline's clean stage."""
+
+import random
+from itertools import accumulate
+
+
+HEADER = ["Editing", "Botanical Name", "Common Name", "DBH", "Total Yearly Eco Benefits ($)",
+          "Stormwater Benefits ($)", "Stormwater Gallons Saved", "Greenhouse CO2 Benefits ($)",
+          "CO2 Avoided (in lbs.)", "CO2 Sequestered (in lbs.)", "Energy Benefits ($)", "kWh Saved",
+          "Therms Saved", "Air Quality Benefits ($)", "Pollutants Saved (in lbs.)", "Property Benefits ($)",
+          "Leaf Surface Area (in sq. ft.)", "Address", "Street", "Side", "Site", "Council District",
+          "Park Name", "Latitude", "Longitude", "Site ID", "Location", "Neighborhood"]
+
+DISTRICTS = ["Delaware", "Ellicott", "Fillmore", "Lovejoy", "Masten", "Niagara", "North", "South", "University"]
+
+## district -> (sample sites, vacancy rate, (min lat, max lat, min lon, max lon))
+DISTRICT_PROFILES = {
+    "Delaware": (6403, 0.311, (42.919, 42.959, -78.895, -78.832)),
+    "Ellicott": (476, 0.489, (42.872, 42.922, -78.879, -78.815)),
+    "Fillmore": (20, 0.375, (42.866, 42.906, -78.884, -78.815)),
+    "Lovejoy": (9, 0.375, (42.854, 42.925, -78.828, -78.801)),
+    "Masten": (12, 0.375, (42.912, 42.938, -78.863, -78.814)),
+    "Niagara": (21, 0.375, (42.896, 42.927, -78.895, -78.879)),
+    "North": (12, 0.375, (42.935, 42.963, -78.903, -78.871)),
+    "South": (26, 0.375, (42.832, 42.858, -78.852, -78.804)),
+    "University": (3021, 0.477, (42.923, 42.959, -78.841, -78.799)),
+}
+
+PROFILES = ["citywide", "sample"]
+
+## (botanical name, common name, sample sites, mean DBH); the raw export keeps cultivars
+##after a "'" in both names, which the loaders cut off
+SPECIES = [
+    ("ACER PLATANOIDES 'CRIMSON KING'", "MAPLE CRIMSON KING", 1184, 13.8),
+    ("TILIA CORDATA 'GREENSPIRE'", "LINDEN GREENSPIRE", 754, 17.1),
+    ("ACER SACCHARINUM", "MAPLE SILVER", 392, 26.1),
+    ("ACER RUBRUM 'RED SUNSET'", "MAPLE RED SUNSET", 209, 11.1),
+    ("ACER CAMPESTRE", "MAPLE HEDGE", 204, 12.3),
+    ("TILIA X EUCHLORA", "LINDEN CRIMEAN", 190, 15.1),
+    ("SYRINGA RETICULATA", "LILAC JAPANESE TREE", 189, 3.6),
+    ("ACER X FREEMANII", "MAPLE FREEMAN", 187, 13.1),
+    ("ULMUS CARPINIFOLIA 'CHRISTINE BUISMAN'", "ELM CHRISTINE BUISMAN", 166, 21.0),
+    ("QUERCUS BICOLOR", "OAK SWAMP WHITE", 151, 8.2),
+    ("GLEDITSIA TRIACANTHOS 'IMPERIAL'", "HONEYLOCUST IMPERIAL", 133, 14.0),
+    ("PLATANUS X ACERIFOLIA 'EXCLAMATION'", "LONDON PLANETREE EXCLAMATION", 125, 6.8),
+    ("GYMNOCLADUS DIOICUS 'ESPRESSO'", "KENTUCKY COFFEE TREE ESPRESSO", 107, 6.1),
+    ("MALUS SPP", "CRABAPPLE", 104, 6.8),
+    ("PYRUS CALLERYANA", "PEAR CALLERY", 90, 12.1),
+    ("ZELKOVA SERRATA 'GREEN VASE'", "ZELKOVA GREEN VASE", 87, 6.6),
+    ("QUERCUS RUBRA", "OAK NORTHERN RED", 86, 6.3),
+    ("GLEDITSIA TRIACANTHOS INERMIS", "HONEYLOCUST THORNLESS", 86, 4.1),
+    ("GINKGO BILOBA 'PRINCETON SENTRY'", "GINKGO PRINCETON SENTRY", 72, 6.9),
+    ("ACER PSEUDOPLATANUS", "MAPLE SYCAMORE", 70, 13.8),
+    ("MALUS 'PURPLE PRINCE'", "CRABAPPLE PURPLE PRINCE", 68, 2.8),
+    ("CELTIS OCCIDENTALIS", "HACKBERRY", 67, 6.3),
+    ("CERCIDIPHYLLUM JAPONICUM", "KATSURATREE", 65, 8.8),
+    ("PICEA PUNGENS", "SPRUCE COLORADO BLUE", 61, 13.4),
+    ("AESCULUS HIPPOCASTANUM", "HORSECHESTNUT COMMON", 59, 16.7),
+    ("PRUNUS SPP", "CHERRY SPECIES", 57, 9.8),
+    ("CRATAEGUS SPP", "HAWTHORN SPECIES", 46, 10.1),
+    ("PRUNUS SERRULATA 'KWANZAN'", "CHERRY KWANZAN", 44, 11.3),
+    ("CERCIS CANADENSIS", "REDBUD", 31, 6.0),
+    ("AESCULUS X CARNEA", "HORSECHESTNUT RED", 30, 3.9),
+    ("ULMUS GLABRA", "ELM SCOTCH", 29, 32.3),
+    ("OSTRYA VIRGINIANA", "HOPHORNBEAM AMERICAN", 28, 9.8),
+    ("STYPHNOLOBIUM JAPONICUM", "JAPANESE PAGODATREE", 27, 3.4),
+    ("AMELANCHIER X GRANDIFLORA 'PRINCESS DIANA'", "SERVICEBERRY PRINCESS DIANA", 26, 2.8),
+    ("ACER MIYABEI 'STATE STREET'", "MAPLE STATE STREET", 24, 3.6),
+    ("Ulmus x spp.", "triumph elm", 23, 2.4),
+    ("QUERCUS ROBUR 'SKYROCKET'", "OAK SKYROCKET ENGLISH", 21, 5.0),
+    ("PRUNUS SARGENTII", "CHERRY SARGENT", 21, 4.9),
+    ("ACER SACCHARUM", "MAPLE SUGAR", 20, 14.4),
+    ("ULMUS JAPONICA X WILSONIANA 'ACCOLADE'", "ELM ACCOLADE", 18, 4.8),
+    ("ULMUS JAPONICA X PUMILA X WILSONIANA", "ELM TRIUMPH", 18, 5.9),
+    ("FRAXINUS AMERICANA", "ASH WHITE", 18, 13.9),
+    ("ULMUS X", "ELM HYBRID", 17, 8.7),
+    ("ULMUS PARVIFOLIA", "ELM LACEBARK", 17, 10.3),
+]
+TAIL_SPECIES = 110 # rarer species sharing the sample's remaining 577 sites
+TAIL_SITES = 577
+
+## Inhabited sites without a species (the sample has 247 of them)
+NO_SPECIES_SITES = [("STUMP", "STUMP", 150), ("UNSUITABLE VACANT", "UNSUITABLE VACANT", 70),
+                    ("STUMP OBSTRUCTED", "STUMP OBSTRUCTED", 27)]
+
+## (HEADER index, benefit per inch of DBH) of columns 5-16, from the sample's sums;
+##column 4, the total, is the sum of the dollar benefits
+BENEFIT_RATES = [(5, 0.5329), (6, 66.6173), (7, 0.045), (8, 8.809), (9, 6.8425), (10, 3.6705), (11, 5.5513),
+                 (12, 2.0545), (13, 0.3693), (14, 0.0597), (15, 3.6302), (16, 6.0333)]
+DOLLAR_COLUMNS = [5, 7, 10, 13, 15]
+
+PARKS = ["Delaware Park", "Cazenovia Park", "South Park", "Martin Luther King Jr. Park", "Front Park",
+         "Riverside Park", "Shoshone Park"]
+
+STREET_NAMES = ["Admiral", "Amherst", "Bailey", "Bird", "Broadway", "Chenango", "Colvin", "Court", "Delavan",
+                "Delaware", "Dewitt", "East", "Elmwood", "Englewood", "Fillmore", "Forest", "Genesee", "Grant",
+                "Hertel", "Hoyt", "Jefferson", "Kenmore", "Lafayette", "Linwood", "Main", "Niagara", "Parkside",
+                "Potomac", "Richmond", "Seneca", "Tonawanda", "Utica", "Virginia", "West", "Woodward"]
+STREET_TYPES = ["St", "Ave", "Rd", "Pl", "Pkwy", "Dr", "Blvd", "Ct"]
+
+
+def district_weights(profile):
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile {profile!r}, expected one of {PROFILES}")
+    if profile == "sample":
+        return [DISTRICT_PROFILES[district][0] for district in DISTRICTS]
+    return [1] * len(DISTRICTS)
+
+
+def species_table(rng):
+    # [(botanical, common, mean DBH)] and their weights, with the tail of rare species
+    species = [(botanical, common, dbh) for botanical, common, sites, dbh in SPECIES]
+    weights = [sites for botanical, common, sites, dbh in SPECIES]
+    for i in range(TAIL_SPECIES):
+        species.append((f"SPECIES {i + 1:03d}", f"TREE {i + 1:03d}", round(rng.uniform(3, 20), 1)))
+        weights.append(TAIL_SITES / TAIL_SPECIES)
+    for botanical, common, sites in NO_SPECIES_SITES:
+        species.append((botanical, common, 0.0))
+        weights.append(sites)
+    return species, weights
+
+
+def district_streets(n_rows, rng):
+    # {district: street names}; the pool grows with the inventory so a large one
+    # still has about 1.35 sites per address
+    per_district = min(400, 40 + n_rows // 2500)
+    names = []
+    for i in range(per_district * len(DISTRICTS)):
+        series = i // len(STREET_NAMES)
+        name = f"{STREET_NAMES[i % len(STREET_NAMES)]} {STREET_TYPES[series % len(STREET_TYPES)]}"
+        names.append(name if series < len(STREET_TYPES) else f"{name} {series // len(STREET_TYPES) + 1}")
+    rng.shuffle(names)
+    return {district: names[i * per_district:(i + 1) * per_district] for i, district in enumerate(DISTRICTS)}
+
+
+def generate_rows(n_rows, seed=503, profile="citywide", missing_rate=0.0):
+    rng = random.Random(seed)
+    species, species_weights = species_table(rng)
+    streets = district_streets(n_rows, rng)
+    species_weights = list(accumulate(species_weights))
+    weights = list(accumulate(district_weights(profile)))
+    building_numbers = max(50, int(1.5 * n_rows / (len(DISTRICTS) * len(streets[DISTRICTS[0]]))))
+
+    for siteid in range(1, n_rows + 1):
+        district = rng.choices(DISTRICTS, cum_weights=weights)[0]
+        sample_sites, vacancy, (min_lat, max_lat, min_lon, max_lon) = DISTRICT_PROFILES[district]
+        if rng.random() < vacancy:
+            botanical, common, dbh = "VACANT", "VACANT", 0.0
+        else:
+            botanical, common, mean_dbh = rng.choices(species, cum_weights=species_weights)[0]
+            dbh = round(min(rng.gammavariate(2.0, mean_dbh / 2.0), 140.0), 1) if mean_dbh else 0.0
+
+        row = ["No", botanical, common, dbh] + [0.0] * 13
+        for column, rate in BENEFIT_RATES:
+            row[column] = round(dbh * rate * rng.uniform(0.7, 1.3), 2)
+        row[4] = round(sum(row[column] for column in DOLLAR_COLUMNS), 2)
+
+        lat = round(rng.uniform(min_lat, max_lat), 8)
+        lon = round(rng.uniform(min_lon, max_lon), 8)
+        site = 1 if rng.random() < 0.93 else rng.randint(2, 7)
+        park = rng.choice(PARKS) if rng.random() < 0.03 else "Street Tree"
+        row += ["{}.0".format(rng.randint(1, building_numbers)), rng.choice(streets[district]),
+                rng.choice(["Front", "Side", "Median", "Rear"]), site, district, park, lat, lon, siteid,
+                "POINT ({} {})".format(lon, lat), district]
+
+        if missing_rate and rng.random() < missing_rate:
+            row[rng.randrange(1, len(row) - 1)] = ""
+        elif missing_rate and rng.random() < missing_rate / 10:
+            row[3] = "unknown"
+        yield row
+
+
+def write_inventory(path, n_rows, seed=503, profile="citywide", missing_rate=0.0):
+    with open(path, "w") as file:
+        file.write(",".join(HEADER) + "\n")
+        for row in generate_rows(n_rows, seed, profile, missing_rate):
+            file.write(",".join(str(value) for value in row) + "\n")
+
+    return path
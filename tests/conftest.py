@@ -0,0 +1,39 @@
+"""Shared fixtures: small synthetic inventories (benchmarks.synthetic) and databases
+loaded from them, all in pytest's temporary directories."""
+
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import HEADER, write_inventory  # noqa: E402
+from tree_etl import load_inventory  # noqa: E402
+from tree_pool import close_pools  # noqa: E402
+
+
+N_ROWS = 1000
+
+
+def write_rows(path, rows):
+    # An inventory CSV of rows (lists in HEADER's column order)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture(scope="session")
+def inventory(tmp_path_factory):
+    return write_inventory(str(tmp_path_factory.mktemp("inventory") / "inventory.csv"), N_ROWS)
+
+
+@pytest.fixture
+def database(inventory, tmp_path):
+    path = str(tmp_path / "trees.db")
+    load_inventory(inventory, path)
+    yield path
+    close_pools(path)
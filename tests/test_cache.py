@@ -0,0 +1,64 @@
+import os
+import sqlite3
+
+import pytest
+
+from tree_cache import ResultCache, database_id
+
+
+SQL = "SELECT COUNT(*) FROM Sites WHERE SiteStatus = ?"
+
+
+def add_vacant_site(conn):
+    conn.execute("INSERT INTO Sites SELECT MAX(SiteID) + 1, SiteNumber, 'Vacant', Latitude, Longitude, AddressID "
+                 "FROM Sites")
+    conn.commit()
+
+
+def test_results_are_reused_until_the_database_changes(database):
+    cache = ResultCache()
+    conn = sqlite3.connect(database)
+    (before, ), = cache.fetch(conn, database, SQL, ("Vacant", ))
+    assert cache.fetch(conn, database, SQL, ("Vacant", )) == [(before, )]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    add_vacant_site(conn)
+    assert cache.fetch(conn, database, SQL, ("Vacant", )) == [(before + 1, )]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 1 # the old version's entry was dropped
+    conn.close()
+
+
+def test_result_files_are_shared_and_invalidated(database, tmp_path):
+    pytest.importorskip("pyarrow")
+    cache_dir = str(tmp_path / "cache")
+    os.makedirs(cache_dir)
+    other_file = os.path.join(cache_dir, "notes.arrow") # not one of the cache's files
+    open(other_file, "w").close()
+
+    conn = sqlite3.connect(database)
+    rows = ResultCache(cache_dir=cache_dir).fetch(conn, database, SQL, ("Vacant", ))
+    written = [name for name in os.listdir(cache_dir) if name.startswith(database_id(os.path.abspath(database)))]
+    assert len(written) == 1
+
+    warm = ResultCache(cache_dir=cache_dir) # a later process starts warm
+    assert warm.fetch(conn, database, SQL, ("Vacant", )) == rows
+    assert warm.hits == 1
+
+    add_vacant_site(conn)
+    assert warm.fetch(conn, database, SQL, ("Vacant", )) == [(rows[0][0] + 1, )]
+    remaining = sorted(os.listdir(cache_dir))
+    assert written[0] not in remaining # the old version's file
+    assert "notes.arrow" in remaining
+    conn.close()
+
+
+def test_prune_keeps_the_most_recent_files(database, tmp_path):
+    pytest.importorskip("pyarrow")
+    cache_dir = str(tmp_path / "cache")
+    cache = ResultCache(cache_dir=cache_dir, max_files=2)
+    conn = sqlite3.connect(database)
+    for status in ["Vacant", "Inhabited", "Stump", "Unknown"]:
+        cache.fetch(conn, database, SQL, (status, ))
+    conn.close()
+    assert len(cache.cache_files()) == 2
@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from benchmarks.synthetic import generate_rows
+from tree_etl import load_inventory
+from tree_refresh import refresh_inventory
+
+from conftest import N_ROWS, write_rows
+
+
+SITE_COLUMNS = """SELECT SiteID, SiteStatus, District, Street, BuildingNo, BotanicalName, CommonName,
+                  DiameterBreastHeight, CO2Avoided, TotalYearlyBenefits FROM SiteFacts ORDER BY SiteID"""
+
+DISTRICT_COLUMNS = "SELECT District, ActiveSites, VacantSites, TotalYearlyBenefits FROM DistrictSummary ORDER BY District"
+
+
+def snapshot_rows(changed=5, added=3):
+    # The inventory fixture's rows with the yearly benefits of the first changed sites
+    # raised and added new sites appended
+    rows = list(generate_rows(N_ROWS))
+    for row in rows[:changed]:
+        row[4] = round(row[4] + 10.0, 2)
+    for siteid, row in enumerate(generate_rows(added, seed=1), N_ROWS + 1):
+        row[25] = siteid
+        rows.append(row)
+    return rows
+
+
+def fetch(database, sql):
+    conn = sqlite3.connect(database)
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    return rows
+
+
+def test_unchanged_snapshot_changes_nothing(inventory, database):
+    result = refresh_inventory(inventory, database, report=False)
+    assert all(counts == {"inserted": 0, "updated": 0} for counts in result["tables"].values())
+    assert result["status_changes"] == {}
+    assert result["not_in_snapshot"] == 0
+
+
+def test_refresh_applies_only_the_deltas(database, tmp_path):
+    snapshot = write_rows(str(tmp_path / "snapshot.csv"), snapshot_rows(changed=5, added=3))
+    result = refresh_inventory(snapshot, database, report=False)
+
+    tables = result["tables"]
+    assert tables["Sites"] == {"inserted": 3, "updated": 0}
+    assert tables["EconomicBenefits"] == {"inserted": 3, "updated": 5}
+    assert tables["EnvironmentalBenefits"] == {"inserted": 3, "updated": 0}
+    assert result["not_in_snapshot"] == 0
+
+    # the derived tables match a full rebuild of the snapshot
+    rebuilt = str(tmp_path / "rebuilt.db")
+    load_inventory(snapshot, rebuilt)
+    assert fetch(database, SITE_COLUMNS) == fetch(rebuilt, SITE_COLUMNS)
+    for refreshed_row, rebuilt_row in zip(fetch(database, DISTRICT_COLUMNS), fetch(rebuilt, DISTRICT_COLUMNS)):
+        assert refreshed_row[:3] == rebuilt_row[:3]
+        assert refreshed_row[3] == pytest.approx(rebuilt_row[3])
+
+
+def test_refresh_of_a_missing_database_loads_it(inventory, tmp_path):
+    result = refresh_inventory(inventory, str(tmp_path / "new.db"), report=False)
+    assert result["tables"]["Sites"] == {"inserted": N_ROWS, "updated": 0}
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import tree_queries
+from tree_service import serve
+
+
+@pytest.fixture
+def service(database):
+    # Base URL of the service running on database in a background event loop
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    address = {}
+
+    def ready(host, port):
+        address["host"], address["port"] = host, port
+        started.set()
+
+    task = loop.create_task(serve(database, port=0, ready=ready))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    yield address
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+    loop.close()
+
+
+def request(address, path, method="GET"):
+    # (status, decoded JSON body)
+    url = f"http://{address['host']}:{address['port']}{path}"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=b"" if method == "POST" else None,
+                                                           method=method), timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def raw_request(address, data):
+    # Status code of the response to the raw bytes data
+    with socket.create_connection((address["host"], address["port"]), timeout=10) as conn:
+        conn.sendall(data)
+        return int(conn.recv(4096).split()[1])
+
+
+def test_endpoints_answer_like_the_query_functions(database, service):
+    status, body = request(service, "/vacancy")
+    assert status == 200
+    assert body == {"VacantSites": tree_queries.vacant_site_count(database)}
+
+    status, body = request(service, "/top-species?n=3")
+    assert status == 200 and len(body) == 3
+
+    status, body = request(service, "/sites/nearest?lat=42.9&lon=-78.85&k=4&status=Vacant")
+    assert status == 200 and len(body) == 4
+
+    status, body = request(service, "/stats")
+    assert status == 200 and body["requests"] >= 3
+
+
+@pytest.mark.parametrize("path, method, expected", [
+    ("/no-such-endpoint", "GET", 404),
+    ("/vacancy", "POST", 405),
+    ("/stats", "POST", 405),
+    ("/top-species?n=many", "GET", 400),
+    ("/sites/nearest?lat=42.9", "GET", 400),
+])
+def test_errors(service, path, method, expected):
+    status, body = request(service, path, method)
+    assert status == expected
+    assert "error" in body
+
+
+def test_malformed_requests_get_400(service):
+    assert raw_request(service, b"GET /vacancy HTTP/1.1\r\nContent-Length: abc\r\n\r\n") == 400
+    assert raw_request(service, b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n") == 400
+    assert raw_request(service, b"NONSENSE\r\n\r\n") == 400
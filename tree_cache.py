@@ -0,0 +1,197 @@
+"""Result cache for the analysis queries.
+
+Results are keyed by the SQL text, its parameters and the version of the database
+they were read from. The version is a SHA-1 of the file's cheap signature from
+tree_keymaps (inode, size, mtime, SQLite change counter and the -wal file's size and
+mtime), so a lookup costs one stat and a 28-byte header read and the database
+itself is never hashed. Any reload or refresh changes the signature, so every result
+cached for the old version stops matching and is dropped; so does copying or
+touching the file, which only costs a cold cache.
+
+PRAGMA data_version is not used because it only reports changes made by other
+connections to the one asking, not to a file between runs.
+
+ResultCache keeps the most recently used entries in memory (LRU) and can be shared
+by threads; the query itself runs outside its lock. Given a cache_dir it also writes
+each result to an Arrow IPC file named <database>-<version>-<key>.arrow, so a later
+process reading the same database version starts warm. That needs pyarrow, which is
+optional; without it the cache is memory-only. The files of a database's older
+versions are deleted the first time a process sees a new version, and the least
+recently used files beyond max_files or max_bytes are deleted after every write.
+Only files named like this cache's own are ever deleted, so cache_dir may be shared
+with other files.
+
+Usage:
+    cache = ResultCache(maxsize=256, cache_dir=".query_cache", max_files=1024, max_bytes=256 * 1024 * 1024)
+    rows = cache.fetch(conn, database, sql, params)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from tree_keymaps import database_signature
+
+
+MAX_FILES = 1024
+MAX_BYTES = 256 * 1024 * 1024
+
+## <database id>-<version>-<key>.arrow, see ResultCache.file_name
+FILE_NAME = re.compile(r"([0-9a-f]{16})-([0-9a-f]{40})-[0-9a-f]{40}\.arrow")
+
+
+def database_version(database):
+    # SHA-1 of the file signature, which changes whenever a write is committed
+    signature = database_signature(os.path.abspath(database))
+    return hashlib.sha1(json.dumps(signature).encode()).hexdigest()
+
+
+def database_id(path):
+    # Short name of a database path for the cache file names
+    return hashlib.sha1(path.encode()).hexdigest()[:16]
+
+
+def cache_key(version, sql, params):
+    text = json.dumps([version, " ".join(sql.split()), list(params)], default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, maxsize=256, cache_dir=None, max_files=MAX_FILES, max_bytes=MAX_BYTES):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # key -> (database path, rows)
+        self.current = {} # database path -> version its entries were cached for
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        if cache_dir is not None:
+            import pyarrow # noqa: F401  (fail early if persistence cannot work)
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, path=None, version=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[1]
+
+        rows = None
+        if self.cache_dir is not None and path is not None:
+            rows = self.read_file(self.file_name(path, version, key))
+            if rows is not None:
+                self.put(key, rows, path, persist=False)
+        return rows
+
+    def put(self, key, rows, path=None, version=None, persist=True):
+        with self.lock:
+            self.entries[key] = (path, rows)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        if persist and self.cache_dir is not None and path is not None:
+            self.write_file(self.file_name(path, version, key), rows)
+            self.prune_files()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current.clear()
+
+    def fetch(self, conn, database, sql, params=()):
+        # Returns the rows of sql on conn, from the cache when database is unchanged
+        path = os.path.abspath(database)
+        version = database_version(path)
+        with self.lock:
+            reloaded = self.current.get(path) != version
+            if reloaded:
+                # the database was reloaded: everything cached in memory for it is stale
+                for stale in [key for key, (entry_path, rows) in self.entries.items() if entry_path == path]:
+                    del self.entries[stale]
+                self.current[path] = version
+        if reloaded and self.cache_dir is not None:
+            self.remove_stale_files(path, version)
+
+        key = cache_key(version, sql, params)
+        rows = self.get(key, path, version)
+        with self.lock:
+            if rows is not None:
+                self.hits += 1
+                return rows
+            self.misses += 1
+
+        rows = conn.execute(sql, params).fetchall()
+        self.put(key, rows, path, version)
+        return rows
+
+    def file_name(self, path, version, key):
+        return os.path.join(self.cache_dir, f"{database_id(path)}-{version}-{key}.arrow")
+
+    def cache_files(self):
+        # [(path, stat)] of the result files in cache_dir; files deleted meanwhile are skipped
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if FILE_NAME.fullmatch(entry.name):
+                try:
+                    files.append((entry.path, entry.stat()))
+                except FileNotFoundError:
+                    pass
+        return files
+
+    def remove_stale_files(self, path, version):
+        # Deletes the files of path's other versions
+        path_id = database_id(path)
+        for name in os.listdir(self.cache_dir):
+            match = FILE_NAME.fullmatch(name)
+            if match and match.group(1) == path_id and match.group(2) != version:
+                remove_file(os.path.join(self.cache_dir, name))
+
+    def prune_files(self):
+        # Deletes the least recently used files beyond max_files or max_bytes
+        files = sorted(self.cache_files(), key=lambda item: item[1].st_mtime_ns, reverse=True)
+        total = 0
+        for count, (name, stat) in enumerate(files, 1):
+            total += stat.st_size
+            if count > self.max_files or total > self.max_bytes:
+                remove_file(name)
+
+    def read_file(self, name):
+        import pyarrow.ipc
+
+        try:
+            with pyarrow.memory_map(name) as source:
+                table = pyarrow.ipc.open_file(source).read_all()
+            os.utime(name) # recently used, see prune_files
+        except FileNotFoundError: # never written, or pruned by another process
+            return None
+        return list(zip(*(column.to_pylist() for column in table.columns))) if table.num_columns else []
+
+    def write_file(self, name, rows):
+        import pyarrow
+        import pyarrow.ipc
+
+        columns = list(zip(*rows)) if rows else []
+        try:
+            table = pyarrow.table({f"c{i}": list(column) for i, column in enumerate(columns)})
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            return # a column mixing types Arrow cannot hold; keep it in memory only
+        with pyarrow.OSFile(name + ".tmp", "wb") as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(name + ".tmp", name)
+
+
+def remove_file(name):
+    try:
+        os.remove(name)
+    except FileNotFoundError: # removed by another process
+        pass
@@ -0,0 +1,165 @@
+"""Command line entry point for the tree database tools.
+
+    python tree_cli.py load Tree_Inventory_reduced.csv BuffaloTrees.db --parser pyarrow
+    python tree_cli.py validate Tree_Inventory_reduced_notclean.csv BuffaloTrees.db
+    python tree_cli.py refresh Tree_Inventory_snapshot.csv BuffaloTrees.db
+    python tree_cli.py queries BuffaloTrees.db
+    python tree_cli.py nearest BuffaloTrees.db 42.90 -78.85 -k 5
+    python tree_cli.py export BuffaloTrees.db columnar
+    python tree_cli.py plot BuffaloTrees.db species pollution
+    python tree_cli.py serve BuffaloTrees.db --port 8503
+    python tree_cli.py pipeline --data-dir /srv/trees
+
+serve, stream, priorities, estimate, plans and pipeline hand their arguments to the
+__main__ of tree_service, tree_streaming, tree_priority, tree_estimates, tree_indexes
+and tree_pipeline.
+
+Every command imports what it needs when it runs, so the modules that pull in
+pandas, NumPy or the plotting stack are only loaded by the commands that use them
+and the others start in a few tens of milliseconds.
+"""
+
+import argparse
+import runpy
+import sys
+
+from tree_options import PARSERS, DEFAULT_PARSER, LOAD_MODES, DEFAULT_LOAD_MODE, EXPORT_FORMATS
+
+
+## Commands that run a module's own command line
+MODULE_COMMANDS = {
+    "serve": ("tree_service", "serve the analysis queries over local HTTP"),
+    "stream": ("tree_streaming", "bounded-memory query 1, 2, 3 and 5 over an inventory file"),
+    "priorities": ("tree_priority", "rank vacant sites and districts for planting"),
+    "estimate": ("tree_estimates", "estimate the benefits of planting every vacant site"),
+    "plans": ("tree_indexes", "print query 1-6 plans before and after indexing"),
+    "pipeline": ("tree_pipeline", "build the database, skipping the stages that are up to date"),
+}
+
+
+def load_command(args):
+    if args.workers > 1:
+        from tree_parallel import load_inventory_parallel
+        load_inventory_parallel(args.datafile, args.database, args.workers, load_mode=args.load_mode, report=True,
+                                parser=args.parser)
+    else:
+        from tree_etl import load_inventory
+        load_inventory(args.datafile, args.database, load_mode=args.load_mode, report=True, parser=args.parser)
+
+
+def validate_command(args):
+    from tree_validate import load_validated_inventory
+    load_validated_inventory(args.datafile, args.database, load_mode=args.load_mode, report=True)
+
+
+def refresh_command(args):
+    from tree_refresh import refresh_inventory
+    refresh_inventory(args.datafile, args.database)
+
+
+def queries_command(args):
+    from tree_queries import (benefit_averages, total_yearly_benefits, vacant_site_count, active_sites_by_district,
+                              top_species, top_pollutant_sites)
+
+    print("Query 1: average environmental benefits of inhabited sites")
+    for column, average in benefit_averages(args.database).items():
+        print(f"    {column:<24} {average}")
+    print(f"Query 2: total yearly benefits {total_yearly_benefits(args.database)}")
+    print(f"Query 3: vacant sites {vacant_site_count(args.database)}")
+    print("Query 4: inhabited sites by district")
+    for district, count in active_sites_by_district(args.database).items():
+        print(f"    {district:<24} {count}")
+    print(f"Query 5: top {args.top} species")
+    for botanical, common, count in top_species(args.database, args.top):
+        print(f"    {botanical:<30} {common:<30} {count}")
+    print(f"Query 6: top {args.top} pollutant-absorbing sites")
+    for common, saved in top_pollutant_sites(args.database, args.top):
+        print(f"    {common:<30} {saved}")
+
+
+def nearest_command(args):
+    from tree_spatial import nearest_sites
+    for siteid, lat, lon, status, distance in nearest_sites(args.database, args.lat, args.lon, args.k, args.status):
+        print(f"{siteid:>8} {lat:>12.8f} {lon:>13.8f} {status:<10} {distance:>9.1f} m")
+
+
+def export_command(args):
+    from tree_columnar import export_columnar
+    export_columnar(args.database, args.export_dir, args.format)
+
+
+def plot_command(args):
+    from MiniProject3Visualizations import CHARTS, show_charts # the plotting stack loads on the first chart
+    unknown = set(args.charts) - set(CHARTS)
+    if unknown:
+        raise SystemExit(f"unknown charts: {', '.join(sorted(unknown))} (expected {', '.join(CHARTS)})")
+    show_charts(args.charts, args.database)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tree_cli.py", description="Buffalo tree database tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("load", help="build the database from a cleaned inventory in one pass")
+    command.add_argument("datafile")
+    command.add_argument("database")
+    command.add_argument("--parser", default=DEFAULT_PARSER, choices=PARSERS)
+    command.add_argument("--load-mode", default=DEFAULT_LOAD_MODE, choices=list(LOAD_MODES))
+    command.add_argument("--workers", type=int, default=1, help="parse on this many processes")
+    command.set_defaults(func=load_command)
+
+    command = commands.add_parser("validate", help="validate a raw inventory and build the database from it")
+    command.add_argument("datafile")
+    command.add_argument("database")
+    command.add_argument("--load-mode", default=DEFAULT_LOAD_MODE, choices=list(LOAD_MODES))
+    command.set_defaults(func=validate_command)
+
+    command = commands.add_parser("refresh", help="apply an inventory snapshot to an existing database")
+    command.add_argument("datafile")
+    command.add_argument("database")
+    command.set_defaults(func=refresh_command)
+
+    command = commands.add_parser("queries", help="print analysis queries 1-6")
+    command.add_argument("database")
+    command.add_argument("--top", type=int, default=10, help="rows of queries 5 and 6")
+    command.set_defaults(func=queries_command)
+
+    command = commands.add_parser("nearest", help="print the sites nearest to a point")
+    command.add_argument("database")
+    command.add_argument("lat", type=float)
+    command.add_argument("lon", type=float)
+    command.add_argument("-k", type=int, default=10)
+    command.add_argument("--status", default="Vacant")
+    command.set_defaults(func=nearest_command)
+
+    command = commands.add_parser("export", help="export the tables to memory-mappable columnar files")
+    command.add_argument("database")
+    command.add_argument("export_dir")
+    command.add_argument("--format", default=EXPORT_FORMATS[0], choices=EXPORT_FORMATS)
+    command.set_defaults(func=export_command)
+
+    command = commands.add_parser("plot", help="draw the Mini Project 3 charts")
+    command.add_argument("database")
+    command.add_argument("charts", nargs="*", metavar="chart",
+                         help="names in MiniProject3Visualizations.CHARTS (default: all)")
+    command.set_defaults(func=plot_command)
+
+    for name, (module, description) in MODULE_COMMANDS.items():
+        # listed for --help only: main() hands their arguments over before parsing
+        commands.add_parser(name, help=description, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in MODULE_COMMANDS:
+        module = MODULE_COMMANDS[argv[0]][0]
+        sys.argv = [module + ".py", *argv[1:]]
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+    else:
+        args = build_parser().parse_args(argv)
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
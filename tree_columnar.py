@@ -0,0 +1,174 @@
+"""Columnar export of the normalized tree database and a memory-mapped reader.
+
+export_columnar() writes every normalized table, the summary tables and SiteFacts
+(see tree_sitefacts; joined on the fly for a database without it) to one file
+each, as Arrow IPC (default) or Parquet, together with a manifest.json recording
+the database version they were exported from (see tree_cache.database_version). Columns are written with the same
+compact types TableLoader uses (int32 ids, dictionary-encoded names, float32
+measurements), so they come back as the same pandas dtypes.
+
+ColumnarReader has the same load(table, columns) interface as TableLoader. Arrow
+IPC files are uncompressed and memory-mapped, so a load only touches the pages of
+the requested columns, numeric columns are handed to pandas without copying where
+possible, and several processes reading the same export share the page cache.
+Parquet files are smaller but have to be decoded on every read.
+
+open_tables(database, export_dir) returns a ColumnarReader when export_dir holds an
+export of the current database version, and falls back to a TableLoader on the
+database otherwise (or when pyarrow is not installed).
+
+Usage:
+    export_columnar("BuffaloTrees.db", "columnar")
+    with open_tables("BuffaloTrees.db", "columnar") as tables:
+        sites = tables.load("Sites", ["SiteID", "SiteStatus"])
+"""
+
+import json
+import os
+import sqlite3
+
+from tree_cache import database_version
+from tree_db import TABLE_ORDER
+from tree_loader import COMPACT_DTYPES, NULLABLE_DTYPES, TableLoader
+from tree_options import EXPORT_FORMATS
+from tree_sitefacts import SITE_FACTS_SELECT_SQL
+
+
+DERIVED_TABLES = ["DistrictSummary", "SpeciesSummary", "SiteFacts"]
+
+BATCH_ROWS = 65536
+
+
+def arrow_type(column):
+    import pyarrow
+
+    dtype = COMPACT_DTYPES.get(column)
+    if dtype == "int32":
+        return pyarrow.int32()
+    if dtype == "float32":
+        return pyarrow.float32()
+    if dtype == "category":
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return None # let Arrow infer (int64 / float64 / string)
+
+
+def query_to_arrow(conn, sql):
+    # Reads a query in batches of BATCH_ROWS rows into one Arrow table
+    import pyarrow
+
+    cur = conn.execute(sql)
+    columns = [description[0] for description in cur.description]
+    types = [arrow_type(column) for column in columns]
+
+    batches = []
+    while True:
+        rows = cur.fetchmany(BATCH_ROWS)
+        if not rows:
+            break
+        arrays = [pyarrow.array(values, type=column_type) for values, column_type in zip(zip(*rows), types)]
+        batches.append(pyarrow.RecordBatch.from_arrays(arrays, names=columns))
+
+    if not batches:
+        fields = [pyarrow.field(column, column_type or pyarrow.null()) for column, column_type in zip(columns, types)]
+        return pyarrow.schema(fields).empty_table()
+
+    # IPC files need one dictionary per column, so the batches' dictionaries are merged
+    return pyarrow.Table.from_batches(batches).unify_dictionaries().combine_chunks()
+
+
+def export_columnar(database, export_dir, fmt="arrow"):
+    # Writes every table plus SiteFacts to export_dir and returns the manifest
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+    os.makedirs(export_dir, exist_ok=True)
+
+    conn = sqlite3.connect(database)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    queries = {table: f"SELECT * FROM [{table}] ORDER BY rowid" for table in TABLE_ORDER + DERIVED_TABLES if table in existing}
+    if "SiteFacts" not in queries:
+        queries["SiteFacts"] = SITE_FACTS_SELECT_SQL.format(where="")
+
+    manifest = {"database_version": database_version(database), "format": fmt, "tables": {}}
+    for name, sql in queries.items():
+        table = query_to_arrow(conn, sql)
+        filename = f"{name}.{fmt}"
+        path = os.path.join(export_dir, filename)
+        if fmt == "arrow":
+            with pyarrow.OSFile(path, "wb") as sink:
+                with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        else:
+            pyarrow.parquet.write_table(table, path)
+        manifest["tables"][name] = {"file": filename, "rows": table.num_rows}
+    conn.close()
+
+    with open(os.path.join(export_dir, "manifest.json"), "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def read_manifest(export_dir):
+    path = os.path.join(export_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def export_is_current(database, export_dir):
+    manifest = read_manifest(export_dir)
+    return manifest is not None and manifest["database_version"] == database_version(database)
+
+
+class ColumnarReader:
+
+    def __init__(self, export_dir):
+        self.export_dir = export_dir
+        self.manifest = read_manifest(export_dir)
+        if self.manifest is None:
+            raise FileNotFoundError(f"no columnar export in {export_dir}")
+        self.tables = {} # name -> memory-mapped pyarrow.Table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.tables.clear()
+
+    def table(self, name):
+        # The whole table as a pyarrow.Table backed by the mapped file (nothing is read yet)
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        if name not in self.tables:
+            path = os.path.join(self.export_dir, self.manifest["tables"][name]["file"])
+            if self.manifest["format"] == "arrow":
+                self.tables[name] = pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all()
+            else:
+                self.tables[name] = pyarrow.parquet.read_table(path, memory_map=True)
+        return self.tables[name]
+
+    def load(self, name, columns):
+        frame = self.table(name).select(list(columns)).to_pandas(split_blocks=True)
+        nullable = {column: NULLABLE_DTYPES[(name, column)] for column in columns if (name, column) in NULLABLE_DTYPES}
+        return frame.astype(nullable) if nullable else frame # Arrow hands int columns with nulls over as float64
+
+
+def open_tables(database, export_dir=None):
+    # A ColumnarReader over export_dir if it matches database, otherwise a TableLoader
+    if export_dir is not None and export_is_current(database, export_dir):
+        try:
+            import pyarrow # noqa: F401
+        except ImportError:
+            return TableLoader(database)
+        return ColumnarReader(export_dir)
+    return TableLoader(database)
@@ -0,0 +1,83 @@
+"""Where the inventory files and the database live.
+
+The scripts used to hardcode Windows paths such as
+C:\\Users\\hb102\\Documents\\Python\\EAS 503 Mini Project 2-3\\BuffaloTrees.db. load_paths()
+resolves every path from, in increasing order of precedence:
+    - the defaults below, relative to the repository directory;
+    - a JSON config file: tree_config.json in the working directory, or the file named
+      by TREE_CONFIG or --config, e.g.
+          {"data_dir": "/srv/trees", "database": "BuffaloTrees.db"}
+    - the environment: TREE_DATA_DIR, TREE_RAW_INVENTORY, TREE_INVENTORY,
+      TREE_REJECTS, TREE_DATABASE, TREE_QUERY_CACHE and TREE_COLUMNAR;
+    - command line options added by add_path_arguments().
+Relative file names are taken relative to data_dir, and a relative data_dir in a
+config file relative to the directory of that file.
+
+Usage:
+    paths = load_paths()
+    load_inventory(paths["inventory"], paths["database"])
+"""
+
+import json
+import os
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = "tree_config.json"
+
+## name -> default file name (under data_dir)
+DEFAULT_PATHS = {
+    "raw_inventory": "Tree_Inventory_reduced_notclean.csv", # the export, before cleaning
+    "inventory": "Tree_Inventory_reduced.csv",              # the cleaned inventory the loaders read
+    "rejects": "Tree_Inventory_reduced_rejects.csv",        # rows the cleaning dropped, with the reason
+    "database": "BuffaloTrees.db",
+    "query_cache": "query_cache",                           # result files of tree_cache (a directory)
+    "columnar": "columnar",                                 # export of tree_columnar (a directory)
+}
+
+
+def read_config_file(path):
+    # Settings of a JSON config file, with data_dir made absolute
+    with open(path) as file:
+        settings = json.load(file)
+    unknown = set(settings) - set(DEFAULT_PATHS) - {"data_dir"}
+    if unknown:
+        raise ValueError(f"unknown settings in {path}: {', '.join(sorted(unknown))}")
+    if "data_dir" in settings:
+        settings["data_dir"] = os.path.join(os.path.dirname(os.path.abspath(path)), settings["data_dir"])
+    return settings
+
+
+def load_paths(config=None, **overrides):
+    # {name: absolute path} for data_dir and every name in DEFAULT_PATHS; overrides
+    # that are None are ignored
+    settings = {"data_dir": REPO_DIR, **DEFAULT_PATHS}
+
+    config = config or os.environ.get("TREE_CONFIG")
+    if config is None and os.path.exists(CONFIG_FILE):
+        config = CONFIG_FILE
+    if config is not None:
+        settings.update(read_config_file(config))
+
+    for name in settings:
+        value = os.environ.get("TREE_" + name.upper())
+        if value:
+            settings[name] = value
+    settings.update({name: value for name, value in overrides.items() if value is not None})
+
+    data_dir = os.path.abspath(os.path.expanduser(settings["data_dir"]))
+    paths = {"data_dir": data_dir}
+    for name in DEFAULT_PATHS:
+        paths[name] = os.path.join(data_dir, os.path.expanduser(settings[name]))
+    return paths
+
+
+def add_path_arguments(parser):
+    parser.add_argument("--config", help=f"JSON config file (default: {CONFIG_FILE} if present)")
+    parser.add_argument("--data-dir", help="directory of relative file names")
+    for name in DEFAULT_PATHS:
+        parser.add_argument("--" + name.replace("_", "-"), dest=name)
+
+
+def paths_from_args(args):
+    return load_paths(args.config, data_dir=args.data_dir, **{name: getattr(args, name) for name in DEFAULT_PATHS})
@@ -0,0 +1,172 @@
+"""Inventory CSV parsing with selectable backends and header-name column mapping.
+
+The step functions split every line on "," and read fields by position, which breaks
+as soon as a quoted street or species name contains a comma, and assumes the export
+never reorders its columns. This module parses the inventory with one of three
+backends:
+    - "csv": the csv module's C parser, with standard quoting (the default);
+    - "pyarrow": pyarrow.csv's block reader, every column read as text;
+    - "split": the old line.split(","), kept for comparison (no quoting).
+read_rows() streams the rows one at a time (the cheapest way to feed the loaders);
+read_blocks() returns lists of rows covering about block_size bytes of the file each,
+and parse_bytes() parses any chunk of whole lines, which is what tree_parallel's
+workers use.
+Columns are found by header name and every row comes back in the column order of
+Tree_Inventory_reduced.csv (INVENTORY_COLUMNS), so the column positions in tree_etl
+hold whatever order the export uses. A missing column the loaders need raises
+ValueError; the others (OPTIONAL_COLUMNS) are filled with "". Files are read as
+UTF-8.
+
+Usage:
+    for rows in read_blocks("Tree_Inventory_full.csv", parser="pyarrow"):
+        ...
+"""
+
+import csv
+import io
+from itertools import repeat
+from operator import itemgetter
+
+from tree_options import PARSERS, DEFAULT_PARSER
+
+
+## Column order of Tree_Inventory_reduced.csv, which the positions in tree_etl refer to
+INVENTORY_COLUMNS = ["Editing", "Botanical Name", "Common Name", "DBH", "Total Yearly Eco Benefits ($)",
+                     "Stormwater Benefits ($)", "Stormwater Gallons Saved", "Greenhouse CO2 Benefits ($)",
+                     "CO2 Avoided (in lbs.)", "CO2 Sequestered (in lbs.)", "Energy Benefits ($)", "kWh Saved",
+                     "Therms Saved", "Air Quality Benefits ($)", "Pollutants Saved (in lbs.)",
+                     "Property Benefits ($)", "Leaf Surface Area (in sq. ft.)", "Address", "Street", "Side",
+                     "Site", "Council District", "Park Name", "Latitude", "Longitude", "Site ID", "Location",
+                     "Neighborhood"]
+
+## Columns no table is built from
+OPTIONAL_COLUMNS = {"Editing", "Side", "Park Name", "Location", "Neighborhood"}
+
+BLOCK_SIZE = 1 << 22 # bytes
+
+
+def column_positions(header):
+    # Position in header of every INVENTORY_COLUMNS name (None for a missing optional column)
+    names = [name.strip().lstrip("\ufeff") for name in header]
+    positions = [names.index(name) if name in names else None for name in INVENTORY_COLUMNS]
+    missing = [name for name, position in zip(INVENTORY_COLUMNS, positions)
+               if position is None and name not in OPTIONAL_COLUMNS]
+    if missing:
+        raise ValueError(f"inventory is missing the columns {', '.join(missing)}")
+    return positions
+
+
+def row_mapper(positions):
+    # Function turning a parsed row into one in INVENTORY_COLUMNS order (None when it already is)
+    if positions == list(range(len(INVENTORY_COLUMNS))):
+        return None
+    if None not in positions:
+        return itemgetter(*positions)
+    present = [i for i, position in enumerate(positions) if position is not None]
+    getter = itemgetter(*[positions[i] for i in present])
+
+    def mapped(row):
+        fields = [""] * len(INVENTORY_COLUMNS)
+        for i, value in zip(present, getter(row)):
+            fields[i] = value
+        return tuple(fields)
+    return mapped
+
+
+def read_header(datafile):
+    # The first non-blank line of datafile, parsed with the csv module
+    with open(datafile, newline="", encoding="utf-8") as file:
+        for row in csv.reader(file):
+            if len(row) > 1 or (row and row[0].strip()):
+                return row
+    raise ValueError(f"{datafile} has no header")
+
+
+def parse_bytes(data, header, parser=DEFAULT_PARSER):
+    # Rows (in INVENTORY_COLUMNS order) of a chunk of complete data lines of a file with header
+    positions = column_positions(header)
+    if parser == "pyarrow":
+        return arrow_rows(arrow_batches(io.BytesIO(data), header, positions), positions)
+
+    # rows are kept as tuples: once the collector finds they hold only strings it stops
+    # tracking them, which keeps full collections cheap on big loads
+    text = data.decode("utf-8")
+    if parser == "split":
+        rows = [tuple(line.strip().split(",")) for line in text.split("\n") if line.strip()]
+    elif parser == "csv":
+        rows = [tuple(row) for row in csv.reader(io.StringIO(text, newline="")) if len(row) > 1 or (row and row[0].strip())]
+    else:
+        raise ValueError(f"unknown parser {parser!r}, expected one of {', '.join(PARSERS)}")
+
+    mapper = row_mapper(positions)
+    return rows if mapper is None else list(map(mapper, rows))
+
+
+def arrow_batches(source, header, positions, block_size=BLOCK_SIZE, skip_header=False):
+    # pyarrow.csv streaming reader over source with the used columns as text
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    names = [header[position] for position in positions if position is not None]
+    read_options = pa_csv.ReadOptions(column_names=header, skip_rows=1 if skip_header else 0, block_size=block_size)
+    convert_options = pa_csv.ConvertOptions(include_columns=names, column_types={name: pa.string() for name in names})
+    return pa_csv.open_csv(source, read_options=read_options, convert_options=convert_options,
+                           parse_options=pa_csv.ParseOptions(newlines_in_values=True))
+
+
+def arrow_rows(batches, positions):
+    # Rows (in INVENTORY_COLUMNS order) of every record batch in batches
+    rows = []
+    for batch in batches:
+        columns = iter([column.to_pylist() for column in batch.columns])
+        rows.extend(zip(*[next(columns) if position is not None else repeat("") for position in positions]))
+    return rows
+
+
+def read_blocks(datafile, parser=DEFAULT_PARSER, block_size=BLOCK_SIZE):
+    # Yields lists of rows (in INVENTORY_COLUMNS order), about block_size bytes of datafile each
+    header = read_header(datafile)
+    positions = column_positions(header)
+    if parser == "pyarrow":
+        for batch in arrow_batches(datafile, header, positions, block_size, skip_header=True):
+            yield arrow_rows([batch], positions)
+        return
+
+    with open(datafile, "rb") as file:
+        line = file.readline()
+        while line and not line.strip():
+            line = file.readline()
+        while True:
+            data = file.read(block_size) + file.readline()
+            if not data:
+                break
+            if parser == "csv":
+                # an odd number of quotes means the block ends inside a quoted field
+                while data.count(b'"') % 2:
+                    line = file.readline()
+                    if not line:
+                        break
+                    data += line
+            yield parse_bytes(data, header, parser)
+
+
+def read_rows(datafile, parser=DEFAULT_PARSER, block_size=BLOCK_SIZE):
+    # Yields every data row of datafile (in INVENTORY_COLUMNS order)
+    header = read_header(datafile)
+    positions = column_positions(header)
+    if parser == "pyarrow":
+        for batch in arrow_batches(datafile, header, positions, block_size, skip_header=True):
+            columns = iter([column.to_pylist() for column in batch.columns])
+            yield from zip(*[next(columns) if position is not None else repeat("") for position in positions])
+        return
+    if parser not in PARSERS:
+        raise ValueError(f"unknown parser {parser!r}, expected one of {', '.join(PARSERS)}")
+
+    mapper = row_mapper(positions)
+    with open(datafile, newline="", encoding="utf-8") as file:
+        if parser == "csv":
+            rows = (row for row in csv.reader(file) if len(row) > 1 or (row and row[0].strip()))
+        else:
+            rows = (line.strip().split(",") for line in file if line.strip())
+        next(rows) # the header
+        yield from rows if mapper is None else map(mapper, rows)
@@ -0,0 +1,161 @@
+"""Shared database helpers and the normalized schema for the Buffalo tree inventory.
+
+The connection helpers are the ones provided by Professor Narayanan in the EAS503
+SQL tutorials (also copied into the Mini Project scripts). The CREATE TABLE and
+INSERT statements below are the same ones used by the step1-step11 functions in
+MiniProject2Normalization_HalleBryant.py, collected here so loaders other than the
+step functions build exactly the same database."""
+
+import os
+import sqlite3
+from sqlite3 import Error
+
+from tree_pool import close_pools, read_only_uri
+
+
+def create_connection(db_file, delete_db=False):
+    if delete_db and os.path.exists(db_file):
+        close_pools(db_file) # pooled readers would hold the old file open
+        os.remove(db_file)
+
+    conn = None
+    try:
+        conn = sqlite3.connect(db_file)
+        conn.execute("PRAGMA foreign_keys = ON")
+    except Error as e:
+        print(e)
+
+    return conn
+
+
+def open_readonly(db_file):
+    # Connection for scripts that only read; unlike sqlite3.connect, a wrong path is
+    # an error instead of a new, empty database
+    if not os.path.isfile(db_file):
+        raise FileNotFoundError(f"no database at {db_file} (build it with: python tree_cli.py load)")
+    return sqlite3.connect(read_only_uri(db_file), uri=True)
+
+
+def require_tables(conn, names):
+    # Raises if any of the tables names is missing, e.g. the derived tables of a
+    # database built by an older loader
+    found = {name for (name, ) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    missing = [name for name in names if name not in found]
+    if missing:
+        raise LookupError(f"the database has no {', '.join(missing)} table; rebuild it with python tree_cli.py load "
+                          "or MiniProject2Normalization_HalleBryant.py")
+
+
+def create_table(conn, create_table_sql, drop_table_name=None):
+
+    if drop_table_name: # You can optionally pass drop_table_name to drop the table.
+        try:
+            c = conn.cursor()
+            c.execute(f"DROP TABLE IF EXISTS \"{drop_table_name}\"")
+        except Error as e:
+            print(e)
+
+    try:
+        c = conn.cursor()
+        c.execute(create_table_sql)
+    except Error as e:
+        print(e)
+
+
+## Tables in the order they have to be created and filled (every table only
+##references tables that come before it).
+TABLE_ORDER = ["Districts", "Addresses", "Sites", "Species", "SiteSpecies",
+               "Measurements", "EnvironmentalBenefits", "EconomicBenefits"]
+
+CREATE_TABLE_SQL = {
+    "Districts": """
+    CREATE TABLE [Districts](
+    [DistrictID] Integer not null primary key,
+    [District] Text not null)
+    """,
+
+    "Addresses": """
+    CREATE TABLE [Addresses](
+    [AddressID] Integer not null primary key,
+    [BuildingNo] Integer not null,
+    [Street] Text not null,
+    [DistrictID] Integer not null,
+    Foreign Key (DistrictID) References Districts (DistrictID)
+    )
+    """,
+
+    "Sites": """
+    CREATE TABLE [Sites](
+    [SiteID] Integer not null Primary Key,
+    [SiteNumber] Integer not null,
+    [SiteStatus] Text not null,
+    [Latitude] Float not null,
+    [Longitude] Float not null,
+    [AddressID] Integer not null,
+    Foreign Key (AddressID) References Addresses (AddressID)
+    )
+    """,
+
+    "Species": """
+    CREATE TABLE [Species](
+    [SpeciesID] Integer not null Primary Key,
+    [BotanicalName] Text not null,
+    [CommonName] Text not null
+    )
+    """,
+
+    "SiteSpecies": """
+    CREATE TABLE [SiteSpecies](
+    [SiteID] Integer not null Primary Key,
+    [SpeciesID] Integer not null,
+    Foreign Key (SiteID) References Sites (SiteID),
+    Foreign Key (SpeciesID) References Species (SpeciesID)
+    )
+    """,
+
+    "Measurements": """
+    CREATE TABLE [Measurements](
+    [SiteID] Integer not null,
+    [DiameterBreastHeight] Float not null,
+    [LeafSurfaceArea] Float not null,
+    Foreign Key (SiteID) References Sites (SiteID)
+    )
+    """,
+
+    "EnvironmentalBenefits": """
+    CREATE TABLE [EnvironmentalBenefits](
+    [SiteID] Integer not null Primary Key,
+    [PollutantsSaved] Float not null,
+    [CO2Avoided] Float not null,
+    [CO2Sequestered] Float not null,
+    [StormwaterGallonsSaved] Float not null,
+    [KilowattHoursSaved] Float not null,
+    [ThermsSaved] Float not null,
+    Foreign Key (SiteID) References Sites (SiteID)
+    )
+    """,
+
+    "EconomicBenefits": """
+    CREATE TABLE [EconomicBenefits](
+    [SiteID] Integer not null Primary Key,
+    [CO2Benefits] Float not null,
+    [EnergyBenefits] Float not null,
+    [StormwaterBenefits] Float not null,
+    [AirQualityBenefits] Float not null,
+    [PropertyBenefits] Float not null,
+    [TotalYearlyBenefits] Float not null,
+    Foreign Key (SiteID) References Sites (SiteID)
+    )
+    """,
+}
+
+INSERT_SQL = {
+    "Districts": "INSERT INTO Districts (District) VALUES (?)",
+    "Addresses": "INSERT INTO Addresses (BuildingNo, Street, DistrictID) VALUES (?,?,?)",
+    "Sites": "INSERT INTO Sites (SiteID, SiteNumber, SiteStatus, Latitude, Longitude, AddressID) VALUES (?,?,?,?,?,?)",
+    "Species": "INSERT INTO Species (BotanicalName, CommonName) VALUES (?,?)",
+    "SiteSpecies": "INSERT INTO SiteSpecies (SiteID, SpeciesID) VALUES (?,?)",
+    "Measurements": "INSERT INTO Measurements (SiteID, DiameterBreastHeight, LeafSurfaceArea) VALUES (?,?,?)",
+    "EnvironmentalBenefits": "INSERT INTO EnvironmentalBenefits (SiteID, PollutantsSaved, CO2Avoided, CO2Sequestered, StormwaterGallonsSaved, KilowattHoursSaved, ThermsSaved) VALUES (?,?,?,?,?,?,?)",
+    "EconomicBenefits": "INSERT INTO EconomicBenefits (SiteID, CO2Benefits, EnergyBenefits, StormwaterBenefits, AirQualityBenefits, PropertyBenefits, TotalYearlyBenefits) VALUES (?, ?, ?, ?, ?, ?, ?)",
+}
@@ -0,0 +1,155 @@
+"""Benefit estimates for hypothetical plantings, from species / DBH lookup tables.
+
+Vacant sites carry zero benefits, so the inventory says nothing about what planting
+them would yield. fit_benefit_tables() averages the leaf surface area and every
+benefit column of the inhabited sites per species and DiameterBreastHeight bin
+(DBH_BINS, in inches; the last bin is open-ended). A cell with fewer than
+min_samples trees falls back to the average of all species in that DBH bin, and an
+empty bin to the city average. Species the inventory has never seen use the
+all-species row.
+
+The fitted tables are cached per database version (see tree_cache.database_version),
+so repeat scenario runs on an unchanged database only pay for the lookups, which are
+one vectorized gather for any number of sites.
+
+Usage:
+    estimates = estimate_benefits("BuffaloTrees.db", species_ids, dbh)
+    plantings = estimate_vacant_plantings("BuffaloTrees.db", species_id, dbh=2.0)
+    python tree_estimates.py BuffaloTrees.db "ACER RUBRUM" --dbh 2
+
+Botanical names are stored as in the inventory (mostly upper case); the command line
+looks the species up ignoring case.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from tree_cache import database_version
+from tree_keymaps import get_key_map
+from tree_loader import TableLoader
+from tree_db import require_tables
+
+
+DBH_BINS = [0, 3, 6, 12, 18, 24, 30, 36, 42]
+
+ESTIMATE_COLUMNS = ["LeafSurfaceArea", "PollutantsSaved", "CO2Avoided", "CO2Sequestered", "StormwaterGallonsSaved",
+                    "KilowattHoursSaved", "ThermsSaved", "CO2Benefits", "EnergyBenefits", "StormwaterBenefits",
+                    "AirQualityBenefits", "PropertyBenefits", "TotalYearlyBenefits"]
+
+_tables = {} # database path -> (version, bins, min_samples, BenefitTables)
+
+
+def load_site_facts(database, columns):
+    with TableLoader(database) as tables:
+        require_tables(tables.connect(), ["SiteFacts"])
+        return tables.load("SiteFacts", columns)
+
+
+def dbh_bin(dbh, bins):
+    return np.clip(np.searchsorted(bins, dbh, side="right") - 1, 0, len(bins) - 1)
+
+
+class BenefitTables:
+
+    def __init__(self, species_ids, bins, means, counts):
+        self.species_ids = species_ids # sorted SpeciesIDs; row len(species_ids) is all species
+        self.bins = bins
+        self.means = means # (species + 1, bins, ESTIMATE_COLUMNS)
+        self.counts = counts # trees behind each (species + 1, bin) cell
+
+    def estimate(self, species_ids, dbh):
+        # (n, ESTIMATE_COLUMNS) array for n plantings of species_ids at dbh (scalars broadcast)
+        species_ids, dbh = np.broadcast_arrays(np.atleast_1d(species_ids), np.atleast_1d(np.asarray(dbh, dtype=np.float64)))
+        n_species = len(self.species_ids)
+        rows = np.minimum(np.searchsorted(self.species_ids, species_ids), max(n_species - 1, 0))
+        known = self.species_ids[rows] == species_ids if n_species else np.zeros(rows.shape, dtype=bool)
+        rows = np.where(known, rows, n_species)
+        return self.means[rows, dbh_bin(dbh, self.bins)]
+
+
+def fit_benefit_tables(sites, bins=DBH_BINS, min_samples=5):
+    # Lookup tables from a SiteFacts frame with SiteStatus, SpeciesID,
+    # DiameterBreastHeight and ESTIMATE_COLUMNS
+    bins = np.asarray(bins, dtype=np.float64)
+    trees = sites[(sites["SiteStatus"] == "Inhabited") & (sites["DiameterBreastHeight"] > 0) & sites["SpeciesID"].notna()]
+    species_ids = np.unique(trees["SpeciesID"].to_numpy())
+    n_species, n_bins = len(species_ids), len(bins)
+
+    cells = (np.searchsorted(species_ids, trees["SpeciesID"].to_numpy()) * n_bins
+             + dbh_bin(trees["DiameterBreastHeight"].to_numpy(dtype=np.float64), bins))
+    values = trees[ESTIMATE_COLUMNS].to_numpy(dtype=np.float64)
+    counts = np.bincount(cells, minlength=n_species * n_bins).reshape(n_species, n_bins)
+    sums = np.stack([np.bincount(cells, weights=column, minlength=n_species * n_bins) for column in values.T],
+                    axis=-1).reshape(n_species, n_bins, len(ESTIMATE_COLUMNS))
+
+    # the all-species row: every bin over all species, an empty bin gets the city average
+    bin_counts, bin_sums = counts.sum(axis=0), sums.sum(axis=0)
+    city = values.mean(axis=0) if len(values) else np.zeros(len(ESTIMATE_COLUMNS))
+    bin_means = np.where(bin_counts[:, None] > 0, bin_sums / np.maximum(bin_counts, 1)[:, None], city)
+
+    cell_means = np.where((counts >= min_samples)[..., None], sums / np.maximum(counts, 1)[..., None], bin_means)
+    means = np.concatenate([cell_means, bin_means[None]])
+    return BenefitTables(species_ids, bins, means, np.concatenate([counts, bin_counts[None]]))
+
+
+def benefit_tables(database, bins=DBH_BINS, min_samples=5):
+    # The fitted tables of database, refitted only when its version changed
+    path = os.path.abspath(database)
+    version = database_version(path)
+    cached = _tables.get(path)
+    if cached is not None and cached[:3] == (version, tuple(bins), min_samples):
+        return cached[3]
+
+    sites = load_site_facts(path, ["SiteStatus", "SpeciesID", "DiameterBreastHeight"] + ESTIMATE_COLUMNS)
+    tables = fit_benefit_tables(sites, bins, min_samples)
+    _tables[path] = (version, tuple(bins), min_samples, tables)
+    return tables
+
+
+def find_species_id(database, botanical):
+    # SpeciesID of a botanical name, matched exactly and then ignoring case; -1 (the
+    # all-species row) when the inventory does not have it
+    species = get_key_map(database, "Species")
+    if botanical in species:
+        return species[botanical]
+    folded = {name.casefold(): speciesid for name, speciesid in species.items()}
+    return folded.get(botanical.strip().casefold(), -1)
+
+
+def estimate_benefits(database, species_ids, dbh):
+    # DataFrame of ESTIMATE_COLUMNS, one row per (species, dbh) planting
+    return pd.DataFrame(benefit_tables(database).estimate(species_ids, dbh), columns=ESTIMATE_COLUMNS)
+
+
+def estimate_vacant_plantings(database, species_ids, dbh=2.0, site_ids=None):
+    # Estimated benefits of planting species_ids (one, or one per site) at dbh on every
+    # non-inhabited site, or on the given site_ids
+    sites = load_site_facts(database, ["SiteID", "SiteStatus", "District"])
+    sites = sites[sites["SiteStatus"] != "Inhabited"]
+    if site_ids is not None:
+        sites = sites[sites["SiteID"].isin(site_ids)]
+
+    plantings = pd.DataFrame({"SiteID": sites["SiteID"].to_numpy(), "District": sites["District"].to_numpy()})
+    plantings["SpeciesID"] = np.broadcast_to(species_ids, len(plantings))
+    plantings["DiameterBreastHeight"] = np.broadcast_to(np.asarray(dbh, dtype=np.float64), len(plantings))
+    estimates = estimate_benefits(database, plantings["SpeciesID"].to_numpy(), plantings["DiameterBreastHeight"].to_numpy())
+    return pd.concat([plantings, estimates], axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate the benefits of planting every vacant site")
+    parser.add_argument("database")
+    parser.add_argument("species", help="botanical name of the species to plant")
+    parser.add_argument("--dbh", type=float, default=2.0, help="diameter at breast height in inches")
+    args = parser.parse_args()
+
+    species_id = find_species_id(args.database, args.species)
+    if species_id == -1:
+        print(f"{args.species!r} is not in the inventory, using the all-species averages")
+    plantings = estimate_vacant_plantings(args.database, species_id, args.dbh)
+    pd.set_option("display.max_columns", None)
+    print(plantings.groupby("District", observed=True)[ESTIMATE_COLUMNS].sum())
+    print(plantings[ESTIMATE_COLUMNS].sum())
@@ -0,0 +1,241 @@
+"""Single-pass loader for the normalized Buffalo tree database.
+
+The step1-step11 functions in MiniProject2Normalization_HalleBryant.py each reopen
+Tree_Inventory_reduced.csv, so building the database parses the file eleven times.
+This module reads the cleaned inventory once and feeds every row to one sink per
+table. Districts, Addresses and Species are interned (see tree_keys) so Sites and
+SiteSpecies rows carry integer keys from the start; when the pass is done the keys
+are renumbered in the step functions' sort order, so DistrictIDs, AddressIDs and
+SpeciesIDs come out exactly as the step functions assign them, and everything is
+written in one transaction.
+
+Usage:
+    load_inventory("Tree_Inventory_reduced.csv", "BuffaloTrees.db", load_mode="fast", report=True)
+"""
+
+from tree_csv import DEFAULT_PARSER, read_rows
+from tree_db import create_connection, create_table, TABLE_ORDER, CREATE_TABLE_SQL, INSERT_SQL
+from tree_indexes import create_indexes
+from tree_keys import KeyInterner
+from tree_options import DEFAULT_LOAD_MODE
+from tree_sitefacts import refresh_site_facts
+from tree_spatial import refresh_site_locations
+from tree_summaries import refresh_summaries
+from tree_writer import BulkWriter
+
+
+## Column positions in Tree_Inventory_reduced.csv (the same indices the step functions use);
+##read_inventory() returns the rows in this order whatever the column order of the file
+BOTANICAL_NAME = 1
+COMMON_NAME = 2
+DBH = 3
+TOTAL_YEARLY_BENEFITS = 4
+STORMWATER_BENEFITS = 5
+STORMWATER_GALLONS = 6
+CO2_BENEFITS = 7
+CO2_AVOIDED = 8
+CO2_SEQUESTERED = 9
+ENERGY_BENEFITS = 10
+KWH_SAVED = 11
+THERMS_SAVED = 12
+AIR_QUALITY_BENEFITS = 13
+POLLUTANTS_SAVED = 14
+PROPERTY_BENEFITS = 15
+LEAF_SURFACE_AREA = 16
+BUILDING_NO = 17
+STREET = 18
+SITE_NUMBER = 20
+DISTRICT = 21
+LATITUDE = 23
+LONGITUDE = 24
+SITE_ID = 25
+
+## Step 6 and step 8 disagree on "UNSUITABLE VACANT" (step 6 keeps it as a species,
+##step 8 maps it to "None"), so both lists are kept to reproduce the same tables.
+NO_SPECIES = {"VACANT", "STUMP", "STUMP OBSTRUCTED", "0", "unsuitable vacant"}
+NO_SITE_SPECIES = NO_SPECIES | {"UNSUITABLE VACANT"}
+
+
+def read_inventory(datafile, parser=DEFAULT_PARSER):
+    # Yields each data row of the inventory as a sequence of fields, skipping the header
+    # and blank lines; parser is one of tree_csv.PARSERS
+    return read_rows(datafile, parser)
+
+
+class RowSink:
+    """Collects the distinct rows of one table in the order they were first seen."""
+
+    def __init__(self, table, sort_key=None):
+        self.table = table
+        self.sort_key = sort_key
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, row):
+        self.rows[row] = None
+
+    def finalize(self, resolve=None):
+        # resolve turns a raw row into its final form (e.g. district name -> DistrictID)
+        # before duplicates are dropped, mirroring the step functions which dedupe resolved rows
+        rows = self.rows
+        if resolve is not None:
+            rows = dict.fromkeys(resolve(row) for row in rows)
+        return sorted(rows, key=self.sort_key)
+
+
+def create_sinks():
+    # Row sinks for the tables whose rows are not referenced by other tables
+    return {
+        "Sites": RowSink("Sites", lambda ele: ele[0]),
+        "SiteSpecies": RowSink("SiteSpecies", lambda ele: float(ele[0])),
+        "Measurements": RowSink("Measurements", lambda ele: float(ele[0])),
+        "EnvironmentalBenefits": RowSink("EnvironmentalBenefits", lambda ele: float(ele[0])),
+        "EconomicBenefits": RowSink("EconomicBenefits", lambda ele: float(ele[0])),
+    }
+
+
+def create_keys():
+    # Interners for the tables that hand out surrogate keys. "Botanical" interns the
+    # botanical name alone, which is what SiteSpecies rows are resolved by (see step 7).
+    return {
+        "Districts": KeyInterner(),
+        "Addresses": KeyInterner(),
+        "Species": KeyInterner(),
+        "Botanical": KeyInterner(),
+    }
+
+
+def feed_row(sinks, keys, data):
+    # Routes one inventory row to every table, interning districts, addresses and species
+    siteid = data[SITE_ID]
+    botanical = data[BOTANICAL_NAME]
+
+    districtkey = keys["Districts"].intern(data[DISTRICT].strip())
+    addresskey = keys["Addresses"].intern((data[BUILDING_NO], data[STREET], districtkey))
+
+    status = "Vacant" if botanical == "VACANT" else "Inhabited"
+    sinks["Sites"].add((siteid, data[SITE_NUMBER], status, float(data[LATITUDE]), float(data[LONGITUDE]), addresskey))
+
+    if botanical not in NO_SPECIES:
+        keys["Species"].intern((botanical.split("'")[0].strip(), data[COMMON_NAME].split("'")[0].strip()))
+    else:
+        keys["Species"].intern(("None", "None"))
+
+    if botanical in NO_SITE_SPECIES:
+        sinks["SiteSpecies"].add((siteid, keys["Botanical"].intern("None")))
+    else:
+        sinks["SiteSpecies"].add((siteid, keys["Botanical"].intern(botanical.split("'")[0].strip())))
+
+    sinks["Measurements"].add((siteid, data[DBH], data[LEAF_SURFACE_AREA]))
+
+    sinks["EnvironmentalBenefits"].add((siteid, data[POLLUTANTS_SAVED], data[CO2_AVOIDED], data[CO2_SEQUESTERED],
+                                        data[STORMWATER_GALLONS], data[KWH_SAVED], data[THERMS_SAVED]))
+
+    sinks["EconomicBenefits"].add((siteid, data[CO2_BENEFITS], data[ENERGY_BENEFITS], data[STORMWATER_BENEFITS],
+                                   data[AIR_QUALITY_BENEFITS], data[PROPERTY_BENEFITS], data[TOTAL_YEARLY_BENEFITS]))
+
+
+def feed_record(sinks, keys, record):
+    # feed_row for a typed, already cleaned SiteRecord from tree_validate
+    districtkey = keys["Districts"].intern(record.district)
+    addresskey = keys["Addresses"].intern((record.building_no, record.street, districtkey))
+
+    sinks["Sites"].add((record.site_id, record.site_number, record.status, record.latitude, record.longitude, addresskey))
+
+    keys["Species"].intern((record.botanical_name, record.common_name))
+    sinks["SiteSpecies"].add((record.site_id, keys["Botanical"].intern(record.site_species)))
+
+    sinks["Measurements"].add((record.site_id, record.dbh, record.leaf_surface_area))
+
+    sinks["EnvironmentalBenefits"].add((record.site_id, record.pollutants_saved, record.co2_avoided,
+                                        record.co2_sequestered, record.stormwater_gallons, record.kwh_saved,
+                                        record.therms_saved))
+
+    sinks["EconomicBenefits"].add((record.site_id, record.co2_benefits, record.energy_benefits,
+                                   record.stormwater_benefits, record.air_quality_benefits,
+                                   record.property_benefits, record.total_yearly_benefits))
+
+
+def build_tables(sinks, keys):
+    # Assigns the final surrogate keys and returns {table name: rows to insert}
+    tables = {}
+
+    districts, district_ids = keys["Districts"].assign_ids()
+    tables["Districts"] = [(district, ) for district in districts]
+
+    # Step 4 sorts the building numbers as text, spelled as in the cleaned inventory
+    # ("12.0", as pandas wrote it), so int numbers from tree_validate are spelled the
+    # same way and both loaders assign the same AddressIDs
+    addresses, address_ids = keys["Addresses"].assign_ids(
+        lambda ele: '{} {} {}'.format(district_ids[ele[2]], ele[1], float(ele[0])))
+    tables["Addresses"] = [(buildingno, street, district_ids[districtkey]) for buildingno, street, districtkey in addresses]
+
+    # Step 5 looks addresses up by integer building number, so when two raw spellings
+    # ("12" and "12.0") share a street the site gets the later AddressID of the two.
+    # (Typed records from tree_validate carry int building numbers.)
+    address_to_addressid = {}
+    for addressid, (buildingno, street, districtid) in enumerate(tables["Addresses"], 1):
+        address_to_addressid[(int(str(buildingno).split(".")[0]), street, districtid)] = addressid
+    site_address_ids = [address_to_addressid[(int(str(buildingno).split(".")[0]), street, district_ids[districtkey])]
+                        for buildingno, street, districtkey in keys["Addresses"].values()]
+
+    tables["Sites"] = sinks["Sites"].finalize(lambda ele: (*ele[:5], site_address_ids[ele[5]]))
+
+    tables["Species"], _ = keys["Species"].assign_ids(lambda ele: ele[0])
+    species_to_speciesid = {}
+    for speciesid, (botanical, common) in enumerate(tables["Species"], 1):
+        species_to_speciesid[botanical] = speciesid
+    botanical_ids = [species_to_speciesid[botanical] for botanical in keys["Botanical"].values()]
+
+    tables["SiteSpecies"] = sinks["SiteSpecies"].finalize(lambda ele: (ele[0], botanical_ids[ele[1]]))
+
+    for table in ["Measurements", "EnvironmentalBenefits", "EconomicBenefits"]:
+        tables[table] = sinks[table].finalize()
+
+    return tables
+
+
+def write_tables(tables, database, batch_size=50000, load_mode=DEFAULT_LOAD_MODE, build_derived=True):
+    # Rebuilds database from scratch (like step 1), bulk-inserts every table and,
+    # unless build_derived is False, adds the curated secondary and spatial indexes
+    # and materializes the summary and SiteFacts tables
+    conn = create_connection(database, True)
+    for table in TABLE_ORDER:
+        create_table(conn, CREATE_TABLE_SQL[table])
+
+    with BulkWriter(conn, batch_size, load_mode, new_database=True) as writer:
+        for table in TABLE_ORDER:
+            writer.write(table, INSERT_SQL[table], tables[table])
+
+    if build_derived:
+        build_derived_tables(conn)
+    conn.close()
+    return writer
+
+
+def build_derived_tables(conn):
+    # Indexes, summary tables, SiteFacts and SiteLocations of the loaded tables
+    create_indexes(conn) # cheaper to build once the tables are filled
+    with conn:
+        refresh_summaries(conn)
+        refresh_site_facts(conn)
+        refresh_site_locations(conn)
+
+
+def load_inventory(datafile, database, batch_size=50000, load_mode=DEFAULT_LOAD_MODE, report=False, parser=DEFAULT_PARSER,
+                   build_derived=True):
+    # Builds the whole normalized database with a single pass over datafile and
+    # returns the per-table row counts and rows/sec of the writes; build_derived=False
+    # stops at the eight tables the step functions build
+    sinks, keys = create_sinks(), create_keys()
+    for data in read_inventory(datafile, parser):
+        feed_row(sinks, keys, data)
+
+    tables = build_tables(sinks, keys)
+    writer = write_tables(tables, database, batch_size, load_mode, build_derived)
+    if report:
+        writer.report()
+
+    return writer.stats
@@ -0,0 +1,93 @@
+"""Secondary indexes for the normalized tree database and a query plan checker.
+
+The step functions only create the primary keys, so every join in the analysis
+queries starts with a full scan of Sites or EnvironmentalBenefits. CURATED_INDEXES
+covers the foreign keys the queries join on, plus:
+    - idx_Sites_SiteStatus, which covers the status filters of queries 1, 3 and 5
+      (the SiteID is the rowid, so it is in the index for free);
+    - idx_Sites_Inhabited, a partial index over AddressID for inhabited sites only,
+      which lets query 4 go district -> addresses -> inhabited sites;
+    - idx_EnvironmentalBenefits_PollutantsSaved, which hands query 6 its rows
+      already in ORDER BY order;
+    - idx_Measurements_SiteID, since Measurements has no key at all.
+create_indexes() builds them and runs ANALYZE so the planner has statistics.
+
+Running this file prints EXPLAIN QUERY PLAN for queries 1-6 without and with the
+curated indexes, using an in-memory copy so the database itself is not modified:
+    python tree_indexes.py BuffaloTrees.db
+"""
+
+import argparse
+import sqlite3
+
+from tree_queries import ANALYSIS_QUERIES
+
+
+CURATED_INDEXES = {
+    "idx_Sites_AddressID": "CREATE INDEX IF NOT EXISTS idx_Sites_AddressID ON Sites (AddressID)",
+    "idx_Sites_SiteStatus": "CREATE INDEX IF NOT EXISTS idx_Sites_SiteStatus ON Sites (SiteStatus)",
+    "idx_Sites_Inhabited": "CREATE INDEX IF NOT EXISTS idx_Sites_Inhabited ON Sites (AddressID) WHERE SiteStatus = 'Inhabited'",
+    "idx_Addresses_DistrictID": "CREATE INDEX IF NOT EXISTS idx_Addresses_DistrictID ON Addresses (DistrictID)",
+    "idx_Districts_District": "CREATE INDEX IF NOT EXISTS idx_Districts_District ON Districts (District)",
+    "idx_SiteSpecies_SpeciesID": "CREATE INDEX IF NOT EXISTS idx_SiteSpecies_SpeciesID ON SiteSpecies (SpeciesID)",
+    "idx_Measurements_SiteID": "CREATE INDEX IF NOT EXISTS idx_Measurements_SiteID ON Measurements (SiteID)",
+    "idx_EnvironmentalBenefits_PollutantsSaved": "CREATE INDEX IF NOT EXISTS idx_EnvironmentalBenefits_PollutantsSaved ON EnvironmentalBenefits (PollutantsSaved)",
+}
+
+
+def create_indexes(conn, analyze=True):
+    with conn:
+        for sql in CURATED_INDEXES.values():
+            conn.execute(sql)
+    if analyze:
+        conn.execute("ANALYZE")
+        conn.commit()
+
+
+def drop_indexes(conn):
+    with conn:
+        for name in CURATED_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS [{name}]")
+
+
+def query_plan(conn, sql):
+    # Returns the EXPLAIN QUERY PLAN details of sql, one line per step
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def print_query_plans(conn, queries=ANALYSIS_QUERIES):
+    for name, sql in queries.items():
+        print(name)
+        for step in query_plan(conn, sql):
+            print("    " + step)
+
+
+def compare_plans(database):
+    # Prints the plans of queries 1-6 before and after creating the curated indexes,
+    # working on an in-memory copy of database
+    source = sqlite3.connect(database)
+    conn = sqlite3.connect(":memory:")
+    source.backup(conn)
+    source.close()
+
+    drop_indexes(conn)
+    print("== Without curated indexes ==")
+    print_query_plans(conn)
+
+    create_indexes(conn)
+    print("\n== With curated indexes ==")
+    print_query_plans(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print query 1-6 plans before and after indexing")
+    parser.add_argument("database")
+    parser.add_argument("--create", action="store_true", help="also create the indexes in the database")
+    args = parser.parse_args()
+
+    compare_plans(args.database)
+    if args.create:
+        conn = sqlite3.connect(args.database)
+        create_indexes(conn)
+        conn.close()
@@ -0,0 +1,77 @@
+"""Cached name -> surrogate key maps for a normalized tree database.
+
+Steps 2, 4 and 7 of the normalization used to load Districts, Addresses and Species
+through pd.read_sql_query and walk them with iterrows, and step 5 rebuilt the
+district and address maps again. get_key_map() builds each map with a single cursor
+fetch and memoizes it per database file, so every later lookup against an
+unchanged database is a dict hit.
+
+A cached map is reused only while the database file looks the same: its inode,
+size and mtime, the SQLite file change counter from the header (bumped on every
+committed write), and the size and mtime of a -wal file if there is one. Any write
+to the database therefore invalidates every map cached for it.
+
+The returned dicts are shared by all callers and must not be modified."""
+
+import os
+
+from tree_pool import get_pool
+
+
+## Per table: the query to fetch, and how many leading columns form the key (the
+##last column is always the id). The maps match what steps 2, 4 and 7 returned.
+KEY_MAP_SQL = {
+    "Districts": ("SELECT District, DistrictID FROM Districts ORDER BY DistrictID", 1),
+    "Addresses": ("SELECT BuildingNo, Street, DistrictID, AddressID FROM Addresses ORDER BY AddressID", 3),
+    "Species": ("SELECT BotanicalName, SpeciesID FROM Species ORDER BY SpeciesID", 1),
+}
+
+_key_maps = {}
+
+
+def database_signature(database):
+    # Cheap fingerprint of the database file that changes whenever a write is committed
+    stat = os.stat(database)
+    with open(database, "rb") as file:
+        header = file.read(28)
+    change_counter = int.from_bytes(header[24:28], "big") if len(header) == 28 else None
+
+    wal = database + "-wal"
+    wal_stat = os.stat(wal) if os.path.exists(wal) else None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns, change_counter,
+            wal_stat and (wal_stat.st_size, wal_stat.st_mtime_ns))
+
+
+def fetch_key_map(conn, table):
+    sql, key_width = KEY_MAP_SQL[table]
+    cur = conn.cursor()
+    cur.execute(sql)
+    if key_width == 1:
+        return {row[0]: row[1] for row in cur}
+    return {row[:key_width]: row[key_width] for row in cur}
+
+
+def get_key_map(database, table):
+    # Returns the name -> id map for table, fetching it only if the database changed
+    path = os.path.abspath(database)
+    signature = database_signature(path)
+    cached = _key_maps.get((path, table))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with get_pool(path).connection() as conn:
+        key_map = fetch_key_map(conn, table)
+
+    _key_maps[(path, table)] = (signature, key_map)
+    return key_map
+
+
+def clear_key_maps(database=None):
+    # Drops the cached maps of one database, or of every database
+    if database is None:
+        _key_maps.clear()
+        return
+
+    path = os.path.abspath(database)
+    for key in [key for key in _key_maps if key[0] == path]:
+        del _key_maps[key]
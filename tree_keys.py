@@ -0,0 +1,50 @@
+"""Key interning for the normalizer.
+
+A KeyInterner hands out a provisional integer key the first time it sees a value
+(a district name, an address, a species) and returns the same key on every later
+sighting, using an insertion-ordered dict instead of scanning a list. Rows that
+reference the value can store the small integer right away while the inventory is
+being parsed.
+
+The final DistrictID/AddressID/SpeciesID numbering follows the sort order the step
+functions use, which is only known once every value has been seen, so assign_ids()
+sorts the distinct values at the end and returns the provisional -> final mapping.
+Provisional keys are given out in first-seen order and Python's sort is stable, so
+the final ids are deterministic and identical to the step functions'."""
+
+
+class KeyInterner:
+
+    def __init__(self):
+        self.keys = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, value):
+        return value in self.keys
+
+    def intern(self, value):
+        # Returns the provisional key of value, assigning the next one if it is new
+        key = self.keys.get(value)
+        if key is None:
+            key = self.keys[value] = len(self.keys)
+        return key
+
+    def values(self):
+        # Distinct values, indexed by provisional key
+        return list(self.keys)
+
+    def assign_ids(self, sort_key=None, start=1):
+        # Returns (values in final id order, list mapping provisional key -> final id)
+        values = self.values()
+        if sort_key is None:
+            order = sorted(range(len(values)), key=values.__getitem__)
+        else:
+            order = sorted(range(len(values)), key=lambda key: sort_key(values[key]))
+
+        final_ids = [0] * len(values)
+        for final_id, key in enumerate(order, start):
+            final_ids[key] = final_id
+
+        return [values[key] for key in order], final_ids
@@ -0,0 +1,101 @@
+"""Column-projected, compact pandas loading of the normalized tree tables.
+
+The analysis and visualization scripts used to read all eight tables with
+"select *" and then use a handful of columns. TableLoader only fetches the columns
+a computation asks for, the first time it asks for them, and converts them to
+compact dtypes:
+    - ids and site/building numbers as int32, or pandas' nullable Int32 for the id
+      columns that can be NULL (NULLABLE_DTYPES);
+    - SiteStatus, District, Street, BotanicalName and CommonName as categoricals;
+    - Measurements (DiameterBreastHeight, LeafSurfaceArea) as float32.
+Benefit columns and coordinates stay float64 so sums and averages match the SQL
+queries exactly.
+
+Categorical columns keep every category of the table, so group them with
+observed=True, and convert them to str before handing them to seaborn (which would
+otherwise draw an axis entry for every unused category).
+
+Usage:
+    with TableLoader("BuffaloTrees.db") as tables:
+        sites = tables.load("Sites", ["SiteID", "SiteStatus"])
+
+The database is opened read-only, and a missing file raises FileNotFoundError.
+"""
+
+import pandas as pd
+
+from tree_db import open_readonly
+
+
+COMPACT_DTYPES = {
+    "SiteID": "int32",
+    "SiteNumber": "int32",
+    "AddressID": "int32",
+    "BuildingNo": "int32",
+    "DistrictID": "int32",
+    "SpeciesID": "int32",
+    "SiteStatus": "category",
+    "District": "category",
+    "Street": "category",
+    "BotanicalName": "category",
+    "CommonName": "category",
+    "DiameterBreastHeight": "float32",
+    "LeafSurfaceArea": "float32",
+}
+
+## (table, column) -> dtype of the integer columns that can be NULL: SiteFacts rows of
+##sites without a SiteSpecies row have no SpeciesID
+NULLABLE_DTYPES = {
+    ("SiteFacts", "SpeciesID"): "Int32",
+}
+
+
+def compact_dtype(table, column):
+    # The dtype column of table is loaded as, or None to keep the one pandas infers
+    return NULLABLE_DTYPES.get((table, column), COMPACT_DTYPES.get(column))
+
+
+class TableLoader:
+
+    def __init__(self, database):
+        self.database = database
+        self.conn = None
+        self.frames = {} # table -> DataFrame of every column loaded so far
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def connect(self):
+        if self.conn is None:
+            self.conn = open_readonly(self.database)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def fetch(self, table, columns):
+        # Reads columns of table in rowid order, so separate fetches line up row for row
+        sql = f"SELECT {', '.join(f'[{column}]' for column in columns)} FROM [{table}] ORDER BY rowid"
+        dtypes = {column: compact_dtype(table, column) for column in columns if compact_dtype(table, column)}
+        return pd.read_sql_query(sql, self.connect(), dtype=dtypes)
+
+    def load(self, table, columns):
+        # Returns the given columns of table, only querying the ones not loaded yet
+        loaded = self.frames.get(table)
+        missing = [column for column in columns if loaded is None or column not in loaded.columns]
+        if missing:
+            fetched = self.fetch(table, missing)
+            loaded = fetched if loaded is None else pd.concat([loaded, fetched], axis=1)
+            self.frames[table] = loaded
+
+        return loaded[list(columns)]
+
+    def memory_usage(self):
+        # Bytes held by the loaded frames, per table
+        return {table: int(frame.memory_usage(deep=True).sum()) for table, frame in self.frames.items()}
@@ -0,0 +1,22 @@
+"""Names of the interchangeable backends and modes of the loaders.
+
+tree_csv, tree_writer and tree_columnar take these by name and import them from
+here, and so do the command lines (tree_cli, tree_pipeline) for their choices,
+without importing the implementations and what they pull in."""
+
+
+## Inventory CSV parsers (see tree_csv)
+PARSERS = ["csv", "pyarrow", "split"]
+DEFAULT_PARSER = "csv"
+
+## Load mode -> pragmas BulkWriter runs before a load (see tree_writer)
+LOAD_MODES = {
+    "safe": [],
+    "wal": ["PRAGMA journal_mode = WAL", "PRAGMA synchronous = OFF", "PRAGMA cache_size = -262144"],
+    "fast": ["PRAGMA journal_mode = OFF", "PRAGMA synchronous = OFF", "PRAGMA cache_size = -262144",
+             "PRAGMA temp_store = MEMORY"],
+}
+DEFAULT_LOAD_MODE = "safe"
+
+## Columnar export formats (see tree_columnar)
+EXPORT_FORMATS = ["arrow", "parquet"]
@@ -0,0 +1,154 @@
+"""Partitioned, multi-process parsing of large tree inventories.
+
+The inventory is split into byte ranges that start and end on line boundaries, and
+each range is parsed in a process pool (with any tree_csv backend) and fed to the same
+feed_row() used by the single-pass loader. Ranges are cut at line ends, so quoted
+fields must not contain newlines. Every worker returns its partial sinks and interned keys
+column by column in a compact form (pack_rows: each text column joined into one
+string, each number column as an array), which unpickles far faster than lists of
+tuples of strings; the parent merges them in range order, re-interning each worker's districts, addresses
+and species so their provisional keys line up. Because ranges are merged in file
+order, every value is first seen in the same position as in a sequential pass, and
+the resulting tables are identical to tree_etl.load_inventory's.
+
+Writing stays single-threaded (SQLite has one writer), so the gain is in parsing
+and cleaning, which dominates on multi-million-row inventories. With workers=1 (or a
+single core) there is nothing to gain from a pool, so the file is parsed in process
+exactly like tree_etl does.
+
+Usage:
+    load_inventory_parallel("Tree_Inventory_full.csv", "BuffaloTrees.db", workers=8)
+"""
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from tree_csv import DEFAULT_PARSER, parse_bytes, read_header
+from tree_etl import read_inventory, create_sinks, create_keys, feed_row, build_tables, write_tables
+from tree_options import DEFAULT_LOAD_MODE
+
+
+FIELD_SEPARATOR = "\x1f" # ASCII unit separator, which an inventory field never holds
+
+
+def split_ranges(datafile, n_ranges):
+    # Returns (start, end) byte offsets covering the data rows (the header line is
+    # skipped), each ending just after a newline
+    size = os.path.getsize(datafile)
+    with open(datafile, "rb") as file:
+        line = file.readline()
+        while line and not line.strip():
+            line = file.readline()
+        start = file.tell()
+
+        bounds = [start]
+        for i in range(1, n_ranges):
+            offset = start + (size - start) * i // n_ranges
+            if offset <= bounds[-1]:
+                continue
+            file.seek(offset - 1)
+            file.readline() # move to the end of the line that contains offset - 1
+            if bounds[-1] < file.tell() < size:
+                bounds.append(file.tell())
+        bounds.append(size)
+
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+
+def pack_column(column):
+    # One string for a text column, an array for an int or float column, else a list
+    try:
+        if isinstance(column[0], str):
+            text = FIELD_SEPARATOR.join(column)
+            if text.count(FIELD_SEPARATOR) == len(column) - 1:
+                return text
+        elif isinstance(column[0], int):
+            return array("q", column)
+        elif isinstance(column[0], float):
+            return array("d", column)
+    except TypeError: # a column mixing types
+        pass
+    return list(column)
+
+
+def pack_rows(rows):
+    # Column-wise, compact form of a list of equal-length tuples (see unpack_columns)
+    return [pack_column(column) for column in zip(*rows)]
+
+
+def unpack_columns(packed):
+    return [column.split(FIELD_SEPARATOR) if isinstance(column, str) else column for column in packed]
+
+
+def parse_range(datafile, start, end, header, parser=DEFAULT_PARSER):
+    # Worker: parses one byte range into fresh sinks and interners, returned packed
+    # (see pack_rows) so they pickle and unpickle cheaply
+    with open(datafile, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    sinks, keys = create_sinks(), create_keys()
+    for row in parse_bytes(data, header, parser):
+        feed_row(sinks, keys, row)
+
+    return ({table: pack_rows(sink.rows) for table, sink in sinks.items()},
+            {name: pack_rows(value if isinstance(value, tuple) else (value, ) for value in interner.values())
+             for name, interner in keys.items()})
+
+
+def merge_partial(sinks, keys, partial):
+    # Folds one worker's result into the merged sinks and interners, translating the
+    # worker's provisional keys into the merged ones
+    rows, values = partial
+
+    district_keys = list(map(keys["Districts"].intern, *unpack_columns(values["Districts"])))
+    buildingnos, streets, districtkeys = unpack_columns(values["Addresses"]) or ([], [], [])
+    address_keys = list(map(keys["Addresses"].intern,
+                            zip(buildingnos, streets, [district_keys[key] for key in districtkeys])))
+    for species in zip(*unpack_columns(values["Species"])):
+        keys["Species"].intern(species)
+    botanical_keys = list(map(keys["Botanical"].intern, *unpack_columns(values["Botanical"])))
+
+    columns = unpack_columns(rows["Sites"])
+    if columns:
+        columns[5] = [address_keys[key] for key in columns[5]]
+        sinks["Sites"].rows.update(dict.fromkeys(zip(*columns)))
+    columns = unpack_columns(rows["SiteSpecies"])
+    if columns:
+        columns[1] = [botanical_keys[key] for key in columns[1]]
+        sinks["SiteSpecies"].rows.update(dict.fromkeys(zip(*columns)))
+    for table in ["Measurements", "EnvironmentalBenefits", "EconomicBenefits"]:
+        sinks[table].rows.update(dict.fromkeys(zip(*unpack_columns(rows[table]))))
+
+
+def parse_parallel(datafile, workers=None, n_ranges=None, parser=DEFAULT_PARSER):
+    # Parses datafile on a process pool and returns the merged (sinks, keys)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        sinks, keys = create_sinks(), create_keys()
+        for data in read_inventory(datafile, parser):
+            feed_row(sinks, keys, data)
+        return sinks, keys
+
+    ranges = split_ranges(datafile, n_ranges or workers * 4)
+    header = read_header(datafile)
+
+    sinks, keys = create_sinks(), create_keys()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(parse_range, datafile, start, end, header, parser) for start, end in ranges]
+        for future in futures: # merged strictly in file order
+            merge_partial(sinks, keys, future.result())
+
+    return sinks, keys
+
+
+def load_inventory_parallel(datafile, database, workers=None, n_ranges=None, batch_size=50000,
+                            load_mode=DEFAULT_LOAD_MODE, report=False, parser=DEFAULT_PARSER):
+    sinks, keys = parse_parallel(datafile, workers, n_ranges, parser)
+    tables = build_tables(sinks, keys)
+    writer = write_tables(tables, database, batch_size, load_mode)
+    if report:
+        writer.report()
+
+    return writer.stats
@@ -0,0 +1,249 @@
+"""Incremental build of the Buffalo tree database as a DAG of cached stages.
+
+    clean -> districts -> addresses -> sites -> species  -> summaries
+                                            \\-> benefits -/
+
+    clean      raw inventory -> cleaned inventory CSV and rejects CSV (tree_validate)
+    districts  Districts
+    addresses  Addresses
+    sites      Sites
+    species    Species, SiteSpecies
+    benefits   Measurements, EnvironmentalBenefits, EconomicBenefits
+    summaries  indexes, DistrictSummary, SpeciesSummary, SiteFacts, SiteLocations
+
+The paths come from tree_config (config file, environment or command line). Every
+stage has a fingerprint: a hash of the source of the modules that implement it,
+the content of its input files and the fingerprints of its upstream stages. The
+fingerprints, with the size, mtime and hash of every file a stage read or wrote, are
+kept in a PipelineStages table of the database:
+
+PipelineStages
+[Stage] Text not null Primary Key, [Fingerprint] Text not null, [Files] Text not null,
+[Seconds] Float not null, [Finished] Text not null
+
+A stage is skipped when its fingerprint is unchanged, its output files are the ones
+it wrote and its tables exist, unless an upstream stage ran in the same run or it
+is forced. Input files are only hashed again when their size or mtime changed, so
+an up-to-date run (e.g. after editing only MiniProject3Visualizations.py) costs a
+few stats and one query. When any table stage has to run, the cleaned inventory is
+parsed once (tree_etl) and only the tables of the stale stages are dropped and
+written again; the keys come out the same as in a full build, so the tables that
+are kept still match. Deleting the database forgets every fingerprint.
+
+Usage:
+    python tree_pipeline.py                           # paths from tree_config
+    python tree_pipeline.py --data-dir /srv/trees --force sites
+    python tree_pipeline.py sites --database /tmp/BuffaloTrees.db
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from tree_config import REPO_DIR, add_path_arguments, paths_from_args
+from tree_db import create_connection, create_table, CREATE_TABLE_SQL, INSERT_SQL
+from tree_etl import read_inventory, create_sinks, create_keys, feed_row, build_tables, build_derived_tables
+from tree_options import PARSERS, DEFAULT_PARSER, LOAD_MODES, DEFAULT_LOAD_MODE
+from tree_validate import clean_inventory
+from tree_writer import BulkWriter
+
+
+CREATE_PIPELINE_STAGES_SQL = """
+    CREATE TABLE IF NOT EXISTS [PipelineStages](
+    [Stage] Text not null Primary Key,
+    [Fingerprint] Text not null,
+    [Files] Text not null,
+    [Seconds] Float not null,
+    [Finished] Text not null
+    )
+    """
+
+## inputs and outputs name tree_config paths; modules are the ones whose source is
+##part of the fingerprint
+Stage = namedtuple("Stage", ["name", "upstream", "inputs", "outputs", "tables", "modules"])
+
+LOAD_MODULES = ["tree_csv", "tree_db", "tree_etl", "tree_keys", "tree_writer"]
+
+STAGES = [
+    Stage("clean", [], ["raw_inventory"], ["inventory", "rejects"], [], ["tree_csv", "tree_etl", "tree_validate"]),
+    Stage("districts", ["clean"], [], [], ["Districts"], LOAD_MODULES),
+    Stage("addresses", ["districts"], [], [], ["Addresses"], LOAD_MODULES),
+    Stage("sites", ["addresses"], [], [], ["Sites"], LOAD_MODULES),
+    Stage("species", ["sites"], [], [], ["Species", "SiteSpecies"], LOAD_MODULES),
+    Stage("benefits", ["sites"], [], [], ["Measurements", "EnvironmentalBenefits", "EconomicBenefits"], LOAD_MODULES),
+    Stage("summaries", ["species", "benefits"], [], [], ["DistrictSummary", "SpeciesSummary", "SiteFacts",
+                                                         "SiteLocations"],
+          ["tree_etl", "tree_indexes", "tree_summaries", "tree_sitefacts", "tree_spatial"]),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+_module_digests = {}
+
+
+def file_digest(path, known=None):
+    # [size, mtime_ns, SHA-1] of path; the hash in known is reused while size and mtime match
+    stat = os.stat(path)
+    if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return known
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+
+
+def module_digest(module):
+    if module not in _module_digests:
+        with open(os.path.join(REPO_DIR, module + ".py"), "rb") as file:
+            _module_digests[module] = hashlib.sha1(file.read()).hexdigest()
+    return _module_digests[module]
+
+
+def stage_fingerprint(stage, input_files, upstream_fingerprints):
+    # Paths are left out, so moving the data directory does not make a stage stale
+    text = json.dumps([stage.name, stage.tables, [module_digest(module) for module in stage.modules],
+                       [input_files[path][2] for path in sorted(input_files)], upstream_fingerprints])
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def required_stages(targets=None):
+    # Names of the targets (default: every stage) and everything upstream of them
+    required, pending = set(), list(targets or STAGES_BY_NAME)
+    while pending:
+        name = pending.pop()
+        if name not in required:
+            required.add(name)
+            pending.extend(STAGES_BY_NAME[name].upstream)
+    return required
+
+
+def existing_tables(conn):
+    return {name for (name, ) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+class Pipeline:
+
+    def __init__(self, paths, parser=DEFAULT_PARSER, batch_size=50000, load_mode=DEFAULT_LOAD_MODE):
+        self.paths = paths
+        self.parser = parser
+        self.batch_size = batch_size
+        self.load_mode = load_mode
+        self.tables = None # {table: rows} of the cleaned inventory, once a table stage needs it
+
+    def inventory_tables(self):
+        if self.tables is None:
+            sinks, keys = create_sinks(), create_keys()
+            for data in read_inventory(self.paths["inventory"], self.parser):
+                feed_row(sinks, keys, data)
+            self.tables = build_tables(sinks, keys)
+        return self.tables
+
+    def run_stage(self, conn, stage):
+        if stage.name == "clean":
+            count, rejects = clean_inventory(self.paths["raw_inventory"], self.paths["inventory"],
+                                             self.paths["rejects"])
+            print(f"{'clean':<10} {count} rows kept, {len(rejects)} rejected")
+        elif stage.name == "summaries":
+            build_derived_tables(conn)
+        else:
+            tables = self.inventory_tables()
+            with BulkWriter(conn, self.batch_size, self.load_mode) as writer:
+                for table in stage.tables:
+                    conn.execute(f"DROP TABLE IF EXISTS [{table}]") # foreign keys are off in the writer
+                    create_table(conn, CREATE_TABLE_SQL[table])
+                    writer.write(table, INSERT_SQL[table], tables[table])
+
+    def outputs_current(self, stage, known, tables):
+        # True if the output files are the ones the stage last wrote and its tables exist
+        for name in stage.outputs:
+            path = self.paths[name]
+            if path not in known or not os.path.exists(path):
+                return False
+            stat = os.stat(path)
+            if known[path][:2] != [stat.st_size, stat.st_mtime_ns]:
+                return False
+        return tables.issuperset(stage.tables)
+
+    def run(self, targets=None, force=()):
+        # Brings the targets and their upstream stages up to date; returns
+        # [(stage, ran, seconds)] in run order
+        required = required_stages(targets)
+        conn = create_connection(self.paths["database"])
+        with conn:
+            conn.execute(CREATE_PIPELINE_STAGES_SQL)
+        records = {stage: (fingerprint, json.loads(files))
+                   for stage, fingerprint, files in conn.execute("SELECT Stage, Fingerprint, Files FROM PipelineStages")}
+        tables = existing_tables(conn)
+
+        fingerprints, changed, results = {}, set(), []
+        for stage in STAGES:
+            if stage.name not in required:
+                continue
+            fingerprint, known = records.get(stage.name, (None, {}))
+            files = {self.paths[name]: file_digest(self.paths[name], known.get(self.paths[name]))
+                     for name in stage.inputs}
+            fingerprints[stage.name] = stage_fingerprint(stage, files, [fingerprints[name] for name in stage.upstream])
+
+            if (fingerprint == fingerprints[stage.name] and stage.name not in force
+                    and not changed.intersection(stage.upstream) and self.outputs_current(stage, known, tables)):
+                if any(files[path] != known.get(path) for path in files): # touched but not changed
+                    with conn:
+                        conn.execute("UPDATE PipelineStages SET Files = ? WHERE Stage = ?",
+                                     (json.dumps({**known, **files}), stage.name))
+                results.append((stage.name, False, 0.0))
+                continue
+
+            start = time.perf_counter()
+            self.run_stage(conn, stage)
+            seconds = time.perf_counter() - start
+            outputs = {self.paths[name]: file_digest(self.paths[name]) for name in stage.outputs}
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO PipelineStages VALUES (?, ?, ?, ?, ?)",
+                             (stage.name, fingerprints[stage.name], json.dumps({**files, **outputs}),
+                              seconds, datetime.now().isoformat(timespec="seconds")))
+            tables = existing_tables(conn)
+            # a stage that rewrote its files with the same content does not make the next ones stale
+            if stage.tables or any(known.get(path, [None] * 3)[2] != digest[2] for path, digest in outputs.items()):
+                changed.add(stage.name)
+            results.append((stage.name, True, seconds))
+
+        conn.close()
+        return results
+
+
+def run_pipeline(paths, targets=None, force=(), parser=DEFAULT_PARSER, batch_size=50000, load_mode=DEFAULT_LOAD_MODE,
+                 report=False):
+    results = Pipeline(paths, parser, batch_size, load_mode).run(targets, force)
+    if report:
+        for stage, ran, seconds in results:
+            print(f"{stage:<10} {'ran' if ran else 'up to date':<10} {seconds:>8.3f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the tree database, skipping the stages that are up to date")
+    parser.add_argument("stages", nargs="*", metavar="stage",
+                        help=f"stages to bring up to date, with their upstream stages: {', '.join(STAGES_BY_NAME)} "
+                             f"(default: all)")
+    parser.add_argument("--force", action="append", default=[], choices=list(STAGES_BY_NAME),
+                        help="run this stage even if it is up to date (repeatable)")
+    parser.add_argument("--parser", default=DEFAULT_PARSER, choices=PARSERS)
+    parser.add_argument("--load-mode", default=DEFAULT_LOAD_MODE, choices=list(LOAD_MODES))
+    parser.add_argument("--charts", action="store_true", help="then draw the Mini Project 3 charts")
+    add_path_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.stages) - set(STAGES_BY_NAME)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    paths = paths_from_args(args)
+    start = time.perf_counter()
+    run_pipeline(paths, args.stages or None, args.force, args.parser, load_mode=args.load_mode, report=True)
+    print(f"pipeline {time.perf_counter() - start:.3f}s")
+    if args.charts:
+        from MiniProject3Visualizations import show_charts
+        show_charts(database=paths["database"])
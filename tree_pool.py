@@ -0,0 +1,167 @@
+"""Bounded, thread-safe pools of read-only SQLite connections.
+
+The scripts and helpers used to open a fresh sqlite3 connection for every step,
+lookup map and query. A ConnectionPool keeps up to size connections to one database
+open and hands each to one thread at a time, so report and dashboard workers can
+query the same file concurrently without paying the connect (and schema parsing)
+cost every time:
+
+    with get_pool("BuffaloTrees.db").connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+Analysis connections are opened through a read-only URI (mode=ro), with query_only
+set and the file memory-mapped (mmap_size), so readers share the OS page cache
+instead of copying pages into a private cache each, and only ever take SQLite's
+shared lock. immutable=True also skips the locking and change detection
+altogether; it is only safe for a file nothing writes to while the pool is open
+(e.g. a published snapshot). SQLite's shared-cache mode is not used: it serializes
+readers on table locks and SQLite discourages it.
+
+A pooled connection whose file has been replaced since it was opened (a rebuild
+deletes and recreates the database) is closed at checkout instead of reused, and
+tree_db.create_connection(delete_db=True) closes the pools of a file before
+deleting it.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+POOL_SIZE = 4
+MMAP_SIZE = 256 * 1024 * 1024
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def read_only_uri(database, immutable=False):
+    uri = Path(os.path.abspath(database)).as_uri() + "?mode=ro"
+    return uri + "&immutable=1" if immutable else uri
+
+
+def file_identity(path):
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+class ConnectionPool:
+    """Up to size read-only connections to database, each used by one thread at a time."""
+
+    def __init__(self, database, size=POOL_SIZE, immutable=False, mmap_size=MMAP_SIZE, timeout=None):
+        self.database = os.path.abspath(database)
+        self.size = size
+        self.immutable = immutable
+        self.mmap_size = mmap_size
+        self.timeout = timeout # seconds to wait for a free connection (None: forever)
+        self.idle = queue.LifoQueue() # the most recently used connection is the warmest
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        conn = sqlite3.connect(read_only_uri(self.database, self.immutable), uri=True,
+                               check_same_thread=False, cached_statements=256)
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn, file_identity(self.database)
+
+    def checkout(self):
+        # A (connection, file identity) pair: an idle one, a new one while fewer than
+        # size are open, or else the next one returned
+        if self.closed:
+            raise ValueError(f"connection pool of {self.database} is closed")
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            can_open = self.opened < self.size
+            if can_open:
+                self.opened += 1
+        if can_open:
+            return self.open_counted()
+
+        try:
+            return self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no free connection to {self.database} after {self.timeout}s") from None
+
+    def open_counted(self):
+        # open() for a slot already counted in opened
+        try:
+            return self.open()
+        except Exception:
+            with self.lock:
+                self.opened -= 1
+            raise
+
+    def discard(self, conn):
+        conn.close()
+        with self.lock:
+            self.opened -= 1
+
+    @contextmanager
+    def connection(self):
+        conn, identity = self.checkout()
+        try:
+            # the database was deleted and rebuilt since conn was opened: it would keep
+            # reading the old file
+            replaced = not self.immutable and identity != file_identity(self.database)
+        except OSError:
+            self.discard(conn)
+            raise
+        if replaced:
+            conn.close() # its slot goes to the replacement
+            conn, identity = self.open_counted()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.idle.put((conn, identity))
+            if self.closed:
+                self.close()
+
+    def close(self):
+        # Closes the idle connections now; connections in use are closed when returned
+        self.closed = True
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+
+def get_pool(database, size=POOL_SIZE, immutable=False, mmap_size=MMAP_SIZE):
+    # The shared pool of database; the options only apply when it is first created
+    path = os.path.abspath(database)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None or pool.closed:
+            pool = _pools[path] = ConnectionPool(path, size, immutable, mmap_size)
+        return pool
+
+
+def close_pools(database=None):
+    # Closes the shared pool of one database, or every shared pool
+    with _pools_lock:
+        paths = list(_pools) if database is None else [os.path.abspath(database)]
+        for path in paths:
+            pool = _pools.pop(path, None)
+            if pool is not None:
+                pool.close()
@@ -0,0 +1,139 @@
+"""Planting priority scores for vacant sites and districts.
+
+Every site that is not 'Inhabited' (the sites query 3 counts) is a planting
+candidate. Its score combines three components, each scaled to 0-1:
+    - canopy_gap: 1 - the local canopy density relative to the densest spot in the
+      city. Density is inhabited sites per hectare in the 3x3 block of grid cells
+      (radius_m on a side) around the site, counted for all sites at once by
+      binning the projected coordinates and summing an integral image.
+    - benefit: the mean TotalYearlyBenefits of the inhabited sites of the site's
+      district, relative to the best district (the city mean for a district with
+      no trees), i.e. what a typical tree there is expected to yield.
+    - concentration: the Herfindahl index of the species of the district's
+      inhabited sites; 1 when one species makes up the whole district, so planting
+      where the canopy is least diverse scores higher.
+The priority is the weighted sum of the components (WEIGHTS by default).
+
+District scores are the district's vacancy rate times the mean priority of its
+vacant sites. All arithmetic is vectorized over the whole inventory with NumPy; the
+sites are read from SiteFacts (see tree_sitefacts).
+
+Usage:
+    sites, districts = planting_priorities("BuffaloTrees.db", radius_m=200)
+    python tree_priority.py BuffaloTrees.db --top 20
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from tree_loader import TableLoader
+from tree_db import require_tables
+from tree_spatial import METERS_PER_DEGREE_LAT
+
+
+WEIGHTS = {"canopy_gap": 0.5, "benefit": 0.3, "concentration": 0.2}
+
+SITE_COLUMNS = ["SiteID", "SiteStatus", "Latitude", "Longitude", "District", "SpeciesID", "TotalYearlyBenefits"]
+
+
+def load_sites(database):
+    with TableLoader(database) as tables:
+        require_tables(tables.connect(), ["SiteFacts"])
+        return tables.load("SiteFacts", SITE_COLUMNS)
+
+
+def canopy_density(latitude, longitude, inhabited, radius_m=200):
+    # Inhabited sites per hectare in the 3x3 block of radius_m grid cells around each site
+    lat0 = np.radians(latitude.mean())
+    y = (latitude - latitude.min()) * METERS_PER_DEGREE_LAT
+    x = (longitude - longitude.min()) * METERS_PER_DEGREE_LAT * np.cos(lat0)
+    row = (y // radius_m).astype(np.int64)
+    col = (x // radius_m).astype(np.int64)
+    n_rows, n_cols = row.max() + 1, col.max() + 1
+
+    counts = np.bincount(row * n_cols + col, weights=inhabited, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+    # integral image with one row/column of zeros in front and the grid padded by one
+    # cell each way, so a 3x3 block sum is four lookups
+    integral = np.pad(np.pad(counts, 1).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    block = integral[row + 3, col + 3] - integral[row, col + 3] - integral[row + 3, col] + integral[row, col]
+    return block / ((3 * radius_m) ** 2 / 10000)
+
+
+def score_sites(sites, radius_m=200, weights=None):
+    # DataFrame of the vacant sites and their score components, highest priority first
+    weights = WEIGHTS if weights is None else weights
+    inhabited = (sites["SiteStatus"] == "Inhabited").to_numpy()
+    district_codes, district_names = pd.factorize(sites["District"])
+    species_codes, _ = pd.factorize(sites["SpeciesID"], use_na_sentinel=False) # a missing species is one more code
+    benefits = sites["TotalYearlyBenefits"].to_numpy(dtype=np.float64)
+    n_districts, n_species = len(district_names), species_codes.max() + 1
+
+    density = canopy_density(sites["Latitude"].to_numpy(dtype=np.float64),
+                             sites["Longitude"].to_numpy(dtype=np.float64), inhabited, radius_m)
+    top_density = density.max()
+    canopy_gap = 1 - density / top_density if top_density > 0 else np.ones_like(density)
+
+    trees = np.bincount(district_codes, weights=inhabited, minlength=n_districts)
+    benefit_sums = np.bincount(district_codes, weights=benefits * inhabited, minlength=n_districts)
+    city_mean = benefit_sums.sum() / trees.sum() if trees.sum() else 0.0
+    district_benefit = np.divide(benefit_sums, trees, out=np.full(n_districts, city_mean), where=trees > 0)
+    top_benefit = district_benefit.max()
+    benefit = district_benefit / top_benefit if top_benefit > 0 else np.zeros(n_districts)
+
+    species_counts = np.bincount(district_codes * n_species + species_codes, weights=inhabited,
+                                 minlength=n_districts * n_species).reshape(n_districts, n_species)
+    shares = np.divide(species_counts, trees[:, None], out=np.zeros_like(species_counts), where=trees[:, None] > 0)
+    concentration = (shares ** 2).sum(axis=1)
+
+    priority = (weights["canopy_gap"] * canopy_gap
+                + weights["benefit"] * benefit[district_codes]
+                + weights["concentration"] * concentration[district_codes])
+
+    scores = pd.DataFrame({
+        "SiteID": sites["SiteID"].to_numpy(),
+        "District": district_names[district_codes],
+        "Latitude": sites["Latitude"].to_numpy(),
+        "Longitude": sites["Longitude"].to_numpy(),
+        "CanopyDensity": density,
+        "ExpectedBenefit": district_benefit[district_codes],
+        "SpeciesConcentration": concentration[district_codes],
+        "Priority": priority,
+    })[~inhabited]
+    return scores.sort_values(["Priority", "SiteID"], ascending=[False, True], ignore_index=True)
+
+
+def score_districts(sites, site_scores):
+    # One row per district: vacancy, mean vacant-site components and priority
+    totals = sites.groupby("District", observed=True).size().rename("Sites")
+    districts = site_scores.groupby("District", observed=True).agg(
+        VacantSites=("SiteID", "size"),
+        CanopyDensity=("CanopyDensity", "mean"),
+        ExpectedBenefit=("ExpectedBenefit", "first"),
+        SpeciesConcentration=("SpeciesConcentration", "first"),
+        SitePriority=("Priority", "mean"),
+    ).join(totals, how="right").fillna({"VacantSites": 0, "SitePriority": 0})
+    districts["VacancyRate"] = districts["VacantSites"] / districts["Sites"]
+    districts["Priority"] = districts["VacancyRate"] * districts["SitePriority"]
+    return districts.sort_values("Priority", ascending=False).reset_index()
+
+
+def planting_priorities(database, radius_m=200, weights=None):
+    # (vacant site scores, district scores) for database, highest priority first
+    sites = load_sites(database)
+    site_scores = score_sites(sites, radius_m, weights)
+    return site_scores, score_districts(sites, site_scores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank vacant sites and districts for planting")
+    parser.add_argument("database")
+    parser.add_argument("--radius", type=float, default=200, help="canopy density cell size in meters")
+    parser.add_argument("--top", type=int, default=20, help="number of sites to print")
+    args = parser.parse_args()
+
+    site_scores, district_scores = planting_priorities(args.database, args.radius)
+    pd.set_option("display.max_columns", None)
+    print(district_scores)
+    print(site_scores.head(args.top))
@@ -0,0 +1,212 @@
+"""Parameterized analysis queries for the normalized tree database.
+
+ANALYSIS_QUERIES keeps the original SQL of queries 1-6 from MiniProject2Queries.py
+(query 4 split into 4a/4b as in the script), which tree_indexes uses for its plan
+comparison. The functions below are the reusable versions of those queries:
+
+    benefit_averages(database, status, districts)   query 1
+    total_yearly_benefits(database)                  query 2
+    vacant_site_count(database)                      query 3
+    active_sites_by_district(database, districts)    query 4, every district in one grouped query
+    top_species(database, n, status)                 query 5
+    top_pollutant_sites(database, n)                 query 6
+
+Each call checks a read-only connection out of the database's shared pool (see
+tree_pool), so the functions can be called from several threads at once, and the
+SQL text of every function is fixed (lists of districts are bound as a single JSON
+array and expanded with json_each), so sqlite3's statement cache prepares each query
+once per connection no matter how it is parameterized. Results go through a ResultCache
+(see tree_cache) that is invalidated whenever the database content changes; call
+configure_result_cache(cache_dir=...) to also keep results on disk between runs."""
+
+import json
+
+from tree_cache import ResultCache
+from tree_pool import get_pool, close_pools
+
+
+ANALYSIS_QUERIES = {
+    # Query 1: Average environmental benefits of inhabited sites
+    "query1": """Select AVG(CO2Avoided), AVG(CO2Sequestered), AVG(PollutantsSaved),
+            AVG(StormwaterGallonsSaved), AVG(KilowattHoursSaved), AVG(ThermsSaved)
+            From EnvironmentalBenefits
+            Join Sites
+            on Sites.SiteID = EnvironmentalBenefits.SiteID
+            Where SiteStatus == "Inhabited"
+            """,
+
+    # Query 2: Total yearly economic benefits
+    "query2": """Select SUM(TotalYearlyBenefits)
+                From EconomicBenefits
+                """,
+
+    # Query 3: Number of vacant sites
+    "query3": """Select COUNT(*)
+            From Sites
+            Where SiteStatus Not Like "Inhabited"
+            """,
+
+    # Query 4: Inhabited sites in the Ellicott and Delaware districts
+    "query4a": """Select COUNT(*)
+            From Sites
+            Join Addresses
+            on Sites.AddressID = Addresses.AddressID
+            Join Districts
+            on Districts.DistrictID = Addresses.DistrictID
+            Where (SiteStatus = "Inhabited") and (District = "Ellicott")
+            """,
+
+    "query4b": """Select COUNT(*)
+            From Sites
+            Join Addresses
+            on Sites.AddressID = Addresses.AddressID
+            Join Districts
+            on Districts.DistrictID = Addresses.DistrictID
+            Where (SiteStatus = "Inhabited") and (District = "Delaware")
+            """,
+
+    # Query 5: Most common tree species
+    "query5": """Select BotanicalName, CommonName, Count(SiteSpecies.SiteID)
+            From Species
+            Join SiteSpecies
+            on Species.SpeciesID = SiteSpecies.SpeciesID
+            Join Sites
+            on Sites.SiteID = SiteSpecies.SiteID
+            Where (SiteStatus = "Inhabited")
+            GROUP BY Species.SpeciesID
+            ORDER BY Count(SiteSpecies.SiteID) DESC
+            """,
+
+    # Query 6: Species with the highest pollutant absorption
+    "query6": """Select CommonName, PollutantsSaved
+            From EnvironmentalBenefits
+            Join SiteSpecies
+            on SiteSpecies.SiteID = EnvironmentalBenefits.SiteID
+            Join Species
+            on SiteSpecies.SpeciesID = Species.SpeciesID
+            ORDER BY PollutantsSaved DESC
+            """,
+}
+
+
+BENEFIT_COLUMNS = ["CO2Avoided", "CO2Sequestered", "PollutantsSaved",
+                   "StormwaterGallonsSaved", "KilowattHoursSaved", "ThermsSaved"]
+
+BENEFIT_AVERAGES_SQL = """
+    SELECT AVG(CO2Avoided), AVG(CO2Sequestered), AVG(PollutantsSaved),
+        AVG(StormwaterGallonsSaved), AVG(KilowattHoursSaved), AVG(ThermsSaved)
+    FROM EnvironmentalBenefits
+    JOIN Sites ON Sites.SiteID = EnvironmentalBenefits.SiteID
+    WHERE SiteStatus = ?
+    """
+
+BENEFIT_AVERAGES_BY_DISTRICT_SQL = BENEFIT_AVERAGES_SQL + """
+    AND Sites.AddressID IN (
+        SELECT AddressID FROM Addresses
+        JOIN Districts ON Districts.DistrictID = Addresses.DistrictID
+        WHERE District IN (SELECT value FROM json_each(?)))
+    """
+
+TOTAL_YEARLY_BENEFITS_SQL = "SELECT SUM(TotalYearlyBenefits) FROM EconomicBenefits"
+
+VACANT_SITE_COUNT_SQL = "SELECT COUNT(*) FROM Sites WHERE SiteStatus NOT LIKE 'Inhabited'"
+
+SITES_BY_DISTRICT_SQL = """
+    SELECT District, COUNT(*)
+    FROM Districts
+    JOIN Addresses ON Addresses.DistrictID = Districts.DistrictID
+    JOIN Sites ON Sites.AddressID = Addresses.AddressID
+    WHERE SiteStatus = ?
+    GROUP BY Districts.DistrictID
+    ORDER BY District
+    """
+
+SITES_IN_DISTRICTS_SQL = """
+    SELECT District, COUNT(*)
+    FROM Districts
+    JOIN Addresses ON Addresses.DistrictID = Districts.DistrictID
+    JOIN Sites ON Sites.AddressID = Addresses.AddressID
+    WHERE SiteStatus = ? AND District IN (SELECT value FROM json_each(?))
+    GROUP BY Districts.DistrictID
+    """
+
+TOP_SPECIES_SQL = """
+    SELECT BotanicalName, CommonName, COUNT(SiteSpecies.SiteID)
+    FROM Species
+    JOIN SiteSpecies ON Species.SpeciesID = SiteSpecies.SpeciesID
+    JOIN Sites ON Sites.SiteID = SiteSpecies.SiteID
+    WHERE SiteStatus = ?
+    GROUP BY Species.SpeciesID
+    ORDER BY COUNT(SiteSpecies.SiteID) DESC
+    LIMIT ?
+    """
+
+TOP_POLLUTANT_SITES_SQL = """
+    SELECT CommonName, PollutantsSaved
+    FROM EnvironmentalBenefits
+    JOIN SiteSpecies ON SiteSpecies.SiteID = EnvironmentalBenefits.SiteID
+    JOIN Species ON SiteSpecies.SpeciesID = Species.SpeciesID
+    ORDER BY PollutantsSaved DESC
+    LIMIT ?
+    """
+
+result_cache = ResultCache()
+
+
+def close_connections():
+    close_pools()
+
+
+def configure_result_cache(maxsize=256, cache_dir=None):
+    # Replaces the shared result cache; cache_dir needs pyarrow
+    global result_cache
+    result_cache = ResultCache(maxsize, cache_dir)
+    return result_cache
+
+
+def run_query(database, sql, params=(), cached=True):
+    with get_pool(database).connection() as conn:
+        if not cached:
+            return conn.execute(sql, params).fetchall()
+        return result_cache.fetch(conn, database, sql, params)
+
+
+def benefit_averages(database, status="Inhabited", districts=None):
+    # Query 1: {benefit column: average} over the sites with the given status,
+    # optionally restricted to a list of districts
+    if districts is None:
+        row = run_query(database, BENEFIT_AVERAGES_SQL, (status, ))[0]
+    else:
+        row = run_query(database, BENEFIT_AVERAGES_BY_DISTRICT_SQL, (status, json.dumps(list(districts))))[0]
+    return dict(zip(BENEFIT_COLUMNS, row))
+
+
+def total_yearly_benefits(database):
+    # Query 2
+    return run_query(database, TOTAL_YEARLY_BENEFITS_SQL)[0][0]
+
+
+def vacant_site_count(database):
+    # Query 3
+    return run_query(database, VACANT_SITE_COUNT_SQL)[0][0]
+
+
+def active_sites_by_district(database, districts=None, status="Inhabited"):
+    # Query 4: {district: number of sites with status}. With districts=None every
+    # district is returned; otherwise the given ones, in the given order (0 if none).
+    if districts is None:
+        return dict(run_query(database, SITES_BY_DISTRICT_SQL, (status, )))
+
+    districts = list(districts)
+    counts = dict(run_query(database, SITES_IN_DISTRICTS_SQL, (status, json.dumps(districts))))
+    return {district: counts.get(district, 0) for district in districts}
+
+
+def top_species(database, n=None, status="Inhabited"):
+    # Query 5: [(BotanicalName, CommonName, site count)], most common first
+    return run_query(database, TOP_SPECIES_SQL, (status, -1 if n is None else n))
+
+
+def top_pollutant_sites(database, n=None):
+    # Query 6: [(CommonName, PollutantsSaved)] of the sites that absorb the most pollutants
+    return run_query(database, TOP_POLLUTANT_SITES_SQL, (-1 if n is None else n, ))
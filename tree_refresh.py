@@ -0,0 +1,203 @@
+"""Incremental refresh of the normalized tree database from a new inventory snapshot.
+
+Rebuilding with the step functions (or tree_etl.load_inventory) deletes the database
+and reloads all eight tables. refresh_inventory() instead parses the snapshot once,
+stages its per-site rows in TEMP tables and compares them with Sites, SiteSpecies,
+Measurements, EnvironmentalBenefits and EconomicBenefits by SiteID. Only new and
+changed rows are written:
+    - Sites, SiteSpecies and the benefit tables with INSERT ... ON CONFLICT(SiteID)
+      DO UPDATE, touching a row only when one of its values differs;
+    - Measurements (which has no key on SiteID) by replacing the rows of the sites
+      whose measurements changed.
+New districts, addresses and species are appended with the next free id. Existing
+ids never change, so after a refresh the numbering of those three tables can differ
+from a full rebuild of the same snapshot, but every site resolves to the same
+district, address and species.
+
+Sites that are missing from the snapshot are counted but left in place, since a
+snapshot may only cover part of the city. DistrictSummary and SpeciesSummary rows
+are recomputed only for the districts and species of the sites that changed, and
+SiteFacts and the SiteLocations spatial index only for those sites.
+
+Usage:
+    changes = refresh_inventory("Tree_Inventory_new.csv", "BuffaloTrees.db")
+"""
+
+import os
+
+from tree_db import create_connection, INSERT_SQL
+from tree_etl import read_inventory, create_sinks, create_keys, feed_row, load_inventory
+from tree_keymaps import fetch_key_map
+from tree_sitefacts import refresh_site_facts
+from tree_spatial import refresh_site_locations
+from tree_summaries import refresh_summaries, affected_groups
+
+
+SITE_TABLES = ["Sites", "SiteSpecies", "Measurements", "EnvironmentalBenefits", "EconomicBenefits"]
+CHANGED_TABLES = ["Districts", "Addresses", "Species", *SITE_TABLES] # in the order of the change counts
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info([{table}])")]
+
+
+def resolve_keys(conn, keys, changes):
+    # Returns provisional key -> id lists for addresses and botanical names, inserting
+    # the districts, addresses and species the database does not have yet
+    cur = conn.cursor()
+
+    district_to_districtid = fetch_key_map(conn, "Districts")
+    for district in keys["Districts"].values():
+        if district not in district_to_districtid:
+            cur.execute(INSERT_SQL["Districts"], (district, ))
+            district_to_districtid[district] = cur.lastrowid
+            changes["Districts"]["inserted"] += 1
+    district_ids = [district_to_districtid[district] for district in keys["Districts"].values()]
+
+    address_to_addressid = fetch_key_map(conn, "Addresses")
+    address_ids = []
+    for buildingno, street, districtkey in keys["Addresses"].values():
+        address = (int(buildingno.split(".")[0]), street, district_ids[districtkey])
+        if address not in address_to_addressid:
+            cur.execute(INSERT_SQL["Addresses"], (buildingno, street, district_ids[districtkey]))
+            address_to_addressid[address] = cur.lastrowid
+            changes["Addresses"]["inserted"] += 1
+        address_ids.append(address_to_addressid[address])
+
+    species_to_speciesid = fetch_key_map(conn, "Species")
+    for botanical, common in keys["Species"].values():
+        if botanical not in species_to_speciesid:
+            cur.execute(INSERT_SQL["Species"], (botanical, common))
+            species_to_speciesid[botanical] = cur.lastrowid
+            changes["Species"]["inserted"] += 1
+    botanical_ids = [species_to_speciesid[botanical] for botanical in keys["Botanical"].values()]
+
+    return address_ids, botanical_ids
+
+
+def stage_rows(conn, sinks, address_ids, botanical_ids):
+    # Copies the snapshot rows into TEMP tables with the same column affinities as the
+    # real ones, so values compare exactly as they would be stored
+    rows = {
+        "Sites": ((*ele[:5], address_ids[ele[5]]) for ele in sinks["Sites"].rows),
+        "SiteSpecies": ((ele[0], botanical_ids[ele[1]]) for ele in sinks["SiteSpecies"].rows),
+        "Measurements": sinks["Measurements"].rows,
+        "EnvironmentalBenefits": sinks["EnvironmentalBenefits"].rows,
+        "EconomicBenefits": sinks["EconomicBenefits"].rows,
+    }
+    for table in SITE_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS temp.[Stage{table}]")
+        conn.execute(f"CREATE TEMP TABLE [Stage{table}] AS SELECT * FROM main.[{table}] WHERE 0")
+        placeholders = ",".join("?" * len(table_columns(conn, table)))
+        conn.executemany(f"INSERT INTO temp.[Stage{table}] VALUES ({placeholders})", rows[table])
+
+
+def upsert_table(conn, table, changes):
+    columns = table_columns(conn, table)
+    values = [column for column in columns if column != "SiteID"]
+    differs = " OR ".join(f"t.[{column}] IS NOT s.[{column}]" for column in values)
+    column_list = ", ".join(f"[{column}]" for column in columns)
+
+    changes[table]["inserted"] = conn.execute(f"""
+        SELECT COUNT(*) FROM temp.[Stage{table}] s
+        WHERE NOT EXISTS (SELECT 1 FROM main.[{table}] t WHERE t.SiteID = s.SiteID)""").fetchone()[0]
+    changes[table]["updated"] = conn.execute(f"""
+        SELECT COUNT(*) FROM temp.[Stage{table}] s JOIN main.[{table}] t ON t.SiteID = s.SiteID
+        WHERE {differs}""").fetchone()[0]
+
+    conn.execute(f"""
+        INSERT INTO main.[{table}] ({column_list})
+        SELECT {column_list} FROM temp.[Stage{table}] WHERE true
+        ON CONFLICT(SiteID) DO UPDATE SET {", ".join(f"[{column}] = excluded.[{column}]" for column in values)}
+        WHERE {" OR ".join(f"[{table}].[{column}] IS NOT excluded.[{column}]" for column in values)}""")
+
+
+def replace_measurements(conn, changes):
+    # Measurements has no key on SiteID, so the rows of every site whose set of
+    # measurements differs from the snapshot are deleted and re-inserted
+    conn.execute("DROP TABLE IF EXISTS temp.ChangedMeasurements")
+    conn.execute("""
+        CREATE TEMP TABLE ChangedMeasurements AS
+        SELECT SiteID FROM (SELECT * FROM temp.StageMeasurements EXCEPT SELECT * FROM main.Measurements)
+        UNION
+        SELECT SiteID FROM (SELECT * FROM main.Measurements WHERE SiteID IN (SELECT SiteID FROM temp.StageMeasurements)
+                            EXCEPT SELECT * FROM temp.StageMeasurements)""")
+
+    changes["Measurements"]["inserted"] = conn.execute("""
+        SELECT COUNT(*) FROM temp.ChangedMeasurements c
+        WHERE NOT EXISTS (SELECT 1 FROM main.Measurements m WHERE m.SiteID = c.SiteID)""").fetchone()[0]
+    changes["Measurements"]["updated"] = conn.execute(
+        "SELECT COUNT(*) FROM temp.ChangedMeasurements").fetchone()[0] - changes["Measurements"]["inserted"]
+
+    conn.execute("DELETE FROM main.Measurements WHERE SiteID IN (SELECT SiteID FROM temp.ChangedMeasurements)")
+    conn.execute("""
+        INSERT INTO main.Measurements
+        SELECT * FROM temp.StageMeasurements WHERE SiteID IN (SELECT SiteID FROM temp.ChangedMeasurements)
+        ORDER BY SiteID""")
+
+
+def refresh_inventory(datafile, database, report=True):
+    # Applies a new inventory snapshot to database and returns the change counts.
+    # If database does not exist yet it is built with a full load instead, and every
+    # row counts as inserted.
+    if not os.path.exists(database):
+        stats = load_inventory(datafile, database)
+        changes = {table: {"inserted": stats[table]["rows"], "updated": 0} for table in CHANGED_TABLES}
+        result = {"tables": changes, "status_changes": {}, "not_in_snapshot": 0}
+        if report:
+            print_changes(result)
+        return result
+
+    sinks, keys = create_sinks(), create_keys()
+    for data in read_inventory(datafile):
+        feed_row(sinks, keys, data)
+
+    changes = {table: {"inserted": 0, "updated": 0} for table in CHANGED_TABLES}
+    conn = create_connection(database)
+    with conn:
+        address_ids, botanical_ids = resolve_keys(conn, keys, changes)
+        stage_rows(conn, sinks, address_ids, botanical_ids)
+
+        status_changes = {(old, new): count for old, new, count in conn.execute("""
+            SELECT t.SiteStatus, s.SiteStatus, COUNT(*) FROM temp.StageSites s JOIN main.Sites t ON t.SiteID = s.SiteID
+            WHERE t.SiteStatus IS NOT s.SiteStatus GROUP BY 1, 2 ORDER BY 1, 2""")}
+        not_in_snapshot = conn.execute(
+            "SELECT COUNT(*) FROM main.Sites WHERE SiteID NOT IN (SELECT SiteID FROM temp.StageSites)").fetchone()[0]
+
+        # Sites with any new or changed row; their districts and species are the
+        # summary rows to recompute, both before and after the changes are applied
+        conn.execute("DROP TABLE IF EXISTS temp.AffectedSites")
+        conn.execute("CREATE TEMP TABLE AffectedSites AS " + " UNION ".join(
+            f"SELECT SiteID FROM (SELECT * FROM temp.[Stage{table}] EXCEPT SELECT * FROM main.[{table}])"
+            for table in SITE_TABLES))
+        districts_before, species_before = affected_groups(conn, "temp.AffectedSites")
+
+        for table in SITE_TABLES:
+            if table == "Measurements":
+                replace_measurements(conn, changes)
+            else:
+                upsert_table(conn, table, changes)
+
+        districts_after, species_after = affected_groups(conn, "temp.AffectedSites")
+        refresh_summaries(conn, districts_before | districts_after, species_before | species_after)
+        refresh_site_facts(conn, "temp.AffectedSites")
+        refresh_site_locations(conn, "temp.AffectedSites")
+
+    for table in SITE_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS temp.[Stage{table}]")
+    conn.execute("DROP TABLE IF EXISTS temp.ChangedMeasurements")
+    conn.execute("DROP TABLE IF EXISTS temp.AffectedSites")
+    conn.close()
+
+    result = {"tables": changes, "status_changes": status_changes, "not_in_snapshot": not_in_snapshot}
+    if report:
+        print_changes(result)
+    return result
+
+
+def print_changes(result):
+    for table, counts in result["tables"].items():
+        print(f"{table:<22} {counts['inserted']:>8} inserted {counts['updated']:>8} updated")
+    for (old, new), count in result["status_changes"].items():
+        print(f"{old} -> {new}: {count} sites")
+    print(f"Sites not in snapshot (kept): {result['not_in_snapshot']}")
@@ -0,0 +1,278 @@
+"""Local HTTP service for the analysis queries, built on asyncio.
+
+Every endpoint answers GET with JSON:
+
+    /benefit-averages?status=Inhabited&district=Ellicott    query 1 (district repeatable)
+    /total-benefits                                          query 2
+    /vacancy                                                 query 3
+    /district-sites?status=Inhabited&district=Delaware       query 4 (all districts without district)
+    /top-species?n=10&status=Inhabited                       query 5
+    /top-pollutant-sites?n=10                                query 6
+    /sites/bbox?min_lat=..&min_lon=..&max_lat=..&max_lon=..&status=Vacant
+    /sites/within?lat=..&lon=..&radius_m=200&status=Vacant
+    /sites/nearest?lat=..&lon=..&k=10&status=Vacant
+    /stats                                                   request, coalescing and cache counters
+
+The event loop only parses requests and writes responses (HTTP/1.1 with keep-alive).
+The SQLite calls, and the JSON encoding of their results, run on a bounded thread
+pool whose size matches the read-only connection pool (see tree_pool), so a burst of
+requests queues for a worker instead of opening more connections. Identical requests
+that arrive while one is still running share its result instead of queueing again,
+and the query functions of tree_queries answer repeats from the shared ResultCache
+until the database changes.
+
+Usage:
+    python tree_service.py BuffaloTrees.db --port 8503
+    curl "http://127.0.0.1:8503/top-species?n=5"
+"""
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import tree_queries
+from tree_pool import POOL_SIZE, get_pool
+from tree_queries import (benefit_averages, total_yearly_benefits, vacant_site_count, active_sites_by_district,
+                          top_species, top_pollutant_sites)
+from tree_spatial import sites_in_bbox, sites_within_radius, nearest_sites
+
+
+HOST = "127.0.0.1"
+PORT = 8503
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+def single(params, name, default=None, convert=str):
+    # The one value of query parameter name, converted; ValueError (a 400) if it is
+    # missing without a default or does not convert
+    values = params.get(name)
+    if not values:
+        if default is None:
+            raise ValueError(f"missing parameter {name!r}")
+        return default
+    try:
+        return convert(values[-1])
+    except ValueError:
+        raise ValueError(f"invalid {name}: {values[-1]!r}") from None
+
+
+async def read_line(reader):
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError): # readline reports an overrun as ValueError
+        raise ValueError("request line or header too long") from None
+
+
+async def read_request_head(reader):
+    # (request line, {header name: value}) of the next request, skipping its body; the
+    # request line is empty at the end of the stream. ValueError (a 400) for a line
+    # over the stream limit or a bad Content-Length
+    request_line = await read_line(reader)
+    headers = {}
+    if not request_line.strip():
+        return request_line, headers
+    while True:
+        line = await read_line(reader)
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("content-length"):
+        length = headers["content-length"]
+        if not (length.isascii() and length.isdigit()):
+            raise ValueError(f"invalid Content-Length: {length!r}")
+        await reader.readexactly(int(length)) # GET bodies are ignored
+    return request_line, headers
+
+
+def write_response(writer, status, body, keep_alive):
+    writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                  f"Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body)
+
+
+def site_rows(rows, distance=False):
+    names = ["SiteID", "Latitude", "Longitude", "SiteStatus"] + (["Distance"] if distance else [])
+    return [dict(zip(names, row)) for row in rows]
+
+
+def benefit_averages_endpoint(database, params):
+    return benefit_averages(database, single(params, "status", "Inhabited"), params.get("district"))
+
+
+def total_benefits_endpoint(database, params):
+    return {"TotalYearlyBenefits": total_yearly_benefits(database)}
+
+
+def vacancy_endpoint(database, params):
+    return {"VacantSites": vacant_site_count(database)}
+
+
+def district_sites_endpoint(database, params):
+    return active_sites_by_district(database, params.get("district"), single(params, "status", "Inhabited"))
+
+
+def top_species_endpoint(database, params):
+    rows = top_species(database, single(params, "n", 10, int), single(params, "status", "Inhabited"))
+    return [{"BotanicalName": botanical, "CommonName": common, "Sites": count} for botanical, common, count in rows]
+
+
+def top_pollutant_sites_endpoint(database, params):
+    rows = top_pollutant_sites(database, single(params, "n", 10, int))
+    return [{"CommonName": common, "PollutantsSaved": saved} for common, saved in rows]
+
+
+def bbox_endpoint(database, params):
+    box = [single(params, name, convert=float) for name in ["min_lat", "min_lon", "max_lat", "max_lon"]]
+    return site_rows(sites_in_bbox(database, *box, status=params.get("status", [None])[-1]))
+
+
+def within_endpoint(database, params):
+    rows = sites_within_radius(database, single(params, "lat", convert=float), single(params, "lon", convert=float),
+                               single(params, "radius_m", 200.0, float), params.get("status", [None])[-1])
+    return site_rows(rows, distance=True)
+
+
+def nearest_endpoint(database, params):
+    rows = nearest_sites(database, single(params, "lat", convert=float), single(params, "lon", convert=float),
+                         single(params, "k", 10, int), single(params, "status", "Vacant"))
+    return site_rows(rows, distance=True)
+
+
+ENDPOINTS = {
+    "/benefit-averages": benefit_averages_endpoint,
+    "/total-benefits": total_benefits_endpoint,
+    "/vacancy": vacancy_endpoint,
+    "/district-sites": district_sites_endpoint,
+    "/top-species": top_species_endpoint,
+    "/top-pollutant-sites": top_pollutant_sites_endpoint,
+    "/sites/bbox": bbox_endpoint,
+    "/sites/within": within_endpoint,
+    "/sites/nearest": nearest_endpoint,
+}
+
+
+def run_endpoint(endpoint, database, params):
+    # Worker thread: the endpoint's result, already encoded
+    return json.dumps(endpoint(database, params)).encode()
+
+
+class QueryService:
+
+    def __init__(self, database, workers=POOL_SIZE):
+        self.database = database
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tree-query")
+        get_pool(database, size=workers)
+        self.in_flight = {} # request key -> future of its encoded result
+        self.stats = {"requests": 0, "executed": 0, "coalesced": 0}
+
+    def close(self):
+        self.executor.shutdown()
+
+    async def call(self, path, params):
+        # Encoded result of path with params, joining an identical request in flight
+        key = (path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        self.stats["executed"] += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run_endpoint, ENDPOINTS[path],
+                                                             self.database, params)
+        self.in_flight[key] = future
+        try:
+            # shielded so a client that disconnects does not cancel the others' result
+            return await asyncio.shield(future)
+        finally:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+
+    async def respond(self, method, target):
+        # (status, JSON body) of one request
+        self.stats["requests"] += 1
+        url = urlsplit(target)
+        if url.path not in ENDPOINTS and url.path != "/stats":
+            return 404, json.dumps({"error": f"unknown endpoint {url.path}", "endpoints": list(ENDPOINTS)}).encode()
+        if method != "GET":
+            return 405, json.dumps({"error": f"{method} not allowed"}).encode()
+        if url.path == "/stats":
+            cache = tree_queries.result_cache
+            return 200, json.dumps({**self.stats, "cache_hits": cache.hits, "cache_misses": cache.misses}).encode()
+
+        try:
+            return 200, await self.call(url.path, parse_qs(url.query))
+        except ValueError as e:
+            return 400, json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            return 500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode()
+
+    async def handle(self, reader, writer):
+        # One client connection: requests are answered in order until either side closes
+        try:
+            while True:
+                try:
+                    request_line, headers = await read_request_head(reader)
+                except ValueError as e:
+                    # the rest of the stream cannot be split into requests, so answer and close
+                    write_response(writer, 400, json.dumps({"error": str(e)}).encode(), False)
+                    await writer.drain()
+                    break
+                if not request_line.strip():
+                    break
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) == 3:
+                    method, target, version = parts
+                    status, body = await self.respond(method, target)
+                else:
+                    version = "HTTP/1.0"
+                    status, body = 400, json.dumps({"error": "malformed request line"}).encode()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                write_response(writer, status, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(database, host=HOST, port=PORT, workers=POOL_SIZE, ready=None):
+    # Runs the service until cancelled; ready(host, port) is called once it listens
+    service = QueryService(database, workers)
+    server = await asyncio.start_server(service.handle, host, port, limit=1 << 16)
+    try:
+        async with server:
+            host, port = server.sockets[0].getsockname()[:2]
+            if ready is not None:
+                ready(host, port)
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the tree analysis queries over local HTTP")
+    parser.add_argument("database")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT, help="0 picks a free port")
+    parser.add_argument("--workers", type=int, default=POOL_SIZE, help="threads (and pooled connections) for SQLite")
+    parser.add_argument("--cache-dir", help="also keep query results on disk (needs pyarrow)")
+    args = parser.parse_args()
+
+    if args.cache_dir:
+        tree_queries.configure_result_cache(cache_dir=args.cache_dir)
+    try:
+        asyncio.run(serve(args.database, args.host, args.port, args.workers,
+                          ready=lambda host, port: print(f"Serving {args.database} on http://{host}:{port}", flush=True)))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,144 @@
+"""Multi-year canopy growth projections for planting plans.
+
+A plan is a list of plantings, each a dict with
+    species_id  SpeciesID to plant
+    sites       how many vacant sites to plant
+    districts   district names to plant in (default: anywhere)
+    dbh         DiameterBreastHeight at planting, in inches (default PLANTING_DBH)
+    year        year of the projection the trees go in (default 0)
+Plantings take the free vacant sites of their districts in planting priority order
+(see tree_priority), so the first plantings get the best sites.
+
+load_state() reads the inventory once into NumPy arrays sized to the Sites table
+(SiteID order) plus the species / DBH benefit tables (see tree_estimates). project()
+collapses the existing trees and every planting into cohorts of equal species, DBH
+and planting year, grows each cohort's DBH by its species' growth rate (inches per
+year), discounts it by the annual mortality, and looks the benefits up for every
+cohort and year in a single vectorized batch. Existing trees are valued with the
+same lookup tables as new ones, so year 0 is the model's view of today's canopy.
+
+run_scenarios() projects many plans on a process pool. Each worker receives the
+state once, when it starts, and then only the plans.
+
+Usage:
+    state = load_state("BuffaloTrees.db")
+    plans = {"ellicott": [{"species_id": 42, "districts": ["Ellicott"], "sites": 200}]}
+    totals = run_scenarios("BuffaloTrees.db", plans, years=30)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tree_estimates import ESTIMATE_COLUMNS, benefit_tables, load_site_facts
+from tree_priority import score_sites
+
+
+PLANTING_DBH = 2.0
+GROWTH_RATE = 0.4 # inches of DBH per year, for species without their own rate
+MORTALITY = 0.02 # share of the trees of a cohort lost every year
+
+STATE_COLUMNS = ["SiteID", "SiteStatus", "Latitude", "Longitude", "District", "SpeciesID",
+                 "DiameterBreastHeight", "TotalYearlyBenefits"]
+
+_worker_state = None
+
+
+def load_state(database, radius_m=200):
+    # Site arrays, vacant sites in priority order and the fitted benefit tables
+    sites = load_site_facts(database, STATE_COLUMNS)
+    district_codes, district_names = pd.factorize(sites["District"])
+    site_ids = sites["SiteID"].to_numpy()
+    ranked = score_sites(sites, radius_m)["SiteID"].to_numpy()
+    species = sites["SpeciesID"].to_numpy(dtype=np.int64, na_value=0) # no SpeciesID: the all-species estimates
+    dbh = sites["DiameterBreastHeight"].to_numpy(dtype=np.float64)
+    inhabited = (sites["SiteStatus"] == "Inhabited").to_numpy()
+    # the existing trees as (species, dbh) cohorts, counted once here rather than per plan
+    cohorts, counts = np.unique(np.stack([species[inhabited], dbh[inhabited]]), axis=1, return_counts=True)
+    return {
+        "site_ids": site_ids,
+        "districts": district_codes,
+        "district_names": list(district_names),
+        "species": species,
+        "dbh": dbh,
+        "inhabited": inhabited,
+        "existing": (cohorts[0], cohorts[1], counts),
+        "priority_order": np.searchsorted(site_ids, ranked),
+        "tables": benefit_tables(database),
+    }
+
+
+def planting_cohorts(state, plantings):
+    # (species, dbh, trees, start year) arrays: the existing trees plus every planting
+    existing_species, existing_dbh, counts = state["existing"]
+    species, dbh, trees, start = [existing_species], [existing_dbh], [counts], [np.zeros(len(counts))]
+    planted = np.zeros(len(state["site_ids"]), dtype=bool)
+    order = state["priority_order"]
+
+    for planting in plantings:
+        candidates = order[~planted[order]]
+        if planting.get("districts") is not None:
+            codes = [state["district_names"].index(name) for name in planting["districts"] if name in state["district_names"]]
+            candidates = candidates[np.isin(state["districts"][candidates], codes)]
+        chosen = candidates[:planting["sites"]]
+        planted[chosen] = True
+        species.append([planting["species_id"]])
+        dbh.append([planting.get("dbh", PLANTING_DBH)])
+        trees.append([len(chosen)])
+        start.append([planting.get("year", 0)])
+
+    return tuple(np.concatenate(values).astype(np.float64) for values in (species, dbh, trees, start))
+
+
+def project(state, plantings, years=20, growth_rates=None, growth_rate=GROWTH_RATE, mortality=MORTALITY):
+    # DataFrame with one row per year 0..years: expected living trees and the
+    # ESTIMATE_COLUMNS totals
+    species, dbh, trees, start = planting_cohorts(state, plantings)
+    rates = np.full(len(species), growth_rate)
+    if growth_rates:
+        known = np.array(list(growth_rates.keys()))
+        rows = np.isin(species, known)
+        rates[rows] = [growth_rates[int(species_id)] for species_id in species[rows]]
+
+    year = np.arange(years + 1, dtype=np.float64)[:, None] # (years + 1, 1) against (cohorts, )
+    age = year - start
+    growing = age >= 0
+    alive = np.where(growing, trees * (1 - mortality) ** np.maximum(age, 0), 0.0)
+    sizes = dbh + rates * np.maximum(age, 0)
+
+    estimates = state["tables"].estimate(np.broadcast_to(species, sizes.shape).ravel(), sizes.ravel())
+    totals = (estimates.reshape(*sizes.shape, -1) * alive[..., None]).sum(axis=1)
+
+    projection = pd.DataFrame(totals, columns=ESTIMATE_COLUMNS)
+    projection.insert(0, "Trees", alive.sum(axis=1))
+    projection.insert(0, "Year", np.arange(years + 1))
+    return projection
+
+
+def init_worker(state):
+    global _worker_state
+    _worker_state = state
+
+
+def project_scenario(args):
+    plantings, years, options = args
+    return project(_worker_state, plantings, years, **options)
+
+
+def run_scenarios(database, scenarios, years=20, workers=None, state=None, **options):
+    # Projects every {name: plantings} scenario and returns one frame with a
+    # Scenario column; options are passed on to project()
+    state = load_state(database) if state is None else state
+    workers = workers or os.cpu_count() or 1
+    names = list(scenarios)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(state, )) as pool:
+        chunksize = max(1, len(names) // (workers * 4))
+        projections = list(pool.map(project_scenario, [(scenarios[name], years, options) for name in names],
+                                    chunksize=chunksize))
+
+    for name, projection in zip(names, projections):
+        projection.insert(0, "Scenario", name)
+    return pd.concat(projections, ignore_index=True) if projections else pd.DataFrame()
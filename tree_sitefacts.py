@@ -0,0 +1,106 @@
+"""SiteFacts: one pre-joined row per site for the pandas analytics.
+
+The analysis and visualization scripts rebuilt the same chains of merges for every
+query (sites -> addresses -> districts, sites -> sitespecies -> species, and the two
+benefit tables). SiteFacts holds the result of those joins, one row per SiteID:
+
+SiteFacts
+[SiteID] Integer not null Primary Key, [SiteNumber], [SiteStatus], [Latitude], [Longitude]
+[AddressID], [BuildingNo], [Street], [DistrictID], [District]
+[SpeciesID], [BotanicalName], [CommonName]
+[DiameterBreastHeight], [LeafSurfaceArea]  the site's first Measurements row
+[PollutantsSaved] ... [ThermsSaved]        EnvironmentalBenefits
+[CO2Benefits] ... [TotalYearlyBenefits]    EconomicBenefits
+
+The species, measurement and benefit columns are null for a site without a row in
+those tables (every loaded site has one). refresh_site_facts() rebuilds every row,
+or only the rows of the SiteIDs listed in a table; tree_etl runs the full rebuild at
+load time and tree_refresh rebuilds the sites a snapshot changed.
+"""
+
+
+CREATE_SITE_FACTS_SQL = """
+    CREATE TABLE IF NOT EXISTS [SiteFacts](
+    [SiteID] Integer not null Primary Key,
+    [SiteNumber] Integer not null,
+    [SiteStatus] Text not null,
+    [Latitude] Float not null,
+    [Longitude] Float not null,
+    [AddressID] Integer not null,
+    [BuildingNo] Integer not null,
+    [Street] Text not null,
+    [DistrictID] Integer not null,
+    [District] Text not null,
+    [SpeciesID] Integer,
+    [BotanicalName] Text,
+    [CommonName] Text,
+    [DiameterBreastHeight] Float,
+    [LeafSurfaceArea] Float,
+    [PollutantsSaved] Float,
+    [CO2Avoided] Float,
+    [CO2Sequestered] Float,
+    [StormwaterGallonsSaved] Float,
+    [KilowattHoursSaved] Float,
+    [ThermsSaved] Float,
+    [CO2Benefits] Float,
+    [EnergyBenefits] Float,
+    [StormwaterBenefits] Float,
+    [AirQualityBenefits] Float,
+    [PropertyBenefits] Float,
+    [TotalYearlyBenefits] Float,
+    Foreign Key (SiteID) References Sites (SiteID)
+    )
+    """
+
+## The joins SiteFacts materializes, in SiteID order
+SITE_FACTS_SELECT_SQL = """
+    SELECT s.SiteID, s.SiteNumber, s.SiteStatus, s.Latitude, s.Longitude,
+        a.AddressID, a.BuildingNo, a.Street, d.DistrictID, d.District,
+        sp.SpeciesID, sp.BotanicalName, sp.CommonName,
+        m.DiameterBreastHeight, m.LeafSurfaceArea,
+        e.PollutantsSaved, e.CO2Avoided, e.CO2Sequestered, e.StormwaterGallonsSaved,
+        e.KilowattHoursSaved, e.ThermsSaved,
+        c.CO2Benefits, c.EnergyBenefits, c.StormwaterBenefits, c.AirQualityBenefits,
+        c.PropertyBenefits, c.TotalYearlyBenefits
+    FROM Sites s
+    JOIN Addresses a ON a.AddressID = s.AddressID
+    JOIN Districts d ON d.DistrictID = a.DistrictID
+    LEFT JOIN SiteSpecies ss ON ss.SiteID = s.SiteID
+    LEFT JOIN Species sp ON sp.SpeciesID = ss.SpeciesID
+    LEFT JOIN Measurements m ON m.rowid = (SELECT MIN(rowid) FROM Measurements WHERE SiteID = s.SiteID)
+    LEFT JOIN EnvironmentalBenefits e ON e.SiteID = s.SiteID
+    LEFT JOIN EconomicBenefits c ON c.SiteID = s.SiteID
+    {where}
+    ORDER BY s.SiteID
+    """
+
+SITE_FACTS_INDEXES = {
+    "idx_SiteFacts_District": "CREATE INDEX IF NOT EXISTS idx_SiteFacts_District ON SiteFacts (District, SiteStatus)",
+    "idx_SiteFacts_SpeciesID": "CREATE INDEX IF NOT EXISTS idx_SiteFacts_SpeciesID ON SiteFacts (SpeciesID)",
+}
+
+
+def create_site_facts(conn):
+    conn.execute(CREATE_SITE_FACTS_SQL)
+    for sql in SITE_FACTS_INDEXES.values():
+        conn.execute(sql)
+
+
+def site_facts_exist(conn):
+    return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'SiteFacts'").fetchone()[0] == 1
+
+
+def refresh_site_facts(conn, site_table=None):
+    # Rebuilds the SiteFacts rows of the SiteIDs listed in site_table, or every row
+    # when site_table is None. A database without SiteFacts always gets a full rebuild.
+    if not site_facts_exist(conn):
+        create_site_facts(conn)
+        site_table = None
+
+    if site_table is None:
+        conn.execute("DELETE FROM SiteFacts")
+        conn.execute("INSERT INTO SiteFacts " + SITE_FACTS_SELECT_SQL.format(where=""))
+    else:
+        conn.execute(f"DELETE FROM SiteFacts WHERE SiteID IN (SELECT SiteID FROM {site_table})")
+        conn.execute("INSERT INTO SiteFacts " + SITE_FACTS_SELECT_SQL.format(
+            where=f"WHERE s.SiteID IN (SELECT SiteID FROM {site_table})"))
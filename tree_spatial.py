@@ -0,0 +1,146 @@
+"""Spatial lookups over the site coordinates, backed by an SQLite R*Tree index.
+
+SiteLocations is an R*Tree virtual table with one box per SiteID (a point, so the
+min and max of each axis are equal):
+
+SiteLocations
+[SiteID], [MinLat], [MaxLat], [MinLon], [MaxLon]
+
+R*Tree stores 32-bit floats, rounding each box outwards, so an index lookup returns
+a small superset of the matches; every query re-checks the exact coordinates from
+Sites. tree_etl builds the index at load time and tree_refresh updates the sites a
+snapshot changed. The query functions read through the database's read-only
+connection pool (see tree_pool), so they can run on several threads. For a database
+loaded without the index (e.g. by the step functions) the first query builds it on
+a private connection of its own: one thread at a time, holding a module lock, and in
+one transaction. Other readers therefore see either no SiteLocations or the full
+index, never an empty one.
+
+    sites_in_bbox(database, min_lat, min_lon, max_lat, max_lon)
+    sites_within_radius(database, lat, lon, radius_m)
+    nearest_sites(database, lat, lon, k=10, status="Vacant")
+
+each return [(SiteID, Latitude, Longitude, SiteStatus, ...)] rows; the last two add
+the distance in meters and are ordered nearest first. Distances are great-circle
+(haversine) distances.
+"""
+
+import math
+import sqlite3
+import threading
+
+from tree_pool import get_pool
+
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_M / 180
+HALF_CIRCUMFERENCE_M = math.pi * EARTH_RADIUS_M # no two points are farther apart
+
+CREATE_SITE_LOCATIONS_SQL = "CREATE VIRTUAL TABLE IF NOT EXISTS SiteLocations USING rtree(SiteID, MinLat, MaxLat, MinLon, MaxLon)"
+
+SITE_LOCATIONS_SQL = "INSERT OR REPLACE INTO SiteLocations SELECT SiteID, Latitude, Latitude, Longitude, Longitude FROM Sites {where}"
+
+_build_lock = threading.Lock()
+
+## Candidates from the index, re-checked against the exact coordinates
+BBOX_SQL = """
+    SELECT s.SiteID, s.Latitude, s.Longitude, s.SiteStatus
+    FROM SiteLocations r
+    JOIN Sites s ON s.SiteID = r.SiteID
+    WHERE r.MaxLat >= :min_lat AND r.MinLat <= :max_lat
+        AND r.MaxLon >= :min_lon AND r.MinLon <= :max_lon
+        AND s.Latitude BETWEEN :min_lat AND :max_lat
+        AND s.Longitude BETWEEN :min_lon AND :max_lon
+        AND (:status IS NULL OR s.SiteStatus = :status)
+    ORDER BY s.SiteID
+    """
+
+
+def site_locations_exist(conn):
+    return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'SiteLocations'").fetchone()[0] == 1
+
+
+def refresh_site_locations(conn, site_table=None):
+    # Re-indexes the SiteIDs listed in site_table, or every site when site_table is
+    # None. A database without SiteLocations is always indexed in full.
+    if not site_locations_exist(conn):
+        conn.execute(CREATE_SITE_LOCATIONS_SQL)
+        site_table = None
+
+    if site_table is None:
+        conn.execute("DELETE FROM SiteLocations")
+        conn.execute(SITE_LOCATIONS_SQL.format(where=""))
+    else:
+        conn.execute(f"DELETE FROM SiteLocations WHERE SiteID IN (SELECT SiteID FROM {site_table})")
+        conn.execute(SITE_LOCATIONS_SQL.format(where=f"WHERE SiteID IN (SELECT SiteID FROM {site_table})"))
+
+
+def ensure_site_locations(database):
+    # Builds SiteLocations for a database loaded without it; the table is created and
+    # filled in one transaction, so it never exists empty
+    with _build_lock:
+        conn = sqlite3.connect(database, timeout=60)
+        try:
+            conn.execute("BEGIN IMMEDIATE") # also keeps other processes from building it twice
+            if not site_locations_exist(conn):
+                refresh_site_locations(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    # Great-circle distance in meters
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat, lon, radius_m):
+    # (min_lat, min_lon, max_lat, max_lon) of a box containing the circle
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    # the circle is widest in longitude at the latitude closest to a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 90.0:
+        return min_lat, -180.0, max_lat, 180.0
+    dlon = min(dlat / math.cos(math.radians(widest)), 180.0)
+    return min_lat, lon - dlon, max_lat, lon + dlon
+
+
+def sites_in_bbox(database, min_lat, min_lon, max_lat, max_lon, status=None):
+    # [(SiteID, Latitude, Longitude, SiteStatus)] inside the box, in SiteID order
+    params = {"min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon, "status": status}
+    with get_pool(database).connection() as conn:
+        if site_locations_exist(conn):
+            return conn.execute(BBOX_SQL, params).fetchall()
+    ensure_site_locations(database)
+    with get_pool(database).connection() as conn:
+        return conn.execute(BBOX_SQL, params).fetchall()
+
+
+def sites_within_radius(database, lat, lon, radius_m, status=None):
+    # [(SiteID, Latitude, Longitude, SiteStatus, distance in meters)] within radius_m
+    # of (lat, lon), nearest first
+    rows = []
+    for row in sites_in_bbox(database, *radius_bbox(lat, lon, radius_m), status=status):
+        distance = haversine(lat, lon, row[1], row[2])
+        if distance <= radius_m:
+            rows.append(row + (distance, ))
+    rows.sort(key=lambda row: (row[4], row[0]))
+    return rows
+
+
+def nearest_sites(database, lat, lon, k=10, status="Vacant", start_radius_m=250):
+    # The k sites with status nearest to (lat, lon), as in sites_within_radius. The
+    # search radius doubles until it holds k sites or covers the whole globe.
+    if k <= 0:
+        return []
+
+    radius = start_radius_m
+    while True:
+        rows = sites_within_radius(database, lat, lon, min(radius, HALF_CIRCUMFERENCE_M), status)
+        if len(rows) >= k or radius >= HALF_CIRCUMFERENCE_M:
+            return rows[:k]
+        radius *= 2
@@ -0,0 +1,187 @@
+"""Bounded-memory query 1, 2, 3 and 5 aggregates straight from an inventory file.
+
+Building the normalized database (or the DataFrames of the pandas checks) holds
+every row in memory. stream_aggregates() instead runs the inventory through a chain
+of generators (read, clean, drop repeated sites, aggregate) and keeps only running
+totals:
+    - query 1: sums of the six EnvironmentalBenefits columns and the count of
+      inhabited sites;
+    - query 2: the sum of TotalYearlyBenefits;
+    - query 3: the count of sites that are not inhabited;
+    - query 5: inhabited sites per species.
+Sites are cleaned the same way as feed_row() in tree_etl, so the results match the
+queries on a database loaded from the same file.
+
+The two pieces of state that grow with the inventory, the SiteIDs seen so far and
+the per-species counts, are held in memory up to max_keys entries and then spilled
+to an SQLite file (a temporary one unless spill_path is given), so memory stays
+bounded however large the file is. Peak resident memory is reported with the
+results where the platform provides it.
+
+Usage:
+    results = stream_aggregates("Tree_Inventory_full.csv")
+    python tree_streaming.py Tree_Inventory_full.csv --max-keys 100000
+"""
+
+import argparse
+import sqlite3
+import sys
+
+from tree_etl import (read_inventory, NO_SPECIES, NO_SITE_SPECIES, BOTANICAL_NAME, COMMON_NAME, SITE_ID,
+                      CO2_AVOIDED, CO2_SEQUESTERED, POLLUTANTS_SAVED, STORMWATER_GALLONS, KWH_SAVED,
+                      THERMS_SAVED, TOTAL_YEARLY_BENEFITS)
+from tree_queries import BENEFIT_COLUMNS
+
+
+MAX_KEYS = 100000
+
+BENEFIT_FIELDS = [CO2_AVOIDED, CO2_SEQUESTERED, POLLUTANTS_SAVED, STORMWATER_GALLONS, KWH_SAVED, THERMS_SAVED]
+
+
+class SpillingSet:
+    """Set of keys kept in memory up to max_keys, then moved to an SQLite table."""
+
+    def __init__(self, conn, name, max_keys=MAX_KEYS):
+        self.conn = conn
+        self.name = name
+        self.max_keys = max_keys
+        self.keys = set()
+        self.spilled = False
+        conn.execute(f"CREATE TABLE IF NOT EXISTS [{name}] ([Key] Primary Key) WITHOUT ROWID")
+
+    def add(self, key):
+        # True if key was not in the set yet
+        if key in self.keys:
+            return False
+        if self.spilled and self.conn.execute(f"SELECT 1 FROM [{self.name}] WHERE Key = ?", (key, )).fetchone():
+            return False
+        self.keys.add(key)
+        if len(self.keys) >= self.max_keys:
+            self.spill()
+        return True
+
+    def spill(self):
+        with self.conn:
+            self.conn.executemany(f"INSERT OR IGNORE INTO [{self.name}] VALUES (?)", ((key, ) for key in self.keys))
+        self.keys.clear()
+        self.spilled = True
+
+
+class SpillingCounts:
+    """Per-key counts kept in memory up to max_keys, then added into an SQLite table."""
+
+    def __init__(self, conn, name, max_keys=MAX_KEYS):
+        self.conn = conn
+        self.name = name
+        self.max_keys = max_keys
+        self.counts = {}
+        conn.execute(f"CREATE TABLE IF NOT EXISTS [{name}] ([Key] Primary Key, [Count] Integer not null) WITHOUT ROWID")
+
+    def add(self, key, count=1):
+        self.counts[key] = self.counts.get(key, 0) + count
+        if len(self.counts) >= self.max_keys:
+            self.spill()
+
+    def spill(self):
+        with self.conn:
+            self.conn.executemany(f"""
+                INSERT INTO [{self.name}] VALUES (?, ?)
+                ON CONFLICT(Key) DO UPDATE SET Count = Count + excluded.Count""", self.counts.items())
+        self.counts.clear()
+
+    def items(self):
+        # (key, count) pairs of every key, from the spill table
+        self.spill()
+        return self.conn.execute(f"SELECT Key, Count FROM [{self.name}]")
+
+
+def clean_sites(rows, common_names):
+    # Yields (SiteID, inhabited, species, benefits, total yearly benefits) per row and
+    # records the common name each species resolves to in common_names
+    seen_species = set()
+    for data in rows:
+        botanical = data[BOTANICAL_NAME]
+        if botanical not in NO_SPECIES:
+            species = (botanical.split("'")[0].strip(), data[COMMON_NAME].split("'")[0].strip())
+        else:
+            species = ("None", "None")
+        # like the Species map of step 7, a botanical name takes the common name of
+        # the last (botanical, common) pair seen for the first time
+        if species not in seen_species:
+            seen_species.add(species)
+            common_names[species[0]] = species[1]
+
+        site_species = "None" if botanical in NO_SITE_SPECIES else botanical.split("'")[0].strip()
+        yield (data[SITE_ID], botanical != "VACANT", site_species,
+               [float(data[field]) for field in BENEFIT_FIELDS], float(data[TOTAL_YEARLY_BENEFITS]))
+
+
+def unique_sites(sites, seen):
+    # Drops repeated SiteIDs (the tables keep the first row of a site)
+    for site in sites:
+        if seen.add(site[0]):
+            yield site
+
+
+def peak_rss_mb():
+    # Peak resident memory of this process in MB, or None where it is not available
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def stream_aggregates(datafile, spill_path="", max_keys=MAX_KEYS):
+    # Returns the query 1, 2, 3 and 5 results for datafile, the number of sites and
+    # the peak RSS. spill_path "" spills to a temporary file.
+    conn = sqlite3.connect(spill_path)
+    seen = SpillingSet(conn, "SeenSites", max_keys)
+    species_counts = SpillingCounts(conn, "SpeciesCounts", max_keys)
+    common_names = {}
+
+    sites = inhabited = 0
+    benefit_sums = [0.0] * len(BENEFIT_FIELDS)
+    total_benefits = 0.0
+    for siteid, is_inhabited, species, benefits, total in unique_sites(clean_sites(read_inventory(datafile), common_names), seen):
+        sites += 1
+        total_benefits += total
+        if is_inhabited:
+            inhabited += 1
+            benefit_sums = [running + value for running, value in zip(benefit_sums, benefits)]
+            species_counts.add(species)
+
+    top_species = sorted(((species, common_names.get(species, "None"), count) for species, count in species_counts.items()),
+                         key=lambda ele: (-ele[2], ele[0]))
+    conn.close()
+
+    return {
+        "sites": sites,
+        "benefit_averages": {column: running / inhabited if inhabited else None
+                             for column, running in zip(BENEFIT_COLUMNS, benefit_sums)},
+        "total_yearly_benefits": total_benefits if sites else None,
+        "vacant_site_count": sites - inhabited,
+        "top_species": top_species,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream query 1, 2, 3 and 5 over an inventory file")
+    parser.add_argument("datafile")
+    parser.add_argument("--spill", default="", help="SQLite file for spilled state (default: a temporary file)")
+    parser.add_argument("--max-keys", type=int, default=MAX_KEYS, help="keys held in memory before spilling")
+    parser.add_argument("--top", type=int, default=10, help="number of species to print")
+    args = parser.parse_args()
+
+    results = stream_aggregates(args.datafile, args.spill, args.max_keys)
+    print(f"Sites: {results['sites']}")
+    for column, average in results["benefit_averages"].items():
+        print(f"AVG({column}): {average}")
+    print(f"SUM(TotalYearlyBenefits): {results['total_yearly_benefits']}")
+    print(f"Vacant sites: {results['vacant_site_count']}")
+    for botanical, common, count in results["top_species"][:args.top]:
+        print(f"{botanical:<30} {common:<30} {count:>8}")
+    if results["peak_rss_mb"] is not None:
+        print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
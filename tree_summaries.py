@@ -0,0 +1,133 @@
+"""Materialized district and species rollups for the normalized tree database.
+
+Queries 1, 3, 4 and 5 and the district charts recompute counts and sums from the raw
+tables every time. DistrictSummary and SpeciesSummary hold those aggregates, one row
+per district / species:
+
+DistrictSummary
+[DistrictID] Integer not null Primary Key, [District]
+[ActiveSites]  sites with SiteStatus = 'Inhabited' (query 4)
+[VacantSites]  sites with SiteStatus not like 'Inhabited' (query 3)
+[PollutantsSaved] ... [ThermsSaved]  EnvironmentalBenefits summed over active sites
+                                     (divide by ActiveSites for query 1's averages)
+[TotalYearlyBenefits]  EconomicBenefits summed over all sites (query 2)
+
+SpeciesSummary
+[SpeciesID] Integer not null Primary Key, [BotanicalName], [CommonName]
+[ActiveSites] (query 5), [TotalSites], [PollutantsSaved], [TotalYearlyBenefits]
+
+refresh_summaries() recomputes every row, or only the given districts / species;
+tree_etl runs the full refresh at load time and tree_refresh recomputes just the
+districts and species of the sites a snapshot changed."""
+
+
+CREATE_SUMMARY_SQL = {
+    "DistrictSummary": """
+    CREATE TABLE IF NOT EXISTS [DistrictSummary](
+    [DistrictID] Integer not null Primary Key,
+    [District] Text not null,
+    [ActiveSites] Integer not null,
+    [VacantSites] Integer not null,
+    [PollutantsSaved] Float not null,
+    [CO2Avoided] Float not null,
+    [CO2Sequestered] Float not null,
+    [StormwaterGallonsSaved] Float not null,
+    [KilowattHoursSaved] Float not null,
+    [ThermsSaved] Float not null,
+    [TotalYearlyBenefits] Float not null,
+    Foreign Key (DistrictID) References Districts (DistrictID)
+    )
+    """,
+
+    "SpeciesSummary": """
+    CREATE TABLE IF NOT EXISTS [SpeciesSummary](
+    [SpeciesID] Integer not null Primary Key,
+    [BotanicalName] Text not null,
+    [CommonName] Text not null,
+    [ActiveSites] Integer not null,
+    [TotalSites] Integer not null,
+    [PollutantsSaved] Float not null,
+    [TotalYearlyBenefits] Float not null,
+    Foreign Key (SpeciesID) References Species (SpeciesID)
+    )
+    """,
+}
+
+DISTRICT_SUMMARY_SQL = """
+    INSERT OR REPLACE INTO DistrictSummary
+    SELECT d.DistrictID, d.District,
+        COUNT(CASE WHEN s.SiteStatus = 'Inhabited' THEN 1 END),
+        COUNT(CASE WHEN s.SiteStatus NOT LIKE 'Inhabited' THEN 1 END),
+        TOTAL(CASE WHEN s.SiteStatus = 'Inhabited' THEN e.PollutantsSaved END),
+        TOTAL(CASE WHEN s.SiteStatus = 'Inhabited' THEN e.CO2Avoided END),
+        TOTAL(CASE WHEN s.SiteStatus = 'Inhabited' THEN e.CO2Sequestered END),
+        TOTAL(CASE WHEN s.SiteStatus = 'Inhabited' THEN e.StormwaterGallonsSaved END),
+        TOTAL(CASE WHEN s.SiteStatus = 'Inhabited' THEN e.KilowattHoursSaved END),
+        TOTAL(CASE WHEN s.SiteStatus = 'Inhabited' THEN e.ThermsSaved END),
+        TOTAL(c.TotalYearlyBenefits)
+    FROM Districts d
+    LEFT JOIN Addresses a ON a.DistrictID = d.DistrictID
+    LEFT JOIN Sites s ON s.AddressID = a.AddressID
+    LEFT JOIN EnvironmentalBenefits e ON e.SiteID = s.SiteID
+    LEFT JOIN EconomicBenefits c ON c.SiteID = s.SiteID
+    {where}
+    GROUP BY d.DistrictID
+    """
+
+SPECIES_SUMMARY_SQL = """
+    INSERT OR REPLACE INTO SpeciesSummary
+    SELECT sp.SpeciesID, sp.BotanicalName, sp.CommonName,
+        COUNT(CASE WHEN s.SiteStatus = 'Inhabited' THEN 1 END),
+        COUNT(s.SiteID),
+        TOTAL(e.PollutantsSaved),
+        TOTAL(c.TotalYearlyBenefits)
+    FROM Species sp
+    LEFT JOIN SiteSpecies ss ON ss.SpeciesID = sp.SpeciesID
+    LEFT JOIN Sites s ON s.SiteID = ss.SiteID
+    LEFT JOIN EnvironmentalBenefits e ON e.SiteID = s.SiteID
+    LEFT JOIN EconomicBenefits c ON c.SiteID = s.SiteID
+    {where}
+    GROUP BY sp.SpeciesID
+    """
+
+
+def create_summary_tables(conn):
+    for sql in CREATE_SUMMARY_SQL.values():
+        conn.execute(sql)
+
+
+def summaries_exist(conn):
+    return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('DistrictSummary', 'SpeciesSummary')").fetchone()[0] == 2
+
+
+def refresh_summaries(conn, district_ids=None, species_ids=None):
+    # Recomputes the summary rows of the given DistrictIDs / SpeciesIDs, or all of
+    # them when an argument is None. Pass an empty list to skip a table. A database
+    # without the summary tables always gets a full refresh.
+    if not summaries_exist(conn):
+        create_summary_tables(conn)
+        district_ids = species_ids = None
+
+    if district_ids is None:
+        conn.execute("DELETE FROM DistrictSummary")
+        conn.execute(DISTRICT_SUMMARY_SQL.format(where=""))
+    elif district_ids:
+        ids = list(district_ids)
+        conn.execute(DISTRICT_SUMMARY_SQL.format(where=f"WHERE d.DistrictID IN ({','.join('?' * len(ids))})"), ids)
+
+    if species_ids is None:
+        conn.execute("DELETE FROM SpeciesSummary")
+        conn.execute(SPECIES_SUMMARY_SQL.format(where=""))
+    elif species_ids:
+        ids = list(species_ids)
+        conn.execute(SPECIES_SUMMARY_SQL.format(where=f"WHERE sp.SpeciesID IN ({','.join('?' * len(ids))})"), ids)
+
+
+def affected_groups(conn, site_table):
+    # DistrictIDs and SpeciesIDs currently linked to the SiteIDs listed in site_table
+    districts = {row[0] for row in conn.execute(f"""
+        SELECT DISTINCT a.DistrictID FROM Sites s JOIN Addresses a ON a.AddressID = s.AddressID
+        WHERE s.SiteID IN (SELECT SiteID FROM {site_table})""")}
+    species = {row[0] for row in conn.execute(f"""
+        SELECT DISTINCT SpeciesID FROM SiteSpecies WHERE SiteID IN (SELECT SiteID FROM {site_table})""")}
+    return districts, species
@@ -0,0 +1,201 @@
+"""Typed, single-pass validation of the raw tree inventory.
+
+The normalizer used to read the raw export with pandas, drop every row with an
+empty cell and write Tree_Inventory_reduced.csv back out for the loaders to parse
+again as text. validate_inventory() reads the raw export once with the csv module
+(so quoted fields with commas parse correctly) and yields one SiteRecord per good
+row with every field already converted:
+    - SiteID, SiteNumber and BuildingNo as int ("12.0" is accepted, "12.5" is not);
+    - Latitude, Longitude, DBH, leaf surface area and the benefits as float;
+    - District stripped, and botanical / common names cut at the first "'" like
+      the step functions do, with the no-species values mapped to "None".
+Columns are found by header name (see tree_csv), so the export may order them any
+way, and the file is read as UTF-8. A row is rejected, with the reason, when it has
+the wrong number of fields, any missing cell (the values pandas reads as NaN, so the same rows dropna() dropped) or
+a field that does not parse. load_validated_inventory() feeds the records straight
+to the single-pass loader (tree_etl.feed_record) and stores the rejects in a
+Rejects table of the new database:
+
+Rejects
+[LineNumber] Integer not null, [Reason] Text not null, [Line] Text not null
+
+clean_inventory() instead writes the valid rows back out unchanged, as the cleaned
+CSV the other loaders read, and the rejects to a CSV with the same three columns.
+
+Usage:
+    stats, rejects = load_validated_inventory("Tree_Inventory_reduced_notclean.csv", "BuffaloTrees.db")
+    count, rejects = clean_inventory("Tree_Inventory_reduced_notclean.csv", "Tree_Inventory_reduced.csv")
+"""
+
+import csv
+import io
+import math
+from collections import namedtuple
+
+from tree_csv import read_header, column_positions, row_mapper
+from tree_db import create_connection
+from tree_options import DEFAULT_LOAD_MODE
+from tree_etl import (create_sinks, create_keys, feed_record, build_tables, write_tables, NO_SPECIES,
+                      NO_SITE_SPECIES, BOTANICAL_NAME, COMMON_NAME, DBH, TOTAL_YEARLY_BENEFITS,
+                      STORMWATER_BENEFITS, STORMWATER_GALLONS, CO2_BENEFITS, CO2_AVOIDED, CO2_SEQUESTERED,
+                      ENERGY_BENEFITS, KWH_SAVED, THERMS_SAVED, AIR_QUALITY_BENEFITS, POLLUTANTS_SAVED,
+                      PROPERTY_BENEFITS, LEAF_SURFACE_AREA, BUILDING_NO, STREET, SITE_NUMBER, DISTRICT,
+                      LATITUDE, LONGITUDE, SITE_ID)
+
+
+## The strings pandas.read_csv reads as NaN by default
+MISSING_VALUES = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                  "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+
+SiteRecord = namedtuple("SiteRecord", [
+    "site_id", "site_number", "status", "latitude", "longitude", "building_no", "street", "district",
+    "botanical_name", "common_name", "site_species", "dbh", "leaf_surface_area",
+    "pollutants_saved", "co2_avoided", "co2_sequestered", "stormwater_gallons", "kwh_saved", "therms_saved",
+    "co2_benefits", "energy_benefits", "stormwater_benefits", "air_quality_benefits", "property_benefits",
+    "total_yearly_benefits"])
+
+CREATE_REJECTS_SQL = """
+    CREATE TABLE IF NOT EXISTS [Rejects](
+    [LineNumber] Integer not null,
+    [Reason] Text not null,
+    [Line] Text not null
+    )
+    """
+
+
+def parse_int(value):
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(value)
+    return int(number)
+
+
+def parse_float(value):
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+## (SiteRecord field, column index, parser) of every converted field, in SiteRecord order;
+##the indices are tree_etl's positions in INVENTORY_COLUMNS order
+TYPED_FIELDS = [
+    ("site_id", SITE_ID, parse_int), ("site_number", SITE_NUMBER, parse_int),
+    ("latitude", LATITUDE, parse_float), ("longitude", LONGITUDE, parse_float),
+    ("building_no", BUILDING_NO, parse_int),
+    ("dbh", DBH, parse_float), ("leaf_surface_area", LEAF_SURFACE_AREA, parse_float),
+    ("pollutants_saved", POLLUTANTS_SAVED, parse_float), ("co2_avoided", CO2_AVOIDED, parse_float),
+    ("co2_sequestered", CO2_SEQUESTERED, parse_float), ("stormwater_gallons", STORMWATER_GALLONS, parse_float),
+    ("kwh_saved", KWH_SAVED, parse_float), ("therms_saved", THERMS_SAVED, parse_float),
+    ("co2_benefits", CO2_BENEFITS, parse_float), ("energy_benefits", ENERGY_BENEFITS, parse_float),
+    ("stormwater_benefits", STORMWATER_BENEFITS, parse_float),
+    ("air_quality_benefits", AIR_QUALITY_BENEFITS, parse_float),
+    ("property_benefits", PROPERTY_BENEFITS, parse_float),
+    ("total_yearly_benefits", TOTAL_YEARLY_BENEFITS, parse_float),
+]
+
+
+def to_record(fields):
+    # SiteRecord of one complete row in INVENTORY_COLUMNS order; raises ValueError
+    # naming the first bad field
+    values = {}
+    for name, index, parse in TYPED_FIELDS:
+        try:
+            values[name] = parse(fields[index])
+        except ValueError:
+            raise ValueError(f"invalid {name}: {fields[index]!r}") from None
+
+    botanical = fields[BOTANICAL_NAME]
+    if botanical not in NO_SPECIES:
+        values["botanical_name"] = botanical.split("'")[0].strip()
+        values["common_name"] = fields[COMMON_NAME].split("'")[0].strip()
+    else:
+        values["botanical_name"] = values["common_name"] = "None"
+    values["site_species"] = "None" if botanical in NO_SITE_SPECIES else botanical.split("'")[0].strip()
+    values["status"] = "Vacant" if botanical == "VACANT" else "Inhabited"
+    values["street"] = fields[STREET]
+    values["district"] = fields[DISTRICT].strip()
+    return SiteRecord(**values)
+
+
+def csv_line(fields):
+    # fields as one CSV line, quoted where needed, so a rejected line can be parsed again
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(fields)
+    return buffer.getvalue()
+
+
+def validate_rows(datafile, rejects):
+    # Yields (fields, SiteRecord) of every valid row of the raw inventory and appends
+    # (line number, reason, line) to rejects for every other row
+    with open(datafile, newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        header = None
+        for fields in reader:
+            if len(fields) <= 1 and not "".join(fields).strip(): # blank line
+                continue
+            if header is None:
+                header = fields
+                mapper = row_mapper(column_positions(header))
+                continue
+
+            if len(fields) != len(header):
+                reason = f"expected {len(header)} fields, found {len(fields)}"
+            else:
+                missing = [name for name, value in zip(header, fields) if value in MISSING_VALUES]
+                reason = f"missing {', '.join(missing)}" if missing else None
+            if reason is None:
+                try:
+                    record = to_record(fields if mapper is None else mapper(fields))
+                except ValueError as e:
+                    reason = str(e)
+                else:
+                    yield fields, record
+                    continue
+            rejects.append((reader.line_num, reason, csv_line(fields)))
+
+
+def validate_inventory(datafile, rejects):
+    # Yields a SiteRecord per valid row of the raw inventory (see validate_rows)
+    for fields, record in validate_rows(datafile, rejects):
+        yield record
+
+
+def clean_inventory(datafile, cleanfile, rejectsfile=None):
+    # Writes the header and the valid rows of the raw inventory, as they were, to
+    # cleanfile (what the pandas dropna step wrote to Tree_Inventory_reduced.csv) and
+    # the rejects to rejectsfile. Returns (rows written, rejects).
+    rejects, count = [], 0
+    with open(cleanfile, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(read_header(datafile))
+        for fields, record in validate_rows(datafile, rejects):
+            writer.writerow(fields)
+            count += 1
+
+    if rejectsfile is not None:
+        with open(rejectsfile, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file, lineterminator="\n")
+            writer.writerow(["LineNumber", "Reason", "Line"])
+            writer.writerows(rejects)
+    return count, rejects
+
+
+def load_validated_inventory(datafile, database, batch_size=50000, load_mode=DEFAULT_LOAD_MODE, report=False):
+    # Validates the raw inventory and builds the whole database from it in one pass.
+    # Returns the per-table write stats and the rejected rows.
+    sinks, keys, rejects = create_sinks(), create_keys(), []
+    for record in validate_inventory(datafile, rejects):
+        feed_record(sinks, keys, record)
+
+    writer = write_tables(build_tables(sinks, keys), database, batch_size, load_mode)
+    conn = create_connection(database)
+    with conn:
+        conn.execute(CREATE_REJECTS_SQL)
+        conn.executemany("INSERT INTO Rejects VALUES (?, ?, ?)", rejects)
+    conn.close()
+
+    if report:
+        writer.report()
+        print(f"{len(rejects)} rows rejected (see the Rejects table)")
+    return writer.stats, rejects
@@ -0,0 +1,131 @@
+"""Chunked bulk inserts for loading the normalized tree database.
+
+BulkWriter inserts rows from any iterable in batches of batch_size, so a generator of
+rows never has to be materialized as one big list; batch_size bounds the rows held in
+memory per executemany, not how often the load commits. The whole load (including
+any DDL run inside the with block) is one transaction: it is committed when the
+block exits, after PRAGMA foreign_key_check has found no violations, and rolled back
+as a whole if anything fails. While it is open, foreign key enforcement is switched
+off, so the relationships are checked once at the end instead of row by row.
+
+A load mode trades durability for speed while the database is being (re)built:
+    "safe" - SQLite defaults (rollback journal, synchronous=FULL)
+    "wal"  - journal_mode=WAL, synchronous=OFF, 256 MB page cache
+    "fast" - journal_mode=OFF, synchronous=OFF, 256 MB page cache, in-memory temp
+             store. Without a journal a failed load cannot be rolled back, so on
+             failure the writer closes the connection and deletes the database file;
+             a crash mid-load leaves a corrupt file. Only use it when the database is
+             being rebuilt from the inventory anyway. That is only done for a
+             database the caller created for the load (new_database=True); on any
+             other database "fast" keeps the rollback journal in memory instead
+             (journal_mode=MEMORY), so a failed load still rolls back.
+WAL stays on after the load (it is stored in the file), the other settings only
+last as long as the connection.
+
+Usage:
+    with BulkWriter(conn, batch_size=50000, load_mode="fast", new_database=True) as writer:
+        writer.write("Districts", INSERT_SQL["Districts"], rows)
+    writer.report()
+"""
+
+import os
+import sqlite3
+import time
+from itertools import islice
+
+from tree_options import LOAD_MODES, DEFAULT_LOAD_MODE
+from tree_pool import close_pools
+
+
+NO_JOURNAL = "PRAGMA journal_mode = OFF"
+MEMORY_JOURNAL = "PRAGMA journal_mode = MEMORY"
+
+
+def chunked(rows, size):
+    # Yields lists of at most size rows from any iterable
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkWriter:
+
+    def __init__(self, conn, batch_size=50000, load_mode=DEFAULT_LOAD_MODE, new_database=False):
+        if load_mode not in LOAD_MODES:
+            raise ValueError(f"unknown load mode {load_mode!r}, expected one of {sorted(LOAD_MODES)}")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.load_mode = load_mode
+        self.new_database = new_database # created for this load, so it may be deleted on failure
+        self.stats = {}
+
+    def can_roll_back(self):
+        return self.load_mode != "fast" or not self.new_database
+
+    def __enter__(self):
+        self.conn.commit() # pragmas below are ignored inside an open transaction
+        for pragma in LOAD_MODES[self.load_mode]:
+            if pragma == NO_JOURNAL and self.can_roll_back():
+                pragma = MEMORY_JOURNAL # an existing database must survive a failed load
+            self.conn.execute(pragma)
+        self.conn.execute("PRAGMA foreign_keys = OFF")
+        self.conn.execute("BEGIN") # the whole load, committed in __exit__
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.check_foreign_keys()
+                self.conn.commit()
+        except BaseException:
+            self.abort()
+            raise
+        if exc_type is not None:
+            self.abort()
+            return False
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        return False
+
+    def abort(self):
+        # Rolls the load back; without a journal ("fast" on a new database) the file is
+        # deleted instead
+        if self.can_roll_back():
+            self.conn.rollback()
+            self.conn.execute("PRAGMA foreign_keys = ON")
+            return
+        database = self.conn.execute("PRAGMA database_list").fetchone()[2]
+        self.conn.close()
+        if database: # "" for an in-memory database
+            close_pools(database)
+            for path in [database, database + "-wal", database + "-shm"]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def write(self, table, sql, rows):
+        # Inserts rows batch by batch and records the row count and time for table
+        start = time.perf_counter()
+        count = 0
+        cur = self.conn.cursor()
+        for chunk in chunked(rows, self.batch_size):
+            cur.executemany(sql, chunk)
+            count += len(chunk)
+
+        seconds = time.perf_counter() - start
+        previous = self.stats.get(table, {"rows": 0, "seconds": 0.0})
+        rows_total, seconds_total = previous["rows"] + count, previous["seconds"] + seconds
+        self.stats[table] = {"rows": rows_total, "seconds": seconds_total,
+                             "rows_per_sec": rows_total / seconds_total if seconds_total else float("inf")}
+        return count
+
+    def check_foreign_keys(self):
+        violations = self.conn.execute("PRAGMA foreign_key_check").fetchall()
+        if violations:
+            examples = ", ".join(f"{table} rowid {rowid} -> {parent}" for table, rowid, parent, fkid in violations[:5])
+            raise sqlite3.IntegrityError(f"{len(violations)} foreign key violations after bulk load ({examples})")
+
+    def report(self):
+        for table, stat in self.stats.items():
+            print(f"{table:<22} {stat['rows']:>10} rows {stat['seconds']:>8.3f}s {stat['rows_per_sec']:>12.0f} rows/sec")